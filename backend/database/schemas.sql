@@ -58,6 +58,42 @@ CREATE TABLE IF NOT EXISTS `DocumentFull` (
   `pdfBlob` LONGBLOB
 );
 
+CREATE TABLE IF NOT EXISTS `PdfBlob` (
+  `sha256` CHAR(64) PRIMARY KEY,
+  `size` BIGINT,
+  `chunkSize` INT,
+  `chunkCount` INT,
+  `createdAt` DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS `PdfBlobChunk` (
+  `sha256` CHAR(64),
+  `chunkIndex` INT,
+  `data` MEDIUMBLOB,
+  PRIMARY KEY (`sha256`, `chunkIndex`)
+);
+
+CREATE TABLE IF NOT EXISTS `DocumentPdf` (
+  `documentId` VARCHAR(255) PRIMARY KEY,
+  `sha256` CHAR(64),
+  `size` BIGINT,
+  `backend` VARCHAR(32)
+);
+
+CREATE TABLE IF NOT EXISTS `IngestionManifest` (
+  `documentId` VARCHAR(255),
+  `stage` VARCHAR(255),
+  `contentHash` CHAR(64),
+  `updatedAt` DATETIME,
+  PRIMARY KEY (`documentId`, `stage`)
+);
+
+CREATE TABLE IF NOT EXISTS `CacheVersion` (
+  `name` VARCHAR(255) PRIMARY KEY,
+  `version` BIGINT,
+  `updatedAt` DATETIME
+);
+
 
 CREATE TABLE IF NOT EXISTS `SearchQueryHistory` (
   `queryId` VARCHAR(255) PRIMARY KEY,
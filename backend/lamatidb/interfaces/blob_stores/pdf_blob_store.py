@@ -0,0 +1,209 @@
+## Content-addressed PDF storage with chunked, streaming and byte-range reads.
+## PDFs are deduplicated by SHA-256 and stored in fixed-size chunks, either in the datastore
+## (`PdfBlobChunk` table) or on a local filesystem standing in for an object store.
+## `DocumentPdf` maps documentIds to the blob they use and the backend holding it, so readers
+## configured with a different PDF_BLOB_BACKEND still find the bytes.
+## Table names are qualified with the datastore schema, so the store also works on engines bound
+## to another database (the API server's datastore interface is bound to `mysql`).
+
+import hashlib
+import os
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import text
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+class PDFBlobStore:
+    """
+    Base store: keeps the documentId -> blob mapping in the datastore; subclasses store the bytes.
+    """
+    backend_name = None
+
+    def __init__(self, datastore_db, chunk_size: int = DEFAULT_CHUNK_SIZE, schema: str = None):
+        """
+        :param datastore_db: DatabaseInterface connected to the datastore.
+        :param chunk_size: Size of stored chunks and of the pieces yielded by streaming reads.
+        :param schema: Database holding the PDF tables (defaults to PDF_BLOB_SCHEMA, then `datastore_db.db_name`).
+        """
+        self.datastore_db = datastore_db
+        self.chunk_size = chunk_size
+        self.schema = schema or os.environ.get("PDF_BLOB_SCHEMA") or datastore_db.db_name
+        self._stores = {self.backend_name: self}
+
+    def _table(self, table_name: str) -> str:
+        return f"`{self.schema}`.`{table_name}`"
+
+    def exists(self, sha256: str) -> bool:
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def _write(self, sha256: str, data: bytes):
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def iter_range(self, sha256: str, start: int, end: int) -> Iterator[bytes]:
+        """Yield the bytes in [start, end] (inclusive) of a blob, at most one chunk at a time."""
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """
+        Store a PDF unless an identical one is already stored.
+
+        :return: (sha256 hex digest, size in bytes)
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        if not self.exists(sha256):
+            self._write(sha256, data)
+        return sha256, len(data)
+
+    def put_document(self, document_id: str, data: bytes) -> str:
+        """Store a PDF and point `document_id` at it."""
+        sha256, size = self.put(data)
+        query = text(f"""
+            INSERT INTO {self._table('DocumentPdf')} (documentId, sha256, size, backend) VALUES (:document_id, :sha256, :size, :backend)
+            ON DUPLICATE KEY UPDATE sha256 = VALUES(sha256), size = VALUES(size), backend = VALUES(backend)
+        """)
+        with self.datastore_db.get_session() as session:
+            session.execute(query, {"document_id": str(document_id), "sha256": sha256, "size": size,
+                                    "backend": self.backend_name})
+            session.commit()
+        return sha256
+
+    def get_document_blob(self, document_id: str) -> Optional[Tuple[str, int, "PDFBlobStore"]]:
+        """
+        :return: (sha256, size, store) of the document's PDF, or None if it has none in the store.
+            `store` is the store of the backend the PDF was written to (this store for rows without one).
+        """
+        query = text(f"SELECT sha256, size, backend FROM {self._table('DocumentPdf')} WHERE documentId = :document_id")
+        with self.datastore_db.get_session() as session:
+            row = session.execute(query, {"document_id": str(document_id)}).fetchone()
+        return (row[0], int(row[1]), self.for_backend(row[2])) if row else None
+
+    def for_backend(self, backend: Optional[str]) -> "PDFBlobStore":
+        """Store for `backend` sharing this store's datastore and chunk size (built once per backend)."""
+        if not backend:
+            return self
+        if backend not in self._stores:
+            self._stores[backend] = get_pdf_blob_store(self.datastore_db, backend=backend, chunk_size=self.chunk_size,
+                                                       schema=self.schema)
+        return self._stores[backend]
+
+    def iter_blob(self, sha256: str, size: int) -> Iterator[bytes]:
+        return self.iter_range(sha256, 0, size - 1)
+
+    def read(self, sha256: str, size: int) -> bytes:
+        return b"".join(self.iter_blob(sha256, size))
+
+
+class ChunkTablePDFBlobStore(PDFBlobStore):
+    """
+    Stores blobs as rows of `PdfBlobChunk` (sha256, chunkIndex, data); `PdfBlob` is written
+    last and marks the blob as complete.
+    """
+    backend_name = "table"
+
+    def __init__(self, datastore_db, chunk_size: int = DEFAULT_CHUNK_SIZE, chunks_per_query: int = 4, schema: str = None):
+        """
+        :param chunks_per_query: Number of chunks fetched per SELECT during streaming reads.
+        """
+        super().__init__(datastore_db, chunk_size=chunk_size, schema=schema)
+        self.chunks_per_query = chunks_per_query
+
+    def exists(self, sha256: str) -> bool:
+        query = text(f"SELECT 1 FROM {self._table('PdfBlob')} WHERE sha256 = :sha256")
+        with self.datastore_db.get_session() as session:
+            return session.execute(query, {"sha256": sha256}).fetchone() is not None
+
+    def _write(self, sha256: str, data: bytes):
+        chunk_query = text(f"""
+            INSERT IGNORE INTO {self._table('PdfBlobChunk')} (sha256, chunkIndex, data) VALUES (:sha256, :chunk_index, :data)
+        """)
+        blob_query = text(f"""
+            INSERT IGNORE INTO {self._table('PdfBlob')} (sha256, size, chunkSize, chunkCount, createdAt)
+            VALUES (:sha256, :size, :chunk_size, :chunk_count, NOW())
+        """)
+        chunk_count = (len(data) + self.chunk_size - 1) // self.chunk_size
+        with self.datastore_db.get_session() as session:
+            for chunk_index in range(chunk_count):
+                chunk = data[chunk_index * self.chunk_size:(chunk_index + 1) * self.chunk_size]
+                session.execute(chunk_query, {"sha256": sha256, "chunk_index": chunk_index, "data": chunk})
+            session.execute(blob_query, {"sha256": sha256, "size": len(data), "chunk_size": self.chunk_size,
+                                         "chunk_count": chunk_count})
+            session.commit()
+
+    def _get_chunk_size(self, sha256: str) -> int:
+        # Blobs keep the chunk size they were written with
+        query = text(f"SELECT chunkSize FROM {self._table('PdfBlob')} WHERE sha256 = :sha256")
+        with self.datastore_db.get_session() as session:
+            row = session.execute(query, {"sha256": sha256}).fetchone()
+        if row is None:
+            raise KeyError(f"PDF blob {sha256} not found")
+        return int(row[0])
+
+    def iter_range(self, sha256: str, start: int, end: int) -> Iterator[bytes]:
+        chunk_size = self._get_chunk_size(sha256)
+        first_chunk, last_chunk = start // chunk_size, end // chunk_size
+        query = text(f"""
+            SELECT chunkIndex, data FROM {self._table('PdfBlobChunk')}
+            WHERE sha256 = :sha256 AND chunkIndex BETWEEN :first_chunk AND :last_chunk
+            ORDER BY chunkIndex
+        """)
+
+        for batch_start in range(first_chunk, last_chunk + 1, self.chunks_per_query):
+            batch_end = min(batch_start + self.chunks_per_query - 1, last_chunk)
+            with self.datastore_db.get_session() as session:
+                rows = session.execute(query, {"sha256": sha256, "first_chunk": batch_start,
+                                               "last_chunk": batch_end}).fetchall()
+            for chunk_index, data in rows:
+                chunk_offset = chunk_index * chunk_size
+                yield bytes(data[max(start - chunk_offset, 0):end - chunk_offset + 1])
+
+
+class FileSystemPDFBlobStore(PDFBlobStore):
+    """
+    Stores each blob as one file under `root_dir/<sha[:2]>/<sha>.pdf` (local stand-in for an
+    object store); range reads seek into the file.
+    """
+    backend_name = "filesystem"
+
+    def __init__(self, datastore_db, root_dir: str, chunk_size: int = DEFAULT_CHUNK_SIZE, schema: str = None):
+        super().__init__(datastore_db, chunk_size=chunk_size, schema=schema)
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root_dir, sha256[:2], f"{sha256}.pdf")
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def _write(self, sha256: str, data: bytes):
+        path = self._path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def iter_range(self, sha256: str, start: int, end: int) -> Iterator[bytes]:
+        with open(self._path(sha256), "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = f.read(min(self.chunk_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+
+def get_pdf_blob_store(datastore_db, backend: str = None, root_dir: str = None, **kwargs) -> PDFBlobStore:
+    """
+    Build the configured store: PDF_BLOB_BACKEND is 'table' (default) or 'filesystem' (under PDF_BLOB_DIR).
+    """
+    backend = backend or os.environ.get("PDF_BLOB_BACKEND", "table")
+    if backend == "table":
+        return ChunkTablePDFBlobStore(datastore_db, **kwargs)
+    if backend == "filesystem":
+        return FileSystemPDFBlobStore(datastore_db, root_dir or os.environ.get("PDF_BLOB_DIR", "datalake/pdf_blobs"), **kwargs)
+    raise ValueError(f"Unsupported PDF blob backend '{backend}'. Use 'table' or 'filesystem'.")
@@ -0,0 +1,157 @@
+## Bounded, thread-safe cache of query embeddings shared by every retriever in the process.
+## Query embedding (SciBERT on CPU) is the largest per-search cost, and the same text is often
+## searched against several indexes or by several users.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+
+def normalize_query_text(text: str) -> str:
+    """Collapse whitespace so trivially different query strings share a cache entry."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    LRU cache of embeddings keyed by (model name, normalized text) with TTL-based expiry.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl: Optional[float] = 3600.0):
+        """
+        :param max_size: Maximum number of embeddings kept in memory.
+        :param ttl: Seconds an entry stays valid (None keeps entries until evicted by size).
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, embedding = entry
+                if self.ttl is None or time.time() - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, text: str, embedding: List[float]):
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            self._entries[key] = (time.time(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper that answers query embeddings from an EmbeddingCache.
+    Text (document) embeddings are passed straight through to the wrapped model.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache = None, **kwargs: Any):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._cache = cache or get_embedding_cache()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        embedding = self._cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = self._embed_model.get_query_embedding(query)
+            self._cache.put(self.model_name, query, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        embedding = self._cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = await self._embed_model.aget_query_embedding(query)
+            self._cache.put(self.model_name, query, embedding)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed_model.get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_model.get_text_embedding_batch(texts)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self._embed_model.aget_text_embedding(text)
+
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_cache_lock = threading.Lock()
+_wrapped_models: Dict[int, CachedEmbedding] = {}
+
+
+def get_embedding_cache(**kwargs) -> EmbeddingCache:
+    """Return the process-wide embedding cache, creating it on first call."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache(**kwargs)
+        return _shared_cache
+
+
+def get_cached_embed_model(embed_model: BaseEmbedding) -> CachedEmbedding:
+    """
+    Wrap an embedding model with the shared cache, reusing the wrapper for the same model.
+    """
+    if isinstance(embed_model, CachedEmbedding):
+        return embed_model
+
+    cache = get_embedding_cache()
+    with _shared_cache_lock:
+        wrapped = _wrapped_models.get(id(embed_model))
+        if wrapped is None or wrapped.embed_model is not embed_model:
+            wrapped = CachedEmbedding(embed_model, cache=cache)
+            _wrapped_models[id(embed_model)] = wrapped
+        return wrapped
@@ -0,0 +1,221 @@
+## Process-wide cache of document IDs that have a full document (PDF) in the datastore.
+## Search endpoints use it to mark `has_pdf` without scanning DocumentFull on every request.
+## Ingestion runs in other processes, so it signals new PDFs by bumping a version row in
+## CacheVersion; the server's refresher polls that row and reloads when it changes.
+
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import bindparam, text
+
+CACHE_NAME = "pdf_availability"
+
+
+class PDFAvailabilityCache:
+    """
+    Keeps the set of documentIds present in DocumentFull in memory.
+
+    The set is loaded once (usually at startup) and refreshed on a schedule by a
+    background thread. The same thread polls the CacheVersion row every
+    `version_poll_interval` seconds and reloads as soon as an ingestion process
+    bumps it (see bump_pdf_availability_version). Lookups for IDs not in the set
+    fall back to a targeted `IN (...)` query over just those IDs while the cache
+    is stale or not loaded.
+    """
+
+    def __init__(self, datastore_db, table_name: str = "datastore.DocumentFull", refresh_interval: float = 300.0,
+                 version_table: str = "datastore.CacheVersion", version_poll_interval: float = 15.0):
+        """
+        :param datastore_db: DatabaseInterface connected to the datastore.
+        :param table_name: Fully qualified DocumentFull table name.
+        :param refresh_interval: Seconds between scheduled refreshes (<= 0 disables the scheduler).
+        :param version_table: Fully qualified CacheVersion table name.
+        :param version_poll_interval: Seconds between checks of the version row by the scheduler.
+        """
+        self.datastore_db = datastore_db
+        self.table_name = table_name
+        self.refresh_interval = refresh_interval
+        self.version_table = version_table
+        self.version_poll_interval = version_poll_interval
+
+        self._doc_ids: Set[str] = set()
+        self._loaded = False
+        self._stale = True
+        self._last_refresh = 0.0
+        self._version = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    def fetch_version(self) -> Optional[int]:
+        """Current CacheVersion of the PDF availability set (0 if never bumped, None if unreadable)."""
+        query = text(f"SELECT version FROM {self.version_table} WHERE name = :name")
+        try:
+            with self.datastore_db.get_session() as session:
+                row = session.execute(query, {"name": CACHE_NAME}).fetchone()
+        except Exception as e:
+            print(f"PDF availability version check failed: {e}")
+            return None
+        return int(row[0]) if row else 0
+
+    def load(self):
+        """Load the full set of document IDs with a PDF."""
+        start_time = time.time()
+        # Read the version first, so a bump while the set is loading triggers another reload
+        version = self.fetch_version()
+        query = f"SELECT documentId FROM {self.table_name}"
+        doc_ids = {str(x[0]) for x in self.datastore_db.fetch_data_from_db(query)}
+
+        with self._lock:
+            self._doc_ids = doc_ids
+            self._version = version
+            self._loaded = True
+            self._stale = False
+            self._last_refresh = time.time()
+
+        elapsed_time = time.time() - start_time
+        print(f"PDF availability cache loaded {len(doc_ids)} documents in {elapsed_time:.2f} seconds")
+
+    def refresh(self):
+        """Reload the cache, keeping the previous set if the datastore is unavailable."""
+        try:
+            self.load()
+        except Exception as e:
+            print(f"PDF availability cache refresh failed: {e}")
+
+    def start_scheduled_refresh(self):
+        """
+        Start a daemon thread that refreshes the cache every `refresh_interval` seconds,
+        or earlier when the CacheVersion row changes.
+        """
+        if self.refresh_interval <= 0 or self._refresh_thread is not None:
+            return
+
+        # Each thread gets its own event, so the cache can be stopped and started again
+        stop_event = self._stop_event = threading.Event()
+        poll_interval = min(self.refresh_interval, self.version_poll_interval) if self.version_poll_interval > 0 \
+            else self.refresh_interval
+
+        def run():
+            while not stop_event.wait(poll_interval):
+                if time.time() - self._last_refresh >= self.refresh_interval:
+                    self.refresh()
+                    continue
+                version = self.fetch_version()
+                if version is not None and version != self._version:
+                    print(f"PDF availability version changed ({self._version} -> {version}), reloading")
+                    self.invalidate()
+                    self.refresh()
+
+        self._refresh_thread = threading.Thread(target=run, name="pdf-availability-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_scheduled_refresh(self):
+        self._stop_event.set()
+        if self._refresh_thread is not None and self._refresh_thread is not threading.current_thread():
+            self._refresh_thread.join()
+        self._refresh_thread = None
+
+    def mark_available(self, document_ids: Iterable[str]):
+        """Add newly ingested document IDs to the cache."""
+        with self._lock:
+            self._doc_ids.update(str(x) for x in document_ids)
+
+    def invalidate(self):
+        """Mark the cache as stale so misses are checked against the datastore."""
+        with self._lock:
+            self._stale = True
+
+    def is_stale(self) -> bool:
+        if not self._loaded or self._stale:
+            return True
+        return self.refresh_interval > 0 and time.time() - self._last_refresh > 2 * self.refresh_interval
+
+    def lookup(self, document_ids: Iterable[str]) -> Set[str]:
+        """Targeted lookup of which of the given document IDs have a PDF."""
+        document_ids = list({str(x) for x in document_ids})
+        if not document_ids:
+            return set()
+
+        query = text(f"SELECT documentId FROM {self.table_name} WHERE documentId IN :doc_ids").bindparams(
+            bindparam("doc_ids", expanding=True)
+        )
+        with self.datastore_db.get_session() as session:
+            result = session.execute(query, {"doc_ids": document_ids}).fetchall()
+        found = {str(x[0]) for x in result}
+
+        self.mark_available(found)
+        return found
+
+    def has_pdf(self, document_ids: Iterable[str]) -> Dict[str, bool]:
+        """
+        Return a mapping of document ID to PDF availability.
+
+        IDs found in the cache are answered from memory. Misses are only checked
+        against the datastore when the cache is stale or not loaded yet.
+        """
+        document_ids = [str(x) for x in document_ids]
+        with self._lock:
+            available = {x for x in document_ids if x in self._doc_ids}
+
+        misses = [x for x in document_ids if x not in available]
+        if misses and self.is_stale():
+            available |= self.lookup(misses)
+
+        return {x: x in available for x in document_ids}
+
+
+_shared_cache: Optional[PDFAvailabilityCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_pdf_availability_cache(datastore_db=None, **kwargs) -> Optional[PDFAvailabilityCache]:
+    """
+    Return the process-wide PDF availability cache, creating it on first call with a datastore.
+    Returns None if the cache was never initialised in this process.
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None and datastore_db is not None:
+            _shared_cache = PDFAvailabilityCache(datastore_db, **kwargs)
+        return _shared_cache
+
+
+def bump_pdf_availability_version(datastore_db, version_table: str = "CacheVersion"):
+    """
+    Bump the CacheVersion row polled by PDF availability caches in other processes (the API server).
+    Failures are reported and ignored; the server still picks the change up on its next full refresh.
+
+    :param datastore_db: DatabaseInterface connected to the datastore.
+    :param version_table: CacheVersion table name, qualified if `datastore_db` is not the datastore.
+    """
+    query = text(f"""
+        INSERT INTO {version_table} (name, version, updatedAt) VALUES (:name, 1, NOW())
+        ON DUPLICATE KEY UPDATE version = version + 1, updatedAt = VALUES(updatedAt)
+    """)
+    try:
+        with datastore_db.get_session() as session:
+            session.execute(query, {"name": CACHE_NAME})
+            session.commit()
+    except Exception as e:
+        print(f"PDF availability version bump failed: {e}")
+
+
+def invalidate_pdf_availability(document_ids: Iterable[str] = None, datastore_db=None):
+    """
+    Notify PDF availability caches of new DocumentFull rows.
+
+    The cache of this process (if any) is updated directly. Caches in other processes only see
+    the change through the CacheVersion row, which is bumped when `datastore_db` is given.
+    """
+    if datastore_db is not None:
+        bump_pdf_availability_version(datastore_db)
+
+    cache = get_pdf_availability_cache()
+    if cache is None:
+        return
+    if document_ids:
+        cache.mark_available(document_ids)
+    else:
+        cache.invalidate()
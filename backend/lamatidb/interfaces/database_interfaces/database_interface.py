@@ -1,15 +1,17 @@
 ## Newer interface that aims to encapsulate both MySQL and TiDB interfaces.
 ## To be divided into inherent classes for MySQL and TiDB, to manage operational/ingestion data and vectors/indixes respectively.
 
-from sqlalchemy import create_engine, text, URL
+from sqlalchemy import text, URL
 from sqlalchemy.orm import sessionmaker
+from lamatidb.interfaces.database_interfaces.engine_registry import get_engine
 import os
 
 class DatabaseInterface:
-    def __init__(self, db_type: str, db_name: str, force_recreate_db=False):
+    def __init__(self, db_type: str, db_name: str, force_recreate_db=False, local_infile=False):
         self.db_type = db_type.lower()  # Either 'mysql' or 'tidb'
         self.db_name = db_name
         self.force_recreate_db = force_recreate_db
+        self.local_infile = local_infile  # Enable LOAD DATA LOCAL INFILE on the client connections
 
         if self.db_type == 'mysql':
             self.DB_USERNAME = os.environ['MYSQL_USERNAME']
@@ -26,6 +28,12 @@ class DatabaseInterface:
 
         self.engine = self.create_engine_without_db()
 
+    def _create_engine(self, database_uri, **pool_args):
+        # Engines are shared process-wide per (host, database, user), see engine_registry
+        connect_args = {"local_infile": True} if self.local_infile else {}
+        pool_args = {"pool_size": 10, "max_overflow": 20, **pool_args}
+        return get_engine(database_uri, connect_args=connect_args, **pool_args)
+
     def create_engine_without_db(self):
         if self.db_type == 'mysql':
             DATABASE_URI = f'mysql+pymysql://{self.DB_USERNAME}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}'
@@ -39,7 +47,9 @@ class DatabaseInterface:
                 database='mysql',
                 query={"ssl_verify_cert": True, "ssl_verify_identity": True},
             )
-        return create_engine(DATABASE_URI, pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800)
+        # Only used for DROP/CREATE DATABASE before setup_database switches to the database engine,
+        # so it stays small and outside the global connection budget
+        return self._create_engine(DATABASE_URI, pool_size=1, max_overflow=2, budgeted=False)
 
     def create_engine_with_db(self):
         if self.db_type == 'mysql':
@@ -54,7 +64,7 @@ class DatabaseInterface:
                 database=self.db_name,
                 query={"ssl_verify_cert": True, "ssl_verify_identity": True},
             )
-        return create_engine(DATABASE_URI, pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800)
+        return self._create_engine(DATABASE_URI)
 
     def recreate_database(self):
         with self.engine.connect() as conn:
@@ -100,6 +110,42 @@ class DatabaseInterface:
             result = session.execute(text(query)).fetchall()
             return [row for row in result]
 
+    def paginate_data_from_db(self, query: str, key_column: str, batch_size: int = 1000):
+        """
+        Yield the result rows in lists of about `batch_size` with keyset pagination: one short query
+        per page (`key_column > last key ORDER BY key_column LIMIT batch_size`). No cursor stays open
+        while the caller processes a page, so slow consumers (e.g. embedding every batch) cannot hit
+        the server's net_write_timeout. Rows sharing a key are never split across pages.
+
+        :param query: SELECT returning `key_column` (a trailing ';' is allowed).
+        :param key_column: Unique or grouping key to page on, e.g. 'documentId'.
+        """
+        source = f"SELECT * FROM ({query.strip().rstrip(';')}) AS page_source"
+        first_page_query = text(f"{source} ORDER BY {key_column} LIMIT :limit")
+        next_page_query = text(f"{source} WHERE {key_column} > :last_key ORDER BY {key_column} LIMIT :limit")
+        key_query = text(f"{source} WHERE {key_column} = :key")
+
+        last_key = None
+        while True:
+            with self.engine.connect() as conn:
+                if last_key is None:
+                    rows = conn.execute(first_page_query, {"limit": batch_size}).fetchall()
+                else:
+                    rows = conn.execute(next_page_query, {"last_key": last_key, "limit": batch_size}).fetchall()
+                is_full_page = len(rows) == batch_size
+                if is_full_page:
+                    # The LIMIT may have cut the rows of the last key short: fetch that key completely
+                    boundary_key = rows[-1]._mapping[key_column]
+                    rows = [row for row in rows if row._mapping[key_column] != boundary_key]
+                    rows += conn.execute(key_query, {"key": boundary_key}).fetchall()
+
+            if not rows:
+                return
+            last_key = rows[-1]._mapping[key_column]
+            yield rows
+            if not is_full_page:
+                return
+
     def delete_table_if_exists(self, table_name: str):
         with self.engine.connect() as conn:
             try:
@@ -0,0 +1,150 @@
+## Process-wide registry of SQLAlchemy engines shared by DatabaseInterface, TiDBInterface and IndexInterface.
+## One engine (and connection pool) per (host, port, database, user), with pre-ping, a global cap on
+## persistent pooled connections across all engines, pool utilisation metrics and a health check.
+## Libraries that build their own engines during setup can borrow one pooled connection instead.
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+# Upper bound on pool_size (connections kept open) summed over every budgeted engine. Overflow
+# connections are short-lived and capped per engine by its own max_overflow.
+GLOBAL_MAX_CONNECTIONS = int(os.environ.get("DB_MAX_CONNECTIONS", 60))
+
+_engines: Dict[tuple, object] = {}
+_pool_limits: Dict[tuple, int] = {}
+_pool_budget: Dict[tuple, int] = {}
+_lock = threading.Lock()
+_bootstrap_lock = threading.Lock()
+
+
+def _engine_key(url, connect_args: dict) -> tuple:
+    return (url.host, url.port, url.database, url.username, tuple(sorted((connect_args or {}).items())))
+
+
+def get_engine(url, pool_size: int = 5, max_overflow: int = 10, connect_args: dict = None, budgeted: bool = True,
+               **kwargs):
+    """
+    Return the shared engine for this (host, port, database, user), creating it on first use.
+    Pool sizes are only applied on creation; pool_size is trimmed to stay within GLOBAL_MAX_CONNECTIONS.
+
+    :param url: SQLAlchemy URL or connection string.
+    :param connect_args: Driver connect arguments (engines with different arguments are not shared).
+    :param budgeted: Count the pool against GLOBAL_MAX_CONNECTIONS; off for small, rarely used engines
+                     such as the server-level one DatabaseInterface uses for CREATE DATABASE.
+    """
+    url = make_url(url)
+    key = _engine_key(url, connect_args)
+
+    with _lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            return engine
+
+        available = max(1, GLOBAL_MAX_CONNECTIONS - sum(_pool_budget.values()))
+        if budgeted and pool_size > available:
+            print(f"Connection budget: limiting pool for {url.host}/{url.database} to {available} connections "
+                  f"(requested {pool_size}, global limit {GLOBAL_MAX_CONNECTIONS}).")
+            pool_size = available
+
+        engine = create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=30,
+                               pool_recycle=1800, pool_pre_ping=True, connect_args=connect_args or {}, **kwargs)
+        _engines[key] = engine
+        _pool_limits[key] = pool_size + max_overflow
+        if budgeted:
+            _pool_budget[key] = pool_size
+        return engine
+
+
+class _BorrowedConnection:
+    """DBAPI connection proxy whose close() is a no-op, so engines built on it cannot close the borrowed connection."""
+
+    def __init__(self, dbapi_connection):
+        self._dbapi_connection = dbapi_connection
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._dbapi_connection, name)
+
+
+@contextmanager
+def borrowed_connection_engine_args(url):
+    """
+    Yield `engine_args` under which every engine created inside the block runs on one connection
+    checked out of the shared engine for `url`, instead of opening its own (e.g. tidb-vector opens
+    two engines per table while checking and creating it). Blocks are serialised, since the
+    borrowed DBAPI connection is not thread-safe; the connection returns to the pool on exit.
+    """
+    with _bootstrap_lock:
+        pooled_connection = get_engine(url).raw_connection()
+        borrowed = _BorrowedConnection(pooled_connection.dbapi_connection)
+        try:
+            yield {"poolclass": StaticPool, "creator": lambda: borrowed}
+        finally:
+            pooled_connection.close()
+
+
+def pool_status() -> list:
+    """Pool utilisation of every registered engine."""
+    status = []
+    with _lock:
+        items = list(_engines.items())
+    for key, engine in items:
+        pool = engine.pool
+        checked_out = pool.checkedout()
+        status.append({
+            "host": key[0],
+            "database": key[2],
+            "user": key[3],
+            "pool_size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "max_connections": _pool_limits[key],
+            "utilization": checked_out / _pool_limits[key] if _pool_limits[key] else 0.0,
+        })
+    return status
+
+
+def health_check() -> list:
+    """Run `SELECT 1` on every registered engine and report latency or the error."""
+    results = []
+    with _lock:
+        items = list(_engines.items())
+    for key, engine in items:
+        start_time = time.time()
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            results.append({"host": key[0], "database": key[2], "healthy": True,
+                            "latency_ms": round((time.time() - start_time) * 1000, 1)})
+        except Exception as e:
+            results.append({"host": key[0], "database": key[2], "healthy": False, "error": str(e)})
+    return results
+
+
+def warm_up(min_connections: int = 1):
+    """Open `min_connections` connections per engine ahead of traffic (e.g. at startup)."""
+    with _lock:
+        engines = list(_engines.values())
+    for engine in engines:
+        connections = [engine.connect() for _ in range(min_connections)]
+        for conn in connections:
+            conn.close()
+
+
+def dispose_all():
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _pool_limits.clear()
+        _pool_budget.clear()
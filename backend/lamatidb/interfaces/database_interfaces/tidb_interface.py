@@ -3,8 +3,9 @@
 
 import os
 import json
-from sqlalchemy import create_engine, text, URL
+from sqlalchemy import text, URL
 from sqlalchemy.orm import sessionmaker
+from lamatidb.interfaces.database_interfaces.engine_registry import get_engine
 
 class TiDBInterface:
     def __init__(self, db_name: str, vector_table_name: str=None):
@@ -34,7 +35,7 @@ class TiDBInterface:
         )
 
         # SQL statement to create the database if it doesn't exist
-        engine = create_engine(tidb_connection_url)
+        engine = get_engine(tidb_connection_url)
         create_db_sql = f"CREATE DATABASE IF NOT EXISTS {self.db_name};"
 
         # Execute the SQL command
@@ -46,7 +47,7 @@ class TiDBInterface:
     def delete_table_if_exists(self, vector_table_name: str):
         # SQL statement to create the database if it doesn't exist
         if not self.engine:
-            self.engine = create_engine(self.tidb_connection_url)
+            self.engine = get_engine(self.tidb_connection_url)
         create_db_sql = f"DROP TABLE IF EXISTS {vector_table_name};"
 
         # Execute the SQL command
@@ -81,7 +82,7 @@ class TiDBInterface:
         """
 
         if not self.engine:
-            self.engine = create_engine(self.tidb_connection_url)
+            self.engine = get_engine(self.tidb_connection_url)
 
         # Retrieve all documents in the vector store
         all_documents = self.retrieve_all_documents()
@@ -1,18 +1,51 @@
 import os
+import json
 import time
-from typing import List
-from sqlalchemy import URL
+from typing import Iterable, List
+from llama_index.core.schema import BaseNode
+from sqlalchemy import URL, bindparam, text
+from sqlalchemy.engine import Engine
 from llama_index.core import StorageContext, VectorStoreIndex, Document
-from llama_index.vector_stores.tidbvector import TiDBVectorStore
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core import Settings
+from llama_index.core.ingestion import run_transformations
+from lamatidb.interfaces.vector_stores.local_numpy_store import LocalNumpyVectorStore, build_snapshot
+from lamatidb.interfaces.vector_stores.ivf_store import IVFVectorStore
+from lamatidb.interfaces.mysql_ingestors.ingestion_manifest import IngestionManifest, hash_content
+from lamatidb.interfaces.database_interfaces.engine_registry import get_engine, borrowed_connection_engine_args
+from lamatidb.interfaces.vector_stores.vector_index_manager import VectorIndexManager
+from lamatidb.interfaces.vector_stores.vector_bulk_writer import VectorBulkWriter, embed_node_batches
+from lamatidb.interfaces.vector_stores.indexed_tidb_store import IndexedMetadataTiDBVectorStore
+
+VECTOR_BACKENDS = ("tidb", "local", "ivf")
+DEFAULT_SNAPSHOT_DIR = os.environ.get("VECTOR_SNAPSHOT_DIR", "vector_snapshots")
 
 
 class IndexInterface:
-    def __init__(self, db_name: str, vector_table_name: str, embedding_model_name: str=None):
+    def __init__(self, db_name: str, vector_table_name: str, embedding_model_name: str=None,
+                 backend: str="tidb", snapshot_dir: str=DEFAULT_SNAPSHOT_DIR, snapshot_dtype: str="float32",
+                 ivf_nlist: int=None, ivf_nprobe: int=8):
+        """
+        :param backend: Retrieval backend, 'tidb' (remote vector search), 'local' (in-process exact search
+                        over a memory-mapped snapshot of the TiDB table) or 'ivf' (in-process approximate
+                        search over the same snapshot). Writes always go to TiDB.
+        :param snapshot_dir: Directory holding local snapshots, one sub-directory per vector table.
+        :param snapshot_dtype: Storage dtype of local snapshots ('float32' or 'float16').
+        :param ivf_nlist: Number of IVF clusters (defaults to ~4 * sqrt(rows)).
+        :param ivf_nprobe: Number of IVF clusters scanned per query.
+        """
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unsupported vector backend '{backend}'. Use one of {VECTOR_BACKENDS}.")
+
         self.db_name = db_name
         self.vector_table_name = vector_table_name
+        self.backend = backend
+        self.snapshot_path = os.path.join(snapshot_dir, db_name, vector_table_name)
+        self.snapshot_dtype = snapshot_dtype
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
         self.index = None
+        self._write_index = None
 
         if embedding_model_name:
             self.embedding_model = HuggingFaceEmbedding(model_name=embedding_model_name)
@@ -30,21 +63,99 @@ class IndexInterface:
             query={"ssl_verify_cert": True, "ssl_verify_identity": True},
         )
 
-        self.tidbvec = TiDBVectorStore(
-            connection_string=self.tidb_connection_url,
-            table_name= self.vector_table_name,
-            distance_strategy="cosine",
-            vector_dimension=768, # SciBERT outputs 768-dimensional vectors
-            drop_existing_table=False,
-        )
+        # Filters on metadata keys materialised as indexed columns (see ensure_metadata_columns) are run against those columns.
+        # The engines the client builds while checking/creating the table all borrow one pooled connection,
+        # so constructing the 17 stores at startup does not open a TLS connection per engine.
+        self.engine = get_engine(self.tidb_connection_url)
+        with borrowed_connection_engine_args(self.tidb_connection_url) as engine_args:
+            self.tidbvec = IndexedMetadataTiDBVectorStore(
+                connection_string=self.tidb_connection_url,
+                table_name= self.vector_table_name,
+                distance_strategy="cosine",
+                vector_dimension=768, # SciBERT outputs 768-dimensional vectors
+                drop_existing_table=False,
+                engine_args=engine_args,
+            )
+            self._use_shared_engine()
+        self.tidbvec.set_indexed_columns(self.get_index_manager().get_metadata_columns(self.vector_table_name))
 
         # Set the storage context for Llama Index. Llama will use this context to store the documents, embeddings and index.
         # TiDB automatically persists the embeddings when you use it as your vector store.
         self.storage_context = StorageContext.from_defaults(vector_store=self.tidbvec)
 
+        # Store used for retrieval; the local backend answers queries from the on-disk snapshot
+        self.vector_store = self.tidbvec
+        if self.backend in ("local", "ivf"):
+            if not os.path.exists(self.snapshot_path):
+                self.refresh_local_snapshot()
+            if self.backend == "local":
+                self.vector_store = LocalNumpyVectorStore(self.snapshot_path)
+            else:
+                self.vector_store = IVFVectorStore(self.snapshot_path, nlist=self.ivf_nlist, nprobe=self.ivf_nprobe)
+                self.vector_store.ensure_trained()
+
+    def _use_shared_engine(self):
+        """
+        Point the vector store client at the process-wide engine for this database, so the 17 vector
+        tables share one connection pool instead of opening one each.
+
+        tidb-vector has no public way to pass in an engine; with tidb-vector==0.0.9 pinned in
+        requirements.txt the client keeps it in `TiDBVectorClient._bind`, which every query and
+        delete reads. Re-check this attribute when upgrading the package.
+        """
+        client = getattr(self.tidbvec, "_tidb", None)
+        own_engine = getattr(client, "_bind", None)
+        if isinstance(own_engine, Engine) and own_engine is not self.engine:
+            client._bind = self.engine
+            own_engine.dispose()  # Runs on the borrowed connection, which stays open
+
+    def get_index_manager(self):
+        return VectorIndexManager(self.db_name, engine=self.engine)
+
+    def ensure_vector_index(self, wait: bool = False):
+        """Make sure the table has a cosine HNSW vector index (and a TiFlash replica), optionally waiting for the build."""
+        manager = self.get_index_manager()
+        manager.create_vector_index(self.vector_table_name, distance="cosine")
+        if wait:
+            manager.wait_until_built(self.vector_table_name)
+        return manager.check_table(self.vector_table_name)
+
+    def ensure_metadata_columns(self, keys: List[str] = None):
+        """
+        Materialise metadata keys (source, year, PMCID by default) as indexed generated columns on this
+        table, backfilling the index, and route filters on those keys to the indexed columns.
+
+        :return: Metadata key -> indexed column.
+        """
+        indexed_columns = self.get_index_manager().ensure_metadata_columns(self.vector_table_name, keys=keys)
+        self.tidbvec.set_indexed_columns(indexed_columns)
+        return indexed_columns
+
     def get_index(self):
         return self.index
 
+    def refresh_local_snapshot(self):
+        """
+        Rebuild the local snapshot of this vector table from TiDB.
+        A loaded local store picks up the new snapshot immediately.
+        """
+        build_snapshot(get_engine(self.tidb_connection_url), self.vector_table_name, self.snapshot_path, dtype=self.snapshot_dtype)
+
+        vector_store = getattr(self, "vector_store", None)
+        if isinstance(vector_store, LocalNumpyVectorStore):
+            vector_store.load_snapshot()
+        if isinstance(vector_store, IVFVectorStore):
+            vector_store.train()
+
+    def insert_into_local_index(self, nodes):
+        """
+        Add newly ingested nodes (with embeddings) to the local/IVF store without a full refresh.
+        """
+        if not isinstance(self.vector_store, LocalNumpyVectorStore):
+            raise ValueError("Local inserts are only supported for the 'local' and 'ivf' backends.")
+        self.vector_store.add(nodes)
+        self.vector_store.persist()
+
     def load_index_from_vector_store(self):
         """
         Load index from vector store.
@@ -52,14 +163,14 @@ class IndexInterface:
         """
         start_time = time.time()
         self.index = VectorStoreIndex.from_vector_store(
-            vector_store=self.tidbvec,
+            vector_store=self.vector_store,
             embed_model=self.embedding_model
         )
 
         # End timing
         end_time = time.time()
         elapsed_time = end_time - start_time
-        print(f"Time taken to load the index: {elapsed_time:.2f} seconds for table {self.vector_table_name}")
+        print(f"Time taken to load the index: {elapsed_time:.2f} seconds for table {self.vector_table_name} ({self.backend} backend)")
 
     def load_index_if_exists(self):
         """
@@ -84,9 +195,57 @@ class IndexInterface:
             elapsed_time = end_time - start_time
             print(f"Time taken to load the index: {elapsed_time:.2f} seconds")
 
-    def create_index(self, documents:List[Document]):
+    @property
+    def manifest_stage(self):
+        return f"index:{self.vector_table_name}"
+
+    def delete_documents_by_source(self, source_ids, batch_size: int = 500):
+        """Delete all vectors whose metadata 'source' is in `source_ids`."""
+        source_ids = [str(x) for x in source_ids]
+        source_column = self.tidbvec.indexed_columns.get("source")
+        for start in range(0, len(source_ids), batch_size):
+            batch = source_ids[start:start + batch_size]
+            if source_column:
+                statement = text(f"DELETE FROM `{self.vector_table_name}` WHERE `{source_column}` IN :source_ids")
+                with self.engine.connect() as conn:
+                    conn.execute(statement.bindparams(bindparam("source_ids", expanding=True)), {"source_ids": batch})
+                    conn.commit()
+            else:
+                self.tidbvec._tidb.delete(filter={"source": {"$in": batch}})
+
+    def filter_unindexed_documents(self, documents:List[Document], manifest:IngestionManifest):
+        """
+        Keep the documents that are new or changed since they were last indexed into this table,
+        removing the stale vectors of those documents.
+
+        :return: (documents to index, source id -> content hash)
+        """
+        hashes = {
+            str(doc.metadata["source"]): hash_content(doc.text, json.dumps(doc.metadata, sort_keys=True, default=str))
+            for doc in documents
+        }
+        new_ids, changed_ids = manifest.diff(self.manifest_stage, hashes)
+        print(f"Incremental indexing of {self.vector_table_name}: {len(new_ids)} new, {len(changed_ids)} changed, "
+              f"{len(hashes) - len(new_ids) - len(changed_ids)} unchanged documents.")
+
+        # New ids are cleared as well, in case they were indexed before the manifest existed
+        pending_ids = new_ids | changed_ids
+        self.delete_documents_by_source(pending_ids)
+        documents = [doc for doc in documents if str(doc.metadata["source"]) in pending_ids]
+        return documents, {doc_id: hashes[doc_id] for doc_id in pending_ids}
+
+    def create_index(self, documents:List[Document], manifest:IngestionManifest=None):
+        """
+        :param manifest: Optional IngestionManifest; documents unchanged since they were last indexed into
+            this table are skipped, and changed documents replace their previous vectors.
+        """
         assert isinstance(documents, list), "Documents must be a list of Document objects"
 
+        if manifest is not None:
+            documents, indexed_hashes = self.filter_unindexed_documents(documents, manifest)
+            if not documents:
+                return
+
         # Load data and create index
         start_time = time.time()
         self.index = VectorStoreIndex.from_documents(
@@ -98,4 +257,122 @@ class IndexInterface:
         # End timing
         end_time = time.time()
         elapsed_time = end_time - start_time
-        print(f"Time taken to create the index: {elapsed_time:.2f} seconds")
\ No newline at end of file
+        print(f"Time taken to create the index: {elapsed_time:.2f} seconds")
+
+        if manifest is not None:
+            manifest.record(self.manifest_stage, indexed_hashes)
+
+    def get_write_index(self):
+        """Index over the TiDB table used for inserts; writes always go to TiDB, whatever backend serves queries."""
+        if self._write_index is None:
+            self._write_index = VectorStoreIndex.from_vector_store(vector_store=self.tidbvec, embed_model=self.embedding_model)
+        return self._write_index
+
+    def index_batch(self, documents:List[Document], manifest:IngestionManifest=None) -> int:
+        """
+        Chunk, embed and insert one batch of documents.
+
+        :param manifest: Optional IngestionManifest, as in `create_index`.
+        :return: Number of documents written.
+        """
+        if manifest is not None:
+            documents, indexed_hashes = self.filter_unindexed_documents(documents, manifest)
+        if documents:
+            nodes = run_transformations(documents, Settings.transformations)
+            self.get_write_index().insert_nodes(nodes)
+        if manifest is not None:
+            manifest.record(self.manifest_stage, indexed_hashes)
+        return len(documents)
+
+    def create_index_from_batches(self, document_batches:Iterable[List[Document]], manifest:IngestionManifest=None):
+        """
+        Create/append to the index from an iterator of Document batches (e.g. `loader.iter_documents()`),
+        chunking, embedding and writing one batch at a time so memory stays flat.
+
+        :param manifest: Optional IngestionManifest, as in `create_index`.
+        """
+        if self.index is None:
+            self.index = self.get_write_index()
+
+        start_time = time.time()
+        total_documents = 0
+        for batch_number, documents in enumerate(document_batches):
+            total_documents += self.index_batch(documents, manifest)
+            elapsed_time = time.time() - start_time
+            print(f"Batch {batch_number}: {total_documents} documents indexed into {self.vector_table_name} "
+                  f"in {elapsed_time:.2f} seconds")
+
+    def remove_missing_documents(self, manifest:IngestionManifest, seen_source_ids):
+        """
+        Delete the vectors of documents recorded as indexed in this table but no longer present upstream.
+
+        :param seen_source_ids: All source ids of the current upstream documents.
+        :return: Set of removed source ids.
+        """
+        removed_ids = manifest.fetch_document_ids(self.manifest_stage) - {str(x) for x in seen_source_ids}
+        if removed_ids:
+            self.delete_documents_by_source(removed_ids)
+            manifest.remove(self.manifest_stage, removed_ids)
+        print(f"Removed {len(removed_ids)} documents no longer upstream from {self.vector_table_name}.")
+        return removed_ids
+
+    def sync_index(self, document_batches, manifest:IngestionManifest, delete_removed:bool=True, is_complete=None):
+        """
+        Delta indexing: bring this vector table in line with the upstream documents.
+        Only new or changed documents are embedded; documents removed upstream are deleted.
+        The manifest stage `index:<table>` acts as the watermark of what is indexed.
+
+        :param document_batches: List of Document objects or an iterator of Document batches.
+        :param delete_removed: Delete documents that are indexed but absent from `document_batches`.
+        :param is_complete: Optional callable run after streaming (e.g. `loader.scan_was_complete`);
+            documents are only deleted if it returns True.
+        :return: Dict with the number of written and removed documents.
+        """
+        if isinstance(document_batches, list) and (not document_batches or isinstance(document_batches[0], Document)):
+            document_batches = [document_batches]
+
+        start_time = time.time()
+        seen_source_ids = set()
+        written = 0
+        for documents in document_batches:
+            seen_source_ids.update(str(doc.metadata["source"]) for doc in documents)
+            written += self.index_batch(documents, manifest)
+
+        if delete_removed and is_complete is not None and not is_complete():
+            print(f"Skipping deletes on {self.vector_table_name}: the document stream was incomplete.")
+            delete_removed = False
+        removed = self.remove_missing_documents(manifest, seen_source_ids) if delete_removed else set()
+
+        elapsed_time = time.time() - start_time
+        print(f"Synced {self.vector_table_name} in {elapsed_time:.2f} seconds: {written} documents written, "
+              f"{len(removed)} removed, {len(seen_source_ids) - written} unchanged")
+        return {"written": written, "removed": len(removed)}
+
+    def bulk_create_index(self, documents:List[Document]=None, nodes:List[BaseNode]=None, batch_size:int=500,
+                          parallelism:int=4, embed_batch_size:int=256, manifest:IngestionManifest=None):
+        """
+        High-throughput index build: documents are chunked into nodes, embedded batch by batch and
+        written with multi-row INSERTs over `parallelism` concurrent connections while the next
+        batch is being embedded. Nodes that already carry embeddings are written as they are.
+
+        :param batch_size: Rows per INSERT.
+        :param parallelism: Concurrent writer connections.
+        :param embed_batch_size: Nodes embedded per call to the embedding model.
+        :param manifest: Optional IngestionManifest, as in `create_index` (documents only).
+        """
+        nodes = list(nodes or [])
+        if documents:
+            if manifest is not None:
+                documents, indexed_hashes = self.filter_unindexed_documents(documents, manifest)
+            nodes += run_transformations(documents, Settings.transformations)
+        if not nodes:
+            return 0
+
+        # Writers draw their connections from the shared pool (parallelism should not exceed its size)
+        writer = VectorBulkWriter(get_engine(self.tidb_connection_url), self.vector_table_name,
+                                  batch_size=batch_size, parallelism=parallelism)
+        rows_written = writer.write_batches(embed_node_batches(nodes, self.embedding_model, embed_batch_size))
+
+        if documents and manifest is not None:
+            manifest.record(self.manifest_stage, indexed_hashes)
+        return rows_written
@@ -0,0 +1,177 @@
+## Concurrent, rate-limited LLM enhancement of PICO terms with a persistent response cache.
+## Enhanced PICO generation sends one chat completion per abstract; this engine runs them on asyncio
+## with bounded concurrency, a token-bucket rate limit and retry with backoff, and never pays twice
+## for the same prompt thanks to an on-disk cache keyed by prompt hash.
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+import openai
+
+from lamatidb.interfaces.rate_limiting import TokenBucket
+
+
+def build_enhancement_prompt(terms, text: str) -> str:
+    return f"""For the given PICO Extraction (Patient, Intervention, Outcome) look at the source abstract and give me a short sentence that accurately represents PICO for the document. 
+    You should return a dictionary with {{'pico_i': 'Generated Sentence Related to Intervention', 'pico_p': 'Generated Sentence Related to study Participant', 'pico_o': 'Generated Sentence Related to study Outputs', 'pico_c': 'Generated Sentence Related to Comparison'}}.
+    The PICO terms are: {terms}
+    The full abstract is: {text}"""
+
+
+def parse_enhanced_text(generated_text: Optional[str]) -> Dict[str, Optional[str]]:
+    """Extract the pico_* sentences from the LLM response."""
+
+    def extract_value(text, key):
+        # Use regex to find the pattern for the key and its associated value
+        pattern = rf"'{key}':\s*'(.*?)'"
+        match = re.search(pattern, text)
+        if match:
+            return match.group(1).replace("\\'", "'")
+        return None
+
+    generated_text = generated_text or ""
+    return {
+        'pico_i': extract_value(generated_text, 'pico_i'),
+        'pico_p': extract_value(generated_text, 'pico_p'),
+        'pico_o': extract_value(generated_text, 'pico_o'),
+        'pico_c': extract_value(generated_text, 'pico_c')
+    }
+
+
+class ResponseCache:
+    """On-disk cache of LLM responses keyed by a hash of (model, prompt)."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)["response"]
+
+    def put(self, key: str, response: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"response": response, "created_at": time.time()}, f)
+        os.replace(tmp_path, path)
+
+
+class AsyncPICOEnhancer:
+    """
+    Generates enhanced PICO sentences for many abstracts concurrently.
+
+    Works with the OpenAI API, any OpenAI-compatible server (set `base_url`, e.g. a local
+    stand-in for testing), or the local LlamaIndex LLM from `Settings.llm` (`local_llm=True`).
+    """
+
+    def __init__(self, model: str = "gpt-3.5-turbo", max_concurrency: int = 8, requests_per_second: float = 5.0,
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 cache_dir: str = "datalake/llm_cache", base_url: str = None, api_key: str = None,
+                 local_llm: bool = False):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.base_url = base_url
+        self.api_key = api_key
+        self.local_llm = local_llm
+        self.cache = ResponseCache(cache_dir)
+        self.cache_hits = 0
+        self.requests = 0
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Only transient API failures are retried: connection errors, timeouts, 429 and 5xx responses."""
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return False
+
+    async def _complete(self, client, prompt: str) -> str:
+        if self.local_llm:
+            #  Local LLM is gathered from initialised Llama Settings from the program
+            from llama_index.core import Settings
+            response = await Settings.llm.acomplete(prompt)
+            return response.text
+
+        completion = await client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return completion.choices[0].message.content
+
+    async def _enhance_one(self, client, semaphore, bucket, prompt: str) -> str:
+        cache_key = ResponseCache.key("local" if self.local_llm else self.model, prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await bucket.aacquire()
+                try:
+                    self.requests += 1
+                    generated_text = await self._complete(client, prompt)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not self._is_retryable(e):
+                        raise
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * (0.5 + random.random() / 2)
+                    print(f"LLM request failed ({e}); retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                    await asyncio.sleep(delay)
+
+        self.cache.put(cache_key, generated_text)
+        return generated_text
+
+    async def aenhance(self, texts: List[str], terms: List[dict]) -> List[Dict[str, Optional[str]]]:
+        """Enhance PICO terms for each abstract; failed requests yield a dict of None values."""
+        start_time = time.time()
+        client = None if self.local_llm else openai.AsyncOpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        bucket = TokenBucket(self.requests_per_second)
+
+        prompts = [build_enhancement_prompt(term, text) for text, term in zip(texts, terms)]
+        responses = await asyncio.gather(
+            *(self._enhance_one(client, semaphore, bucket, prompt) for prompt in prompts),
+            return_exceptions=True
+        )
+        if client is not None:
+            await client.close()
+
+        results = []
+        for response in responses:
+            if isinstance(response, Exception):
+                print(f"PICO enhancement failed: {response}")
+                response = None
+            results.append(parse_enhanced_text(response))
+
+        elapsed_time = time.time() - start_time
+        print(f"Enhanced {len(prompts)} abstracts in {elapsed_time:.2f} seconds "
+              f"({self.cache_hits} cache hits, {self.requests} requests so far)")
+        return results
+
+    def enhance(self, texts: List[str], terms: List[dict]) -> List[Dict[str, Optional[str]]]:
+        """Synchronous entry point for the ingestion pipelines."""
+        return asyncio.run(self.aenhance(texts, terms))
@@ -3,7 +3,8 @@ from transformers import AutoTokenizer
 from adapters import AutoAdapterModel
 import adapters
 import openai
-import re
+import numpy as np
+from lamatidb.interfaces.llm_enhancer import build_enhancement_prompt, parse_enhanced_text
 
 # Define the class labels based on your model's label mapping
 label2id = {
@@ -13,6 +14,48 @@ label2id = {
     3: "I-PAR"
 }
 
+def threshold_predictions(probabilities, threshold=0.7):
+    """
+    Batch-level argmax over label probabilities; tokens whose best probability is below
+    the threshold are classified as 'O' (0).
+
+    :param probabilities: Tensor of shape (batch, seq_len, num_labels).
+    :return: Integer numpy array of shape (batch, seq_len).
+    """
+    max_probs, predicted_labels = torch.max(probabilities, dim=-1)
+    predicted_labels = predicted_labels.masked_fill(max_probs < threshold, 0)
+    return predicted_labels.cpu().numpy()
+
+def extract_spans(texts, predictions, offset_mapping):
+    """
+    Extract labelled spans directly from the original texts using token offsets.
+    Contiguous tokens with the same label are merged into a single span; special and
+    padding tokens (empty offsets) never belong to a span.
+
+    :param texts: Original input texts.
+    :param predictions: Integer array (batch, seq_len) of predicted labels.
+    :param offset_mapping: Array (batch, seq_len, 2) of character offsets into each text.
+    :return: One dict per text of label name -> list of extracted terms.
+    """
+    all_extracted_terms = []
+    for text, labels, offsets in zip(texts, predictions, offset_mapping):
+        extracted_terms = {label: [] for label in label2id.values()}
+        labels = np.where(offsets[:, 1] > offsets[:, 0], labels, 0)
+
+        # Segment boundaries are where the label changes
+        boundaries = np.flatnonzero(np.diff(labels)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(labels)]))
+        labelled = labels[starts] != 0
+
+        for start, end, label in zip(starts[labelled], ends[labelled], labels[starts][labelled]):
+            term = text[offsets[start][0]:offsets[end - 1][1]].strip()
+            if term:
+                extracted_terms[label2id[int(label)]].append(term)
+
+        all_extracted_terms.append(extracted_terms)
+    return all_extracted_terms
+
 class PICO:
     def __init__(self, model_name="allenai/scibert_scivocab_uncased", adapter_name="reginaboateng/Compacter_SciBert_adapter_ner_pico_for_classification_task"):
         self.model_name = model_name
@@ -36,37 +79,12 @@ class PICO:
             outputs = self.model(input_ids, attention_mask=attention_mask)
             probabilities = torch.nn.functional.softmax(outputs.logits, dim=-1)
 
-        predictions = []
-        for sequence_probs in probabilities:
-            sequence_predictions = []
-            for token_probs in sequence_probs:
-                max_prob, predicted_label = torch.max(token_probs, dim=-1)
-                if max_prob >= threshold:
-                    sequence_predictions.append(predicted_label.item())
-                else:
-                    sequence_predictions.append(0)  # Classify as 'O' if below threshold
-            predictions.append(sequence_predictions)
+        predictions = threshold_predictions(probabilities, threshold=threshold)
 
         return predictions, input_ids.cpu().numpy(), encoded_inputs['offset_mapping'].cpu().numpy()
 
-    def extract_terms(self, predictions, input_ids, offset_mapping):
-        all_extracted_terms = []
-        for i, sequence in enumerate(predictions):
-            extracted_terms = {label: [] for label in label2id.values()}
-            tokens = self.tokenizer.convert_ids_to_tokens(input_ids[i])
-
-            for token, prediction, offset in zip(tokens, sequence, offset_mapping[i]):
-                if token.startswith("##"):  # Handle WordPiece tokens
-                    if extracted_terms[label2id[prediction]]:
-                        extracted_terms[label2id[prediction]][-1] += token[2:]
-                else:
-                    if label2id[prediction] != "O":  # Skip 'O' (Outside) labels
-                        start, end = offset
-                        term = self.tokenizer.decode(input_ids[i][start:end]).strip()
-                        extracted_terms[label2id[prediction]].append(term)
-
-            all_extracted_terms.append(extracted_terms)
-        return all_extracted_terms
+    def extract_terms(self, texts, predictions, offset_mapping):
+        return extract_spans(texts, predictions, offset_mapping)
 
     def clean_extracted_terms(self, extracted_terms):
         cleaned_terms = {}
@@ -103,10 +121,7 @@ class PICO:
             client = openai.Client()
 
         for i, terms in enumerate(cleaned_terms):
-            prompt = f"""For the given PICO Extraction (Patient, Intervention, Outcome) look at the source abstract and give me a short sentence that accurately represents PICO for the document. 
-    You should return a dictionary with {{'pico_i': 'Generated Sentence Related to Intervention', 'pico_p': 'Generated Sentence Related to study Participant', 'pico_o': 'Generated Sentence Related to study Outputs', 'pico_c': 'Generated Sentence Related to Comparison'}}.
-    The PICO terms are: {terms}
-    The full abstract is: {texts[i]}"""
+            prompt = build_enhancement_prompt(terms, texts[i])
 
             if local_llm:
                 # Generate response using the local LLM
@@ -121,49 +136,51 @@ class PICO:
             )
                 generated_text = completion.choices[0].message.content
 
-
-            # Define a function to extract the value associated with a specific key
-            def extract_value(text, key):
-                # Use regex to find the pattern for the key and its associated value
-                pattern = f"'{key}':\s*'(.*?)'"
-                match = re.search(pattern, text)
-                if match:
-                    return match.group(1).replace("\\'", "'")
-                return None
-
             # Extract values for specific keys
-            i_int_value = extract_value(generated_text, 'pico_i')
-            i_par_value = extract_value(generated_text, 'pico_p')
-            i_out_value = extract_value(generated_text, 'pico_o')
-            i_com_value = extract_value(generated_text, 'pico_c')
-
-            # Store the results in a dictionary
-            result_dict = {
-                'pico_i': i_int_value,
-                'pico_p': i_par_value,
-                'pico_o': i_out_value,
-                'pico_c': i_com_value
-            }
-
-            enhanced_texts.append(result_dict)
+            enhanced_texts.append(parse_enhanced_text(generated_text))
 
         return enhanced_texts
 
 class Metadata:
-    def __init__(self):
+    def __init__(self, enhancer=None):
+        """
+        :param enhancer: Optional AsyncPICOEnhancer used for enhanced PICO (concurrent, rate-limited, cached).
+                         Without it, enhancement runs one request at a time through PICO.enhance_text.
+        """
         self.pico = PICO()
+        self.enhancer = enhancer
 
     def process_text(self, texts, enhanced_pico=False, local_llm=False):
         predictions, input_ids, offset_mapping = self.pico.classify_texts(texts, threshold=0.7)
-        extracted_terms = self.pico.extract_terms(predictions, input_ids, offset_mapping)
+        extracted_terms = self.pico.extract_terms(texts, predictions, offset_mapping)
         cleaned_terms =[self.pico.clean_extracted_terms(x) for x in extracted_terms]
         
         if enhanced_pico:
-            enhanced_terms = self.pico.enhance_text(texts, extracted_terms, local_llm=local_llm)
+            if self.enhancer:
+                enhanced_terms = self.enhancer.enhance(texts, extracted_terms)
+            else:
+                enhanced_terms = self.pico.enhance_text(texts, extracted_terms, local_llm=local_llm)
             return cleaned_terms, enhanced_terms
         else:
             return cleaned_terms, None
 
+    def iter_process_batches(self, texts, batch_size=32, enhanced_pico=False, local_llm=False):
+        """
+        Process texts in batches grouped by token length, so each forward pass pads to a similar length.
+
+        Yields (batch_indices, cleaned_terms, enhanced_terms) as each batch completes, where
+        batch_indices are positions in `texts` and enhanced_terms is None unless enhanced_pico is set.
+        """
+        lengths = [len(ids) for ids in self.pico.tokenizer(texts, truncation=True, max_length=512)['input_ids']]
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            cleaned_terms, enhanced_terms = self.process_text(
+                [texts[i] for i in batch_indices], enhanced_pico=enhanced_pico, local_llm=local_llm
+            )
+            yield batch_indices, cleaned_terms, enhanced_terms
+
 # Debug viewer
 #sample_dict['16625676']['text']
 # Example Usage:
@@ -3,7 +3,6 @@ import uuid
 import hashlib
 import base64
 import pandas as pd
-import xml.etree.ElementTree as ET
 import requests
 import time
 import pickle
@@ -12,7 +11,19 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from lamatidb.interfaces.database_interfaces.database_interface import DatabaseInterface
 from lamatidb.interfaces.metadata_interface import Metadata
-from sqlalchemy import text
+from lamatidb.interfaces.cache_interfaces.pdf_availability_cache import invalidate_pdf_availability
+from lamatidb.interfaces.mysql_ingestors.bulk_writers import get_bulk_writer, MultiRowInsertWriter
+from lamatidb.interfaces.blob_stores.pdf_blob_store import get_pdf_blob_store
+from lamatidb.interfaces.mysql_ingestors.pmcid_index import PMCIDIndex
+from lamatidb.interfaces.mysql_ingestors.fulltext_parser import parse_nxml_text, iter_parsed_fulltext
+from lamatidb.interfaces.mysql_ingestors.ingestion_manifest import (
+    IngestionManifest, compute_content_hashes, hash_content, DOCUMENT_STAGE, PICO_STAGE, PICO_ENHANCED_STAGE,
+    FULLTEXT_STAGE
+)
+from sqlalchemy import text, bindparam
+
+DEFAULT_PMCID_INDEX_DIR = 'datalake/pubmed/pmcid_index'
+LEGACY_PMCID_PICKLE = 'datalake/pubmed/pmcid_dict.pkl'
 
 def generate_short_uuid():
     # Generate a UUID4 and take the first 16 characters as a hexadecimal number
@@ -46,20 +57,78 @@ def generate_hash_key(input_str, length=16):
     
     return numeric_hash
 
+PICO_COLUMN_MAX_LENGTHS = {
+    'pico_p': 200,  # Truncate to 200 characters
+    'pico_o': 200,  # Adjust as needed
+    'pico_i': 200,  # Adjust as needed
+    'pico_c': 200   # Adjust as needed, even though we set it to None initially
+}
+
+def clean_pico_frame(pico_df: pd.DataFrame, column_max_lengths: dict = None, default_max_length: int = 255) -> pd.DataFrame:
+    """
+    Column-wise cleaning of PICO rows before writing them to the datastore:
+    lists are joined into comma-separated strings (empty lists become None),
+    strings are truncated to fit the column size and NaN/None values become None.
+
+    :param pico_df: DataFrame of PICO terms.
+    :param column_max_lengths: A dictionary specifying the maximum length for each column.
+    :param default_max_length: Maximum length for columns not listed in `column_max_lengths`.
+    :return: Cleaned copy of the DataFrame.
+    """
+    column_max_lengths = column_max_lengths or {}
+    cleaned = pd.DataFrame(index=pico_df.index)
+
+    for col in pico_df.columns:
+        series = pico_df[col]
+        if series.dtype == object:
+            is_list = series.map(type) == list
+            if is_list.any():
+                joined = series[is_list].str.join(', ')
+                series = series.where(~is_list, joined.where(joined != '', None))
+            is_str = series.map(type) == str
+            if is_str.any():
+                max_length = column_max_lengths.get(col, default_max_length)
+                series = series.where(~is_str, series[is_str].str.slice(0, max_length))
+        cleaned[col] = series
+
+    return cleaned.astype(object).where(cleaned.notnull(), None)
+
 class Ingestor:
-    def __init__(self, db_type, db_name):
-        self.mysql_interface = DatabaseInterface(db_type=db_type, db_name=db_name)
+    def __init__(self, db_type, db_name, pico_enhancer=None, write_method="to_sql", chunk_size=1000):
+        """
+        :param write_method: How insert_data writes DataFrames: 'to_sql' (pandas, default),
+            'multirow' (multi-row INSERT batches), 'load_data' (LOAD DATA LOCAL INFILE) or 'executemany'.
+        :param chunk_size: Rows per statement/commit for the bulk write methods.
+        """
+        self.mysql_interface = DatabaseInterface(db_type=db_type, db_name=db_name, local_infile=(write_method == "load_data"))
         self.mysql_interface.setup_database()
         self.engine = self.mysql_interface.engine
-        self.metadata_processor = Metadata()  # Initialize the Metadata class
+        self.metadata_processor = Metadata(enhancer=pico_enhancer)  # Initialize the Metadata class
+        self.chunk_size = chunk_size
+        self.bulk_writer = None if write_method == "to_sql" else get_bulk_writer(write_method, chunk_size=chunk_size)
 
     def insert_data(self, session: Session, table_name: str, data: pd.DataFrame):
+        if self.bulk_writer is not None:
+            self.bulk_writer.write(session.bind, table_name, data)
+            return
         try:
             data.to_sql(table_name, con=session.bind, if_exists='append', index=False)
             print(f"Data inserted into {table_name} successfully, {len(data)} records.")
         except IntegrityError as e:
             print(f"Data insertion failed: {e}")
 
+    def upsert_data(self, session: Session, table_name: str, data: pd.DataFrame):
+        """Insert rows, overwriting existing rows with the same primary key (used by incremental ingestion)."""
+        MultiRowInsertWriter(chunk_size=self.chunk_size, on_duplicate_update=True).write(session.bind, table_name, data)
+
+    def delete_documents(self, session: Session, table_name: str, document_ids: list, batch_size: int = 1000):
+        query = text(f"DELETE FROM `{table_name}` WHERE documentId IN :document_ids").bindparams(
+            bindparam("document_ids", expanding=True))
+        document_ids = [str(x) for x in document_ids]
+        for start in range(0, len(document_ids), batch_size):
+            session.execute(query, {"document_ids": document_ids[start:start + batch_size]})
+        session.commit()
+
     def process_csv(self, csv_file: str):
         raise NotImplementedError("Subclasses should implement this method.")
 
@@ -116,20 +185,67 @@ class Ingestor:
         else:
             print(f"Mapping for document '{document_id}' in database '{database_id}' already exists.")
 
+    def create_mappings_bulk(self, database_id: str, document_ids: list, batch_size: int = 1000):
+        """
+        Set-based alternative to get_mapping_if_not_exists: stage all (documentId, databaseId) pairs and
+        write them with batched INSERT IGNORE statements. The hashKey is derived from the pair, so
+        existing mappings are skipped by the primary key without a per-document lookup.
+
+        :param database_id: The ID of the logical document database.
+        :param document_ids: IDs of the documents to map.
+        :return: Number of new mappings inserted.
+        """
+        database_id_str = str(database_id)
+        document_ids = list(dict.fromkeys(str(x) for x in document_ids))
+        rows = [
+            {'hashKey': generate_hash_key(document_id + database_id_str), 'documentId': document_id, 'databaseId': database_id_str}
+            for document_id in document_ids
+        ]
+        query = text("""
+            INSERT IGNORE INTO `DocumentDatabaseMapping` (hashKey, documentId, databaseId)
+            VALUES (:hashKey, :documentId, :databaseId)
+        """)
+
+        start_time = time.time()
+        inserted = 0
+        with self.mysql_interface.get_session() as session:
+            for start in range(0, len(rows), batch_size):
+                result = session.execute(query, rows[start:start + batch_size])
+                session.commit()
+                inserted += max(result.rowcount, 0)
+
+        elapsed_time = time.time() - start_time
+        print(f"Document mappings for database '{database_id}': {inserted} new, "
+              f"{len(rows) - inserted} already existed ({elapsed_time:.2f} seconds).")
+        return inserted
+
 # Example subclass for abstract ingestion
 class AbstractIngestor(Ingestor):
 
-    def __init__(self, db_type='tidb', db_name='test_creation'):
-        super().__init__(db_type=db_type, db_name=db_name)
+    def __init__(self, db_type='tidb', db_name='test_creation', pico_enhancer=None, write_method="to_sql", chunk_size=1000):
+        super().__init__(db_type=db_type, db_name=db_name, pico_enhancer=pico_enhancer,
+                         write_method=write_method, chunk_size=chunk_size)
         self.database_id = None
 
-    def process_csv(self, csv_file: str, database_description=None, enhanced_pico=False):
-
+    def process_csv(self, csv_file: str, database_description=None, enhanced_pico=False, pico_batch_size=None, incremental=False,
+                    map_documents=False):
+        """
+        :param incremental: Skip documents whose content hash is unchanged since the last run and
+            upsert new/changed ones; PICO is only re-extracted for new/changed abstracts.
+        :param map_documents: Map every document to the logical database in DocumentDatabaseMapping.
+        """
         database_name = os.path.basename(os.path.dirname(csv_file))
         self.database_id = self.ensure_database_exists(database_name, description=database_description)
 
         df = pd.read_csv(csv_file)
 
+        if incremental:
+            self.process_csv_incremental(df, enhanced_pico=enhanced_pico, pico_batch_size=pico_batch_size)
+            # Mappings reference Document, so they are written once the documents exist
+            if map_documents:
+                self.create_mappings_bulk(self.database_id, df['PMID'].tolist())
+            return
+
         # Process and insert data into the Document table
         document_data = df[['PMID', 'Title', 'Authors', 'Publication Year']].copy()
         document_data.columns = ['documentId', 'title', 'author', 'year']
@@ -143,24 +259,110 @@ class AbstractIngestor(Ingestor):
             self.insert_data(session, 'Document', document_data)
             self.insert_data(session, 'DocumentAbstract', document_abstract_data)
 
-            # Not active for DEMO - will only be loading pre-existing IDs
-            # # Accumulate mappings and add new ones to database
-            # mappings_to_add = [self.get_mapping_if_not_exists(session, self.database_id, str(x)) 
-            #                 for x in document_data['documentId']]
-            # # Remove None values from the list
-            # mappings_to_add = [x for x in mappings_to_add if x]
+        # Mappings reference Document, so they are written once the documents exist
+        if map_documents:
+            self.create_mappings_bulk(self.database_id, document_data['documentId'].tolist())
+
+        # After processing CSV, process PICO metadata
+        self.process_pico_metadata(csv_file, enhanced_pico, batch_size=pico_batch_size)
 
-            # # Convert the list of dictionaries to a DataFrame
-            # mappings_df = pd.DataFrame(mappings_to_add)
+    def process_csv_incremental(self, df: pd.DataFrame, enhanced_pico=False, pico_batch_size=None):
+        """
+        Idempotent ingestion of a PubMed CSV frame using the IngestionManifest content hashes.
+        """
+        manifest = IngestionManifest(self.mysql_interface)
+        df = df.drop_duplicates(subset='PMID', keep='last').copy()
+        df['PMID'] = df['PMID'].astype(str)
+
+        document_hashes = dict(zip(df['PMID'], compute_content_hashes(df, ['PMID', 'Title', 'Authors', 'Abstract', 'Publication Year'])))
+        new_ids, changed_ids = manifest.diff(DOCUMENT_STAGE, document_hashes)
+        print(f"Incremental ingestion: {len(new_ids)} new, {len(changed_ids)} changed, "
+              f"{len(df) - len(new_ids) - len(changed_ids)} unchanged documents.")
+
+        changed_df = df[df['PMID'].isin(new_ids | changed_ids)]
+        if not changed_df.empty:
+            document_data = changed_df[['PMID', 'Title', 'Authors', 'Publication Year']].copy()
+            document_data.columns = ['documentId', 'title', 'author', 'year']
+
+            document_abstract_data = changed_df[['PMID', 'Abstract']].copy()
+            document_abstract_data.columns = ['documentId', 'abstract']
+
+            # Upserts also cover rows ingested before the manifest existed
+            with self.mysql_interface.get_session() as session:
+                self.upsert_data(session, 'Document', document_data)
+                self.upsert_data(session, 'DocumentAbstract', document_abstract_data)
+            manifest.record(DOCUMENT_STAGE, {doc_id: document_hashes[doc_id] for doc_id in changed_df['PMID']})
+
+        # PICO only depends on the abstract, so metadata-only changes do not re-run the model.
+        # The PICO stages are diffed over the whole frame, so documents whose extraction failed on an
+        # earlier run (after their document stage was recorded) are retried.
+        abstract_data = df[['PMID', 'Abstract']].copy()
+        abstract_data.columns = ['documentId', 'abstract']
+        pico_hashes = dict(zip(abstract_data['documentId'], compute_content_hashes(abstract_data, ['abstract'])))
+        pico_ids = set().union(*manifest.diff(PICO_STAGE, pico_hashes))
+        if enhanced_pico:
+            # Enhanced terms have their own stage: raw-only runs never touch DocumentPICO_enhanced
+            pico_ids |= set().union(*manifest.diff(PICO_ENHANCED_STAGE, pico_hashes))
+        if not pico_ids:
+            return
 
-            # if not mappings_df.empty:
-            #     self.insert_data(session, 'DocumentDatabaseMapping', mappings_df)
-                
+        with self.mysql_interface.get_session() as session:
+            self.delete_documents(session, 'DocumentPICO_raw', list(pico_ids))
+            if enhanced_pico:
+                self.delete_documents(session, 'DocumentPICO_enhanced', list(pico_ids))
+        self.process_pico_metadata_batched(abstract_data[abstract_data['documentId'].isin(pico_ids)],
+                                           batch_size=pico_batch_size or 32, enhanced_pico=enhanced_pico)
+        pico_stage_hashes = {doc_id: pico_hashes[doc_id] for doc_id in pico_ids}
+        manifest.record(PICO_STAGE, pico_stage_hashes)
+        if enhanced_pico:
+            manifest.record(PICO_ENHANCED_STAGE, pico_stage_hashes)
+
+    def process_csv_chunked(self, csv_file: str, chunksize: int = 5000, database_description=None,
+                            enhanced_pico=False, pico_batch_size: int = 32, map_documents=False):
+        """
+        Streaming ingestion: read the CSV in fixed-size chunks and write Document, DocumentAbstract
+        and PICO rows per chunk, so peak memory is bounded by the chunk size rather than the file size.
 
-        # After processing CSV, process PICO metadata
-        self.process_pico_metadata(csv_file, enhanced_pico)
+        :param chunksize: Number of CSV rows per chunk.
+        :param pico_batch_size: Number of abstracts per PICO model forward pass.
+        """
+        database_name = os.path.basename(os.path.dirname(csv_file))
+        self.database_id = self.ensure_database_exists(database_name, description=database_description)
+
+        columns = ['PMID', 'Title', 'Authors', 'Abstract', 'Publication Year']
+        start_time = time.time()
+        total_rows = 0
 
-    def process_pico_metadata(self, csv_filepath:str, enhanced_pico:bool=False, local_llm:bool=False):
+        for chunk_number, df in enumerate(pd.read_csv(csv_file, usecols=columns, chunksize=chunksize)):
+            chunk_start = time.time()
+
+            document_data = df[['PMID', 'Title', 'Authors', 'Publication Year']].copy()
+            document_data.columns = ['documentId', 'title', 'author', 'year']
+
+            document_abstract_data = df[['PMID', 'Abstract']].copy()
+            document_abstract_data.columns = ['documentId', 'abstract']
+
+            with self.mysql_interface.get_session() as session:
+                self.insert_data(session, 'Document', document_data)
+                self.insert_data(session, 'DocumentAbstract', document_abstract_data)
+
+            if map_documents:
+                self.create_mappings_bulk(self.database_id, document_data['documentId'].tolist())
+
+            self.process_pico_metadata_batched(document_abstract_data, batch_size=pico_batch_size, enhanced_pico=enhanced_pico)
+
+            total_rows += len(df)
+            chunk_time = time.time() - chunk_start
+            print(f"Chunk {chunk_number}: {len(df)} rows in {chunk_time:.2f}s ({len(df) / chunk_time:.1f} rows/sec), "
+                  f"{total_rows} rows total ({total_rows / (time.time() - start_time):.1f} rows/sec overall)")
+
+    def process_pico_metadata(self, csv_filepath:str, enhanced_pico:bool=False, local_llm:bool=False, batch_size:int=None):
+        """
+        Extract PICO metadata for every abstract in the CSV and write it to the DocumentPICO_ tables.
+
+        :param batch_size: If set, abstracts are grouped by token length into batches of this size,
+                           classified one batch at a time, and each batch is written as it completes.
+        """
 
         df = pd.read_csv(csv_filepath)
 
@@ -168,6 +370,10 @@ class AbstractIngestor(Ingestor):
         document_data = df[['PMID', 'Title', 'Authors', 'Abstract', 'Publication Year']].copy()
         document_data.columns = ['documentId', 'title', 'author', 'abstract', 'year']
 
+        if batch_size:
+            self.process_pico_metadata_batched(document_data, batch_size=batch_size, enhanced_pico=enhanced_pico, local_llm=local_llm)
+            return
+
         # Process each abstract to extract PICO metadata
         bulk_insert_data = {'raw': [], 'enhanced': []}
 
@@ -193,40 +399,45 @@ class AbstractIngestor(Ingestor):
                     term.update({'documentId': document_id})
                     bulk_insert_data[label].append(term)
 
-        # tmp functions to clean pico data so we can write it to datastore.
-        def truncate_text(text, max_length):
-            """
-            Truncate the text to ensure it doesn't exceed the maximum length.
-            """
-            if isinstance(text, str) and len(text) > max_length:
-                return text[:max_length]  # Truncate the text if it's too long
-            return text
-
-        def clean_non_scalar(row, column_lengths):
-            """
-            Cleans the row, converting lists to strings, ensuring scalar values, 
-            and truncating text fields to fit within database limits.
-            
-            :param row: Row from the DataFrame.
-            :param column_lengths: A dictionary specifying the maximum length for each column.
-            """
-            for col in row.index:
-                max_length = column_lengths.get(col, 255)  # Default max length to 255 if not specified
-                if isinstance(row[col], list):  # Convert list to string
-                    row[col] = ', '.join(row[col]) if row[col] else None
-                elif isinstance(row[col], str):  # Truncate text to fit column size
-                    row[col] = truncate_text(row[col], max_length)
-                elif pd.isnull(row[col]):  # Handle None/NaN
-                    row[col] = None
-            return row
-
-        column_max_lengths = {
-            'pico_p': 200,  # Truncate to 200 characters
-            'pico_o': 200,  # Adjust as needed
-            'pico_i': 200,  # Adjust as needed
-            'pico_c': 200   # Adjust as needed, even though we set it to None initially
-        }
+        self.insert_pico_terms(bulk_insert_data)
+
+    def process_pico_metadata_batched(self, document_data: pd.DataFrame, batch_size:int=32, enhanced_pico:bool=False, local_llm:bool=False):
+        """
+        Batched PICO extraction: abstracts are bucketed by token length, classified batch by batch,
+        and each batch is written to the DocumentPICO_ tables as soon as it completes.
+
+        :param document_data: DataFrame with 'documentId' and 'abstract' columns.
+        :param batch_size: Number of abstracts per model forward pass.
+        """
+        document_data = document_data[document_data['abstract'].notnull() & (document_data['abstract'] != '')]
+        document_ids = document_data['documentId'].astype(str).tolist()
+        abstracts = document_data['abstract'].tolist()
+
+        start_time = time.time()
+        processed = 0
+        for batch_indices, processed_terms, enhanced_terms in self.metadata_processor.iter_process_batches(
+                abstracts, batch_size=batch_size, enhanced_pico=enhanced_pico, local_llm=local_llm):
+            terms_dict = {'raw': processed_terms}
+            if enhanced_pico:
+                terms_dict['enhanced'] = enhanced_terms
+
+            bulk_insert_data = {'raw': [], 'enhanced': []}
+            for label, terms in terms_dict.items():
+                for i, term in zip(batch_indices, terms):
+                    term.update({'documentId': document_ids[i]})
+                    bulk_insert_data[label].append(term)
+            self.insert_pico_terms(bulk_insert_data)
+
+            processed += len(batch_indices)
+            elapsed_time = time.time() - start_time
+            print(f"PICO extraction: {processed}/{len(abstracts)} abstracts ({processed / elapsed_time:.1f} abstracts/sec)")
+
+    def insert_pico_terms(self, bulk_insert_data: dict):
+        """
+        Clean extracted PICO terms and write them to the DocumentPICO_ tables.
 
+        :param bulk_insert_data: Dict of label ('raw'/'enhanced') -> list of term dicts with a 'documentId'.
+        """
         # Convert lists to DataFrames and perform bulk insert
         with self.mysql_interface.get_session() as session:
             for label, data in bulk_insert_data.items():
@@ -234,13 +445,26 @@ class AbstractIngestor(Ingestor):
                     pico_df = pd.DataFrame(data)
                     # Write null column
                     pico_df['pico_c'] = None
-                    pico_df = pico_df.apply(clean_non_scalar, axis=1, args=(column_max_lengths,))
+                    pico_df = clean_pico_frame(pico_df, PICO_COLUMN_MAX_LENGTHS)
                     self.insert_data(session, f'DocumentPICO_{label}', pico_df)
     
+    def process_pico_metadata_sharded(self, checkpoint_dir:str, num_workers:int=None, torch_threads:int=1,
+                                      shard_size:int=500, batch_size:int=32, enhanced_pico:bool=False, local_llm:bool=False):
+        """
+        Extract PICO metadata for all unprocessed abstracts on a process pool, checkpointing each
+        shard to `checkpoint_dir` so an interrupted run resumes where it stopped.
+        """
+        from lamatidb.interfaces.mysql_ingestors.sharded_pico_extraction import ShardedPICOExtractor
+
+        extractor = ShardedPICOExtractor(self, checkpoint_dir, num_workers=num_workers, torch_threads=torch_threads,
+                                         shard_size=shard_size, batch_size=batch_size)
+        extractor.run(enhanced_pico=enhanced_pico, local_llm=local_llm)
+
     def recovery_load_pico_enhanced(self, json_filepath:str):
         # Load the JSON file into dataframe
         pico_df = pd.read_json(json_filepath)
-        
+        pico_df = clean_pico_frame(pico_df, PICO_COLUMN_MAX_LENGTHS)
+
         # Convert lists to DataFrames and perform bulk insert
         with self.mysql_interface.get_session() as session:
             self.insert_data(session, f'DocumentPICO_enhanced', pico_df)
@@ -270,42 +494,56 @@ class AbstractIngestor(Ingestor):
 # Example subclass for full document ingestion
 class FullDocumentIngestor(Ingestor):
 
-    def __init__(self, mapping_file, db_type='tidb', db_name='test_creation'):
+    def __init__(self, mapping_file, db_type='tidb', db_name='test_creation', pdf_store_backend=None,
+                 pmcid_index_dir=DEFAULT_PMCID_INDEX_DIR):
+        """
+        :param mapping_file: PMC-ids CSV used to build the PMID -> PMCID index (optional).
+        :param pmcid_index_dir: Directory of the persistent PMID -> PMCID index.
+        :param pdf_store_backend: When set ('table' or 'filesystem'), PDFs go to the content-addressed
+            PDF blob store instead of the DocumentFull.pdfBlob column.
+        """
         super().__init__(db_type=db_type, db_name=db_name)
+        self.pdf_store = get_pdf_blob_store(self.mysql_interface, backend=pdf_store_backend) if pdf_store_backend else None
         self.database_id = None
         self.mapping_file = mapping_file
-        self.mapping_df = None
-
-    def get_docID_mapper(self, pmids: list, save_output=False):
-        # Load the mapping file if not already loaded
-        if self.mapping_df is None:
-            if self.mapping_file:
-                self.mapping_df = pd.read_csv(self.mapping_file, dtype={'PMID': str})
-            else:
-                # Note, this is a temporary solution to get the PMCIDs for the PMIDs
-                # Will have to continue working on this for full functionality and UX
-
-                # If there is no mapper file in lake, then create one through API calls
-                if not os.path.exists('datalake/pubmed/pmcid_dict.pkl'):
-                    pmcid_dict = self.pmid_to_pmcid_bulk(pmids)
-
-                    # Persist dict and save it in lake
-                    with open('datalake/pubmed/pmcid_dict.pkl', 'wb') as f:
-                        pickle.dump(pmcid_dict, f)
-                else:
-                    with open('datalake/pubmed/pmcid_dict.pkl', 'rb') as f:
-                        pmcid_dict = pickle.load(f)
-
-        # Filter the DataFrame for the given PMIDs
-        filtered_df = self.mapping_df[self.mapping_df['PMID'].isin(pmids)]
+        self.pmcid_index_dir = pmcid_index_dir
+        self.pmcid_index = None
+
+    def get_pmcid_index(self) -> PMCIDIndex:
+        """Open the PMID -> PMCID index, (re)building it from the mapping file when that changed."""
+        if self.pmcid_index is None:
+            self.pmcid_index = PMCIDIndex(self.pmcid_index_dir)
+            if self.mapping_file and self.pmcid_index.is_stale(self.mapping_file):
+                self.pmcid_index.build_from_csv(self.mapping_file)
+            elif not self.pmcid_index.exists() and os.path.exists(LEGACY_PMCID_PICKLE):
+                # One-off import of the previous pickle cache
+                with open(LEGACY_PMCID_PICKLE, 'rb') as f:
+                    self.pmcid_index.merge(pickle.load(f))
+        return self.pmcid_index
+
+    def get_docID_mapper(self, pmids: list, save_output=False, resolve_misses: bool = None):
+        """
+        Map PMIDs to PMCIDs with the on-disk index.
 
-        # Create a dictionary where PMIDs are the keys and PMCIDs are the values
-        doc_ids_dict = filtered_df.set_index('PMID')['PMCID'].to_dict()
+        :param resolve_misses: Query the PMC ID converter API for PMIDs not in the index and merge the
+            answers (including PMIDs without a PMCID) back into it. Defaults to True without a mapping file.
+        """
+        pmids = [str(x) for x in pmids]
+        pmcid_index = self.get_pmcid_index()
+        doc_ids_dict, missing = pmcid_index.lookup(pmids)
+
+        if resolve_misses is None:
+            resolve_misses = not self.mapping_file
+        if resolve_misses and missing:
+            print(f"Resolving {len(missing)} PMIDs not in the PMCID index through the API.")
+            api_mapping = self.pmid_to_pmcid_bulk(missing)
+            pmcid_index.merge(api_mapping, no_pmcid=[x for x in missing if x not in api_mapping])
+            doc_ids_dict.update(api_mapping)
 
         # Save small mapping file
-        if save_output:
+        if save_output and self.mapping_file:
             parentpath = os.path.dirname(self.mapping_file)
-            filtered_df.to_csv(f'{parentpath}/PMC-ids-small.csv', index=False)
+            pd.DataFrame(list(doc_ids_dict.items()), columns=['PMID', 'PMCID']).to_csv(f'{parentpath}/PMC-ids-small.csv', index=False)
 
         return doc_ids_dict
 
@@ -355,19 +593,7 @@ class FullDocumentIngestor(Ingestor):
         Returns:
             str: Cleaned text content extracted from the XML file.
         """
-        tree = ET.parse(xml_file_path)
-        root = tree.getroot()
-
-        # Extract and clean text
-        text_content = []
-        for elem in root.iter():
-            if elem.text:
-                # Strip leading/trailing whitespace and replace multiple newlines with a single one
-                cleaned_text = elem.text.strip().replace("\n", " ").replace("\r", " ")
-                text_content.append(cleaned_text)
-
-        # Join all cleaned text into a single string, ensuring consistent spacing
-        return " ".join(text_content)
+        return parse_nxml_text(xml_file_path)
 
     def get_first_file_by_type(self, doc_directory_path: str, file_extension: str='.nxml') -> str:
         """
@@ -391,36 +617,25 @@ class FullDocumentIngestor(Ingestor):
                 return os.path.join(doc_directory_path, file)
         return None
 
-    def download_full_document(self, ids:list, out_folder:str = 'pmc_data'):
-        import requests
-        import wget
-        import tarfile
-        from bs4 import BeautifulSoup
-        import urllib.request
-
-        if not os.path.exists(out_folder):
-            os.makedirs(out_folder)
-
-        for id in ids:
-            response = requests.get(f'https://www.ncbi.nlm.nih.gov/pmc/utils/oa/oa.fcgi?id={id}')
-            soup = BeautifulSoup(response.content)
-            if not soup.find('error'):
-                link = soup.find('link')['href']
-
-                # Handle FTP or HTTP/HTTPS download
-                if link.startswith('ftp://'):
-                    fname = os.path.join(out_folder, os.path.basename(link))
-                    urllib.request.urlretrieve(link, fname)
-                else:
-                    fname = wget.download(link, out=out_folder)
-
-                if fname.endswith("tar.gz"):
-                    with tarfile.open(fname, "r:gz") as tar:
-                        tar.extractall(path=out_folder)
-                        tar.close()
-                    os.remove(fname)
-
-    def process_csv(self, csv_file: str, limitIDs:bool=False, download_fulldata=False, database_description=None):
+    def download_full_document(self, ids:list, out_folder:str = 'pmc_data', max_workers:int = 8,
+                               requests_per_second:float = 3.0, **downloader_kwargs):
+        """
+        Download the PMC open-access packages of `ids` (PMCIDs) into `<out_folder>/<PMCID>`.
+        Downloads run concurrently under a global rate limit and resume from `<out_folder>/.download_state.json`.
+        """
+        from lamatidb.interfaces.mysql_ingestors.pmc_downloader import PMCDownloader
+
+        downloader = PMCDownloader(out_folder=out_folder, max_workers=max_workers,
+                                   requests_per_second=requests_per_second, **downloader_kwargs)
+        return downloader.download(ids)
+
+    def process_csv(self, csv_file: str, limitIDs:bool=False, download_fulldata=False, database_description=None, incremental=False,
+                    parse_workers:int=None):
+        """
+        :param incremental: Skip full documents whose PDF/full text hash is unchanged since the last run.
+        :param parse_workers: Number of processes parsing .nxml files (defaults to the CPU count).
+        """
+        manifest = IngestionManifest(self.mysql_interface) if incremental else None
 
         database_name = os.path.basename(os.path.dirname(csv_file))
         self.database_id = self.ensure_database_exists(database_name, description=database_description)
@@ -451,13 +666,24 @@ class FullDocumentIngestor(Ingestor):
 
             self.download_full_document(ids, out_folder='pmc_data')
 
-        doc_paths = {pmcid: self.get_first_file_by_type(os.path.join('pmc_data', pmcid), '.pdf') for pmcid in os.listdir('pmc_data')}
-        xml_paths = {pmcid: self.get_first_file_by_type(os.path.join('pmc_data', pmcid), '.nxml') for pmcid in os.listdir('pmc_data')}
-        fulltext_dict = {pmcid: self.parse_and_clean_xml(path) for pmcid, path in xml_paths.items()}
+        # Skip the downloader's resume state and partial files
+        pmc_folders = [x for x in os.listdir('pmc_data') if not x.startswith('.')]
+        doc_paths = {pmcid: self.get_first_file_by_type(os.path.join('pmc_data', pmcid), '.pdf') for pmcid in pmc_folders}
+        xml_paths = {pmcid: self.get_first_file_by_type(os.path.join('pmc_data', pmcid), '.nxml') for pmcid in pmc_folders}
 
+        # Full texts are parsed in parallel and each document is written as soon as its text is ready
         pmid_dict = {pmcid: pmid for pmid, pmcid in pmcid_dict.items()}
-        for pmcid, doc_path in doc_paths.items():
-            self.process_blob(doc_path, document_id=pmid_dict[pmcid], PMCID=pmcid, fulltext=fulltext_dict[pmcid])
+        for pmcid, fulltext, error in iter_parsed_fulltext(xml_paths, num_workers=parse_workers):
+            if error:
+                print(f"Failed to parse full text for {pmcid}: {error}")
+                continue
+            if pmcid not in pmid_dict:
+                print(f"No PMID mapping for {pmcid}, skipping.")
+                continue
+            try:
+                self.process_blob(doc_paths[pmcid], document_id=pmid_dict[pmcid], PMCID=pmcid, fulltext=fulltext, manifest=manifest)
+            except Exception as e:
+                print(f"Failed to ingest full document {pmcid}: {e}")
 
         # ========================================================================================================
         # Some initial code to process the if is .nxml format
@@ -480,7 +706,10 @@ class FullDocumentIngestor(Ingestor):
     #         if mappings_to_add :
     #             self.insert_data(session, 'DocumentDatabaseMapping', mappings_to_add)
 
-    def process_blob(self, pdf_path: str, document_id: str, fulltext:str=None, PMCID: str = None):
+    def process_blob(self, pdf_path: str, document_id: str, fulltext:str=None, PMCID: str = None, manifest: IngestionManifest = None):
+        """
+        :param manifest: When given, the document is skipped if its content hash is unchanged and replaced if it changed.
+        """
         # Ignore the database_name for now -- This is more for PRD
         database_name = 'pubmed' #Default to pubmed for now
         self.database_id = self.ensure_database_exists(database_name)
@@ -489,12 +718,24 @@ class FullDocumentIngestor(Ingestor):
         with open(pdf_path, 'rb') as file:
             blob_data = file.read()
 
+        if manifest is not None:
+            content_hash = hash_content(PMCID, fulltext, blob_data)
+            if manifest.fetch_hashes(FULLTEXT_STAGE, [document_id]).get(str(document_id)) == content_hash:
+                print(f"Full document '{document_id}' unchanged, skipping.")
+                return
+            with self.mysql_interface.get_session() as session:
+                self.delete_documents(session, 'DocumentFull', [document_id])
+
+        # Deduplicated, chunked PDF storage; DocumentFull then only keeps the full text
+        if self.pdf_store is not None:
+            self.pdf_store.put_document(document_id, blob_data)
+
         # Create a DataFrame for inserting into the DocumentFull table
         document_full_data = pd.DataFrame({
             'documentId': [document_id],
             'PMCID': [PMCID],
             'fullText': [fulltext],
-            'pdfBlob': [blob_data]
+            'pdfBlob': [blob_data if self.pdf_store is None else None]
         })
 
         # Insert the data into the DocumentFull table
@@ -506,6 +747,13 @@ class FullDocumentIngestor(Ingestor):
             # if mappings_to_add :
             #     self.insert_data(session, 'DocumentDatabaseMapping', mappings_to_add)
 
+        if manifest is not None:
+            manifest.record(FULLTEXT_STAGE, {str(document_id): content_hash})
+
+        # Let the PDF availability caches know about the new document: directly if running in-process,
+        # and through the CacheVersion row for the API server
+        invalidate_pdf_availability([document_id], datastore_db=self.mysql_interface)
+
 if __name__ == "__main__":
     # Example for Abstract Ingestion
     abstract_csv_file = 'datalake/mock_data/abstracts.csv'
@@ -0,0 +1,157 @@
+## Pluggable bulk-write backends for Ingestor.insert_data.
+## Each writer splits the DataFrame into chunks, commits per chunk and reports rows/sec.
+
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy.exc import IntegrityError
+
+
+def dataframe_records(data: pd.DataFrame):
+    """Rows as tuples of Python scalars, with NaN/NaT converted to None."""
+    data = data.astype(object).where(pd.notnull(data), None)
+    return list(data.itertuples(index=False, name=None))
+
+
+class BulkWriter:
+    """
+    Base bulk writer. Subclasses implement `_write_chunk` for one chunk on an open connection.
+    """
+    name = None
+
+    def __init__(self, chunk_size: int = 1000, on_duplicate_update: bool = False):
+        """
+        :param chunk_size: Rows per statement/transaction.
+        :param on_duplicate_update: Upsert rows (ON DUPLICATE KEY UPDATE) instead of failing on duplicates.
+        """
+        self.chunk_size = chunk_size
+        self.on_duplicate_update = on_duplicate_update
+
+    def _insert_prefix(self, table_name: str, columns) -> str:
+        column_list = ", ".join(f"`{col}`" for col in columns)
+        return f"INSERT INTO `{table_name}` ({column_list}) VALUES "
+
+    def _upsert_suffix(self, columns) -> str:
+        if not self.on_duplicate_update:
+            return ""
+        updates = ", ".join(f"`{col}` = VALUES(`{col}`)" for col in columns)
+        return f" ON DUPLICATE KEY UPDATE {updates}"
+
+    def _write_chunk(self, conn, table_name: str, chunk: pd.DataFrame):
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def write(self, engine, table_name: str, data: pd.DataFrame) -> int:
+        """
+        Write `data` to `table_name`, committing every chunk. Chunks that violate a constraint
+        are rolled back and reported; the remaining chunks are still written.
+
+        :return: Number of rows written.
+        """
+        start_time = time.time()
+        rows_written = 0
+
+        with engine.connect() as conn:
+            for start in range(0, len(data), self.chunk_size):
+                chunk = data.iloc[start:start + self.chunk_size]
+                try:
+                    self._write_chunk(conn, table_name, chunk)
+                    conn.commit()
+                    rows_written += len(chunk)
+                except IntegrityError as e:
+                    conn.rollback()
+                    print(f"Data insertion failed for rows {start}-{start + len(chunk)} of {table_name}: {e}")
+
+        elapsed_time = time.time() - start_time
+        rate = rows_written / elapsed_time if elapsed_time > 0 else float("inf")
+        print(f"Data inserted into {table_name} successfully, {rows_written} records "
+              f"({rate:.0f} rows/sec, {self.name}, chunk size {self.chunk_size}).")
+        return rows_written
+
+
+class MultiRowInsertWriter(BulkWriter):
+    """One multi-row INSERT ... VALUES (...), (...) statement per chunk."""
+    name = "multirow"
+
+    def _write_chunk(self, conn, table_name: str, chunk: pd.DataFrame):
+        records = dataframe_records(chunk)
+        placeholders = "(" + ", ".join(["%s"] * len(chunk.columns)) + ")"
+        sql = (self._insert_prefix(table_name, chunk.columns)
+               + ", ".join([placeholders] * len(records))
+               + self._upsert_suffix(chunk.columns))
+        conn.exec_driver_sql(sql, tuple(value for record in records for value in record))
+
+
+class ExecuteManyWriter(BulkWriter):
+    """DBAPI executemany over a single-row INSERT (driver-side batching)."""
+    name = "executemany"
+
+    def _write_chunk(self, conn, table_name: str, chunk: pd.DataFrame):
+        placeholders = "(" + ", ".join(["%s"] * len(chunk.columns)) + ")"
+        sql = self._insert_prefix(table_name, chunk.columns) + placeholders + self._upsert_suffix(chunk.columns)
+        conn.exec_driver_sql(sql, dataframe_records(chunk))
+
+
+class LoadDataInfileWriter(BulkWriter):
+    """
+    LOAD DATA LOCAL INFILE from a temporary tab-separated file (MySQL/TiDB).
+    Requires an engine created with `local_infile=True`. Chunks containing binary
+    values (e.g. pdfBlob) fall back to a multi-row INSERT.
+
+    Each chunk is loaded into a temporary staging table and moved into the target table with
+    INSERT ... SELECT, so duplicates behave as in the other writers: they fail the chunk, or are
+    updated in place with `on_duplicate_update` (never deleted and re-inserted, which would break
+    the foreign keys referencing Document). LOAD DATA on its own would silently skip them.
+    Rows repeating a key within one chunk are still collapsed by the staging load (first row kept).
+    """
+    name = "load_data"
+
+    @staticmethod
+    def _escape(value) -> str:
+        if value is None:
+            return "\\N"
+        value = str(value)
+        return (value.replace("\\", "\\\\").replace("\t", "\\t")
+                .replace("\n", "\\n").replace("\r", "\\r").replace("\0", "\\0"))
+
+    def _write_chunk(self, conn, table_name: str, chunk: pd.DataFrame):
+        records = dataframe_records(chunk)
+        if any(isinstance(value, (bytes, bytearray)) for record in records for value in record):
+            MultiRowInsertWriter._write_chunk(self, conn, table_name, chunk)
+            return
+
+        with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8") as tmp_file:
+            for record in records:
+                tmp_file.write("\t".join(self._escape(value) for value in record) + "\n")
+            tmp_path = tmp_file.name
+
+        staging_table = f"_load_{table_name}"
+        column_list = ", ".join(f"`{col}`" for col in chunk.columns)
+        try:
+            conn.exec_driver_sql(f"CREATE TEMPORARY TABLE `{staging_table}` LIKE `{table_name}`")
+            conn.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{tmp_path}' INTO TABLE `{staging_table}` "
+                f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({column_list})"
+            )
+            conn.exec_driver_sql(
+                f"INSERT INTO `{table_name}` ({column_list}) SELECT {column_list} FROM `{staging_table}`"
+                + self._upsert_suffix(chunk.columns)
+            )
+        finally:
+            conn.exec_driver_sql(f"DROP TEMPORARY TABLE IF EXISTS `{staging_table}`")
+            os.remove(tmp_path)
+
+
+BULK_WRITERS = {
+    MultiRowInsertWriter.name: MultiRowInsertWriter,
+    ExecuteManyWriter.name: ExecuteManyWriter,
+    LoadDataInfileWriter.name: LoadDataInfileWriter,
+}
+
+
+def get_bulk_writer(write_method: str, chunk_size: int = 1000, **kwargs) -> BulkWriter:
+    if write_method not in BULK_WRITERS:
+        raise ValueError(f"Unsupported write method '{write_method}'. Use one of {list(BULK_WRITERS)}.")
+    return BULK_WRITERS[write_method](chunk_size=chunk_size, **kwargs)
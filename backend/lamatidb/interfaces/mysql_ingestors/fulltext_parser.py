@@ -0,0 +1,85 @@
+## Parallel, streaming extraction of full text from PMC .nxml files.
+## Files are parsed with ElementTree.iterparse (clearing elements as they complete) on a process pool,
+## and results are yielded as they finish so blob writes can start before every file is parsed.
+
+import concurrent.futures
+import multiprocessing
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, Optional, Tuple
+
+
+def parse_nxml_text(xml_file_path: str) -> str:
+    """
+    Extract and clean the text content of an XML file without building the whole tree.
+    Produces the same output as joining `elem.text` over `root.iter()` (document order).
+
+    Args:
+        xml_file_path (str): Path to the XML file.
+
+    Returns:
+        str: Cleaned text content extracted from the XML file.
+    """
+    # One slot per element, reserved at its start event (document order) and filled at its
+    # end event, when the element's text is guaranteed to be parsed
+    text_content = []
+    open_slots = []
+    for event, elem in ET.iterparse(xml_file_path, events=("start", "end")):
+        if event == "start":
+            open_slots.append(len(text_content))
+            text_content.append(None)
+        else:
+            slot = open_slots.pop()
+            if elem.text:
+                # Strip leading/trailing whitespace and replace multiple newlines with a single one
+                text_content[slot] = elem.text.strip().replace("\n", " ").replace("\r", " ")
+            elem.clear()
+
+    # Join all cleaned text into a single string, ensuring consistent spacing
+    return " ".join(text for text in text_content if text is not None)
+
+
+def _parse_file(key: str, xml_file_path: str) -> Tuple[str, Optional[str], Optional[str]]:
+    try:
+        return key, parse_nxml_text(xml_file_path), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+def iter_parsed_fulltext(xml_paths: Dict[str, Optional[str]], num_workers: int = None,
+                         max_in_flight: int = None) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Parse many .nxml files on a process pool and yield results in completion order.
+
+    :param xml_paths: Key (e.g. PMCID) -> path of the .nxml file (None when the file is missing).
+    :param num_workers: Number of worker processes (defaults to the CPU count).
+    :param max_in_flight: Maximum number of submitted, not yet consumed files (bounds memory);
+        defaults to 4 per worker.
+    :return: Iterator of (key, text, error); `text` is None and `error` is set when a file failed.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 4 * num_workers
+    pending_paths = iter(xml_paths.items())
+
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as executor:
+        in_flight = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    key, path = next(pending_paths)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if path is None:
+                    yield key, None, "no .nxml file found"
+                    continue
+                in_flight.add(executor.submit(_parse_file, key, path))
+
+            if not in_flight:
+                break
+
+            done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
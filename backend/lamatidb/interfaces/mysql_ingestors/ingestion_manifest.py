@@ -0,0 +1,121 @@
+## Content-hash manifest for idempotent, incremental ingestion.
+## Every stage (DB insert, PICO extraction, vector indexing) records the hash of the content it
+## processed per document in the `IngestionManifest` table, so reruns only touch new or changed rows.
+
+import hashlib
+from typing import Dict, Iterable, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+# Stage names used by the ingestors; vector indexing uses f"index:{vector_table_name}"
+DOCUMENT_STAGE = "document"
+PICO_STAGE = "pico"
+PICO_ENHANCED_STAGE = "pico_enhanced"
+FULLTEXT_STAGE = "fulltext"
+
+
+def hash_content(*values) -> str:
+    """SHA-256 hex digest over the string form of `values` (None hashes as an empty string)."""
+    sha256 = hashlib.sha256()
+    for value in values:
+        if isinstance(value, (bytes, bytearray)):
+            sha256.update(value)
+        else:
+            sha256.update(("" if value is None else str(value)).encode("utf-8"))
+        sha256.update(b"\x1f")
+    return sha256.hexdigest()
+
+
+def _hashable_strings(series: pd.Series) -> pd.Series:
+    """
+    String form of a column for hashing. pandas reads an integer column holding a missing value as
+    float (2019 -> "2019.0"), so whole-number floats are hashed like the integers they stand for.
+    """
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if ((values % 1 == 0) & (values.abs() < 2 ** 53)).all():
+            series = series.astype("Int64")
+    elif series.dtype == object:
+        series = series.map(lambda x: int(x) if isinstance(x, float) and x.is_integer() else x)
+    return series.astype(object).where(series.notnull(), "").astype(str)
+
+
+def compute_content_hashes(df: pd.DataFrame, columns: list) -> list:
+    """One SHA-256 hex digest per row over the given columns."""
+    as_strings = [_hashable_strings(df[col]) for col in columns]
+    rows = as_strings[0].str.cat(as_strings[1:], sep="\x1f") if len(as_strings) > 1 else as_strings[0]
+    return [hashlib.sha256(row.encode("utf-8")).hexdigest() for row in rows]
+
+
+class IngestionManifest:
+    """
+    Reads and writes (documentId, stage) -> contentHash entries in the datastore.
+    """
+
+    def __init__(self, mysql_interface, batch_size: int = 1000):
+        """
+        :param mysql_interface: DatabaseInterface of the datastore holding the `IngestionManifest` table.
+        :param batch_size: Number of document ids per lookup/upsert statement.
+        """
+        self.mysql_interface = mysql_interface
+        self.batch_size = batch_size
+
+    def fetch_hashes(self, stage: str, document_ids: Iterable[str]) -> Dict[str, str]:
+        document_ids = [str(x) for x in document_ids]
+        query = text(
+            "SELECT documentId, contentHash FROM `IngestionManifest` WHERE stage = :stage AND documentId IN :document_ids"
+        ).bindparams(bindparam("document_ids", expanding=True))
+
+        hashes = {}
+        with self.mysql_interface.get_session() as session:
+            for start in range(0, len(document_ids), self.batch_size):
+                batch = document_ids[start:start + self.batch_size]
+                for document_id, content_hash in session.execute(query, {"stage": stage, "document_ids": batch}):
+                    hashes[document_id] = content_hash
+        return hashes
+
+    def fetch_document_ids(self, stage: str) -> Set[str]:
+        """All documentIds recorded for a stage."""
+        query = text("SELECT documentId FROM `IngestionManifest` WHERE stage = :stage")
+        with self.mysql_interface.get_session() as session:
+            return {row[0] for row in session.execute(query, {"stage": stage})}
+
+    def diff(self, stage: str, content_hashes: Dict[str, str]) -> Tuple[Set[str], Set[str]]:
+        """
+        Compare current content hashes against the manifest.
+
+        :param content_hashes: documentId -> hash of the current content.
+        :return: (new documentIds, changed documentIds); all other ids are unchanged.
+        """
+        recorded = self.fetch_hashes(stage, content_hashes.keys())
+        new_ids = {doc_id for doc_id in content_hashes if doc_id not in recorded}
+        changed_ids = {doc_id for doc_id, content_hash in content_hashes.items()
+                       if doc_id in recorded and recorded[doc_id] != content_hash}
+        return new_ids, changed_ids
+
+    def record(self, stage: str, content_hashes: Dict[str, str]):
+        """Upsert the hashes of documents that completed `stage`."""
+        if not content_hashes:
+            return
+        query = text("""
+            INSERT INTO `IngestionManifest` (documentId, stage, contentHash, updatedAt)
+            VALUES (:documentId, :stage, :contentHash, NOW())
+            ON DUPLICATE KEY UPDATE contentHash = VALUES(contentHash), updatedAt = VALUES(updatedAt)
+        """)
+        rows = [{"documentId": str(doc_id), "stage": stage, "contentHash": content_hash}
+                for doc_id, content_hash in content_hashes.items()]
+        with self.mysql_interface.get_session() as session:
+            for start in range(0, len(rows), self.batch_size):
+                session.execute(query, rows[start:start + self.batch_size])
+                session.commit()
+
+    def remove(self, stage: str, document_ids: Iterable[str]):
+        document_ids = [str(x) for x in document_ids]
+        query = text(
+            "DELETE FROM `IngestionManifest` WHERE stage = :stage AND documentId IN :document_ids"
+        ).bindparams(bindparam("document_ids", expanding=True))
+        with self.mysql_interface.get_session() as session:
+            for start in range(0, len(document_ids), self.batch_size):
+                session.execute(query, {"stage": stage, "document_ids": document_ids[start:start + self.batch_size]})
+                session.commit()
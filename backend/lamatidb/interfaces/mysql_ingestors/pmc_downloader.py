@@ -0,0 +1,246 @@
+## Concurrent, resumable downloader for PMC open-access packages.
+## Looks up each PMCID on the OA web service, downloads its package over a pooled HTTP session
+## (bounded concurrency, global rate limit, HTTP Range resume of partial files) and extracts it
+## into `<out_folder>/<PMCID>` while other downloads are still running.
+
+import concurrent.futures
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from lamatidb.interfaces.rate_limiting import TokenBucket
+
+OA_SERVICE_URL = "https://www.ncbi.nlm.nih.gov/pmc/utils/oa/oa.fcgi"
+STATE_FILE = ".download_state.json"
+
+# Download states kept in the resume file
+DONE = "done"
+NOT_AVAILABLE = "not_available"
+FAILED = "failed"
+
+
+def safe_tar_members(tar: tarfile.TarFile, dest_dir: str) -> List[tarfile.TarInfo]:
+    """
+    Members of `tar` that stay inside `dest_dir`. Raises ValueError for absolute paths, `..` traversal,
+    links pointing outside `dest_dir` and device or fifo entries.
+    """
+    dest_dir = os.path.realpath(dest_dir)
+
+    def inside(path: str) -> bool:
+        return os.path.commonpath([dest_dir, os.path.realpath(path)]) == dest_dir
+
+    members = []
+    for member in tar.getmembers():
+        if os.path.isabs(member.name) or not inside(os.path.join(dest_dir, member.name)):
+            raise ValueError(f"Unsafe path in package: {member.name}")
+        if member.issym():
+            target = os.path.join(dest_dir, os.path.dirname(member.name), member.linkname)
+            if os.path.isabs(member.linkname) or not inside(target):
+                raise ValueError(f"Unsafe symlink in package: {member.name} -> {member.linkname}")
+        elif member.islnk():
+            if os.path.isabs(member.linkname) or not inside(os.path.join(dest_dir, member.linkname)):
+                raise ValueError(f"Unsafe hard link in package: {member.name} -> {member.linkname}")
+        elif not (member.isfile() or member.isdir()):
+            raise ValueError(f"Unsupported entry in package: {member.name}")
+        members.append(member)
+    return members
+
+
+class PMCDownloader:
+    """
+    Downloads PMC OA packages for a list of PMCIDs.
+
+    Progress is kept in `<out_folder>/.download_state.json`, so a rerun skips PMCIDs that were
+    downloaded or have no OA package. Partially downloaded files (`<out_folder>/.partial/`) are
+    resumed with HTTP Range requests.
+    """
+
+    def __init__(self, out_folder: str = 'pmc_data', max_workers: int = 8, requests_per_second: float = 3.0,
+                 extract_workers: int = 2, oa_service_url: str = OA_SERVICE_URL, https_mirror: bool = True,
+                 timeout: float = 60.0, max_retries: int = 5, retry_failed: bool = True):
+        """
+        :param out_folder: Destination directory; each article is extracted into `<out_folder>/<PMCID>`.
+        :param max_workers: Concurrent downloads.
+        :param requests_per_second: Global rate limit over OA lookups and package downloads.
+        :param extract_workers: Threads extracting finished packages while downloads continue.
+        :param oa_service_url: OA web service endpoint (point it at a local server for testing).
+        :param https_mirror: Rewrite ftp:// package links to the HTTPS mirror of the same host.
+        :param retry_failed: Retry PMCIDs recorded as failed in a previous run.
+        """
+        self.out_folder = out_folder
+        self.max_workers = max_workers
+        self.extract_workers = extract_workers
+        self.oa_service_url = oa_service_url
+        self.https_mirror = https_mirror
+        self.timeout = timeout
+        self.retry_failed = retry_failed
+        self.rate_limiter = TokenBucket(requests_per_second)
+
+        self.partial_folder = os.path.join(self.out_folder, ".partial")
+        os.makedirs(self.partial_folder, exist_ok=True)
+        self.state_path = os.path.join(self.out_folder, STATE_FILE)
+        self._state_lock = threading.Lock()
+        self.state = self._load_state()
+
+        # Pooled session with retries on throttling and transient server errors
+        self.session = requests.Session()
+        retry = Retry(total=max_retries, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _load_state(self) -> Dict[str, str]:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _set_state(self, pmcid: str, status: str):
+        with self._state_lock:
+            self.state[pmcid] = status
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.state_path)
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        self.rate_limiter.acquire()
+        return self.session.get(url, timeout=self.timeout, **kwargs)
+
+    def get_package_link(self, pmcid: str) -> Optional[str]:
+        """Look up the OA package link for a PMCID; None if it is not in the OA subset."""
+        response = self._get(self.oa_service_url, params={"id": pmcid})
+        response.raise_for_status()
+        root = ET.fromstring(response.content)
+        if root.find("error") is not None:
+            return None
+
+        links = root.findall(".//record/link")
+        if not links:
+            return None
+        # Prefer the tgz package (contains both the .nxml and the PDF)
+        link = next((x for x in links if x.get("format") == "tgz"), links[0]).get("href")
+        if self.https_mirror and link.startswith("ftp://"):
+            link = "https://" + link[len("ftp://"):]
+        return link
+
+    def download_file(self, url: str, dest_path: str):
+        """Download `url` to `dest_path`, resuming a partial file and renaming it into place when complete."""
+        part_path = f"{dest_path}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with self._get(url, headers=headers, stream=True) as response:
+            if response.status_code == 416:
+                # The partial file is already complete
+                os.replace(part_path, dest_path)
+                return
+            response.raise_for_status()
+            mode = "ab" if offset and response.status_code == 206 else "wb"
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+        os.replace(part_path, dest_path)
+
+    def extract_package(self, pmcid: str, package_path: str):
+        """Extract a package into `<out_folder>/<PMCID>` atomically (via a temporary directory)."""
+        final_path = os.path.join(self.out_folder, pmcid)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{pmcid}.", dir=self.out_folder)
+        try:
+            if package_path.endswith((".tar.gz", ".tgz")):
+                with tarfile.open(package_path, "r:gz") as tar:
+                    members = safe_tar_members(tar, tmp_dir)
+                    if hasattr(tarfile, "data_filter"):
+                        # Also strips unsafe permission bits on Pythons that ship extraction filters
+                        tar.extractall(path=tmp_dir, members=members, filter="data")
+                    else:
+                        tar.extractall(path=tmp_dir, members=members)
+                # Packages contain a single top-level directory named after the PMCID
+                entries = os.listdir(tmp_dir)
+                source = os.path.join(tmp_dir, entries[0]) if len(entries) == 1 and os.path.isdir(os.path.join(tmp_dir, entries[0])) else tmp_dir
+            else:
+                shutil.copy(package_path, tmp_dir)
+                source = tmp_dir
+
+            if os.path.exists(final_path):
+                shutil.rmtree(final_path)
+            os.replace(source, final_path)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+        os.remove(package_path)
+
+    def _download_one(self, pmcid: str) -> Optional[str]:
+        link = self.get_package_link(pmcid)
+        if link is None:
+            self._set_state(pmcid, NOT_AVAILABLE)
+            return None
+        package_path = os.path.join(self.partial_folder, f"{pmcid}_{os.path.basename(link)}")
+        self.download_file(link, package_path)
+        return package_path
+
+    def _extract_one(self, pmcid: str, package_path: str):
+        self.extract_package(pmcid, package_path)
+        self._set_state(pmcid, DONE)
+
+    def pending_ids(self, ids: List[str]) -> List[str]:
+        skip = {DONE, NOT_AVAILABLE} if self.retry_failed else {DONE, NOT_AVAILABLE, FAILED}
+        return [pmcid for pmcid in dict.fromkeys(ids)
+                if self.state.get(pmcid) not in skip and not os.path.isdir(os.path.join(self.out_folder, pmcid))]
+
+    def download(self, ids: List[str]) -> Dict[str, int]:
+        """
+        Download and extract the OA packages of `ids`.
+
+        :return: Counts of downloaded, not available and failed PMCIDs for this run.
+        """
+        pending = self.pending_ids(ids)
+        print(f"PMC download: {len(pending)} pending ({len(ids) - len(pending)} already done or unavailable)")
+        start_time = time.time()
+        counts = {DONE: 0, NOT_AVAILABLE: 0, FAILED: 0}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as download_pool, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=self.extract_workers) as extract_pool:
+            downloads = {download_pool.submit(self._download_one, pmcid): pmcid for pmcid in pending}
+            extractions = {}
+
+            for future in concurrent.futures.as_completed(downloads):
+                pmcid = downloads[future]
+                try:
+                    package_path = future.result()
+                except Exception as e:
+                    print(f"Download failed for {pmcid}: {e}")
+                    self._set_state(pmcid, FAILED)
+                    counts[FAILED] += 1
+                    continue
+                if package_path is None:
+                    counts[NOT_AVAILABLE] += 1
+                    continue
+                # Extraction runs while the remaining downloads continue
+                extractions[extract_pool.submit(self._extract_one, pmcid, package_path)] = pmcid
+
+            for future in concurrent.futures.as_completed(extractions):
+                pmcid = extractions[future]
+                try:
+                    future.result()
+                    counts[DONE] += 1
+                except Exception as e:
+                    print(f"Extraction failed for {pmcid}: {e}")
+                    self._set_state(pmcid, FAILED)
+                    counts[FAILED] += 1
+
+        elapsed_time = time.time() - start_time
+        print(f"PMC download finished in {elapsed_time:.2f} seconds: {counts[DONE]} downloaded, "
+              f"{counts[NOT_AVAILABLE]} not in the OA subset, {counts[FAILED]} failed")
+        return counts
@@ -0,0 +1,143 @@
+## Persistent PMID -> PMCID lookup index.
+## Built once from the PMC-ids CSV into two sorted int64 arrays (PMID, numeric PMCID) that are
+## memory-mapped and queried in bulk with binary search. A PMCID of 0 records a PMID known to
+## have no PMCID, so API lookups for it are not repeated.
+
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+PMIDS_FILE = "pmids.npy"
+PMCIDS_FILE = "pmcids.npy"
+META_FILE = "meta.json"
+NO_PMCID = 0
+
+
+def pmcid_to_int(pmcids: pd.Series) -> np.ndarray:
+    """'PMC123' -> 123; missing or malformed values -> 0."""
+    digits = pmcids.astype(str).str.extract(r"^PMC(\d+)$", expand=False)
+    return pd.to_numeric(digits, errors="coerce").fillna(NO_PMCID).astype(np.int64).to_numpy()
+
+
+class PMCIDIndex:
+    """
+    Sorted-array PMID -> PMCID index stored in `index_dir`.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._pmids = np.empty(0, dtype=np.int64)
+        self._pmcids = np.empty(0, dtype=np.int64)
+        self.meta = {}
+        if self.exists():
+            self.load()
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.index_dir, META_FILE))
+
+    def __len__(self):
+        return len(self._pmids)
+
+    def load(self):
+        self._pmids = np.load(os.path.join(self.index_dir, PMIDS_FILE), mmap_mode="r")
+        self._pmcids = np.load(os.path.join(self.index_dir, PMCIDS_FILE), mmap_mode="r")
+        with open(os.path.join(self.index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+
+    def _save(self, pmids: np.ndarray, pmcids: np.ndarray, meta: dict):
+        """Write new arrays next to the current ones and swap them in."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        for file_name, array in ((PMIDS_FILE, pmids), (PMCIDS_FILE, pmcids)):
+            tmp_path = os.path.join(self.index_dir, f"{file_name}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(self.index_dir, file_name))
+
+        tmp_path = os.path.join(self.index_dir, f"{META_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.index_dir, META_FILE))
+        self.load()
+
+    @staticmethod
+    def _sorted_unique(pmids: np.ndarray, pmcids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sort by PMID, keeping the last occurrence of duplicated PMIDs."""
+        order = np.argsort(pmids, kind="stable")
+        pmids, pmcids = pmids[order], pmcids[order]
+        keep = np.append(pmids[1:] != pmids[:-1], True) if len(pmids) else np.empty(0, dtype=bool)
+        return pmids[keep], pmcids[keep]
+
+    def build_from_csv(self, csv_path: str, chunksize: int = 1000000):
+        """Build the index from a PMC-ids CSV (columns PMID and PMCID), reading it in chunks."""
+        start_time = time.time()
+        pmid_parts, pmcid_parts = [], []
+        for chunk in pd.read_csv(csv_path, usecols=["PMID", "PMCID"], dtype=str, chunksize=chunksize):
+            pmids = pd.to_numeric(chunk["PMID"], errors="coerce")
+            valid = pmids.notnull().to_numpy()
+            pmid_parts.append(pmids.to_numpy()[valid].astype(np.int64))
+            pmcid_parts.append(pmcid_to_int(chunk["PMCID"])[valid])
+
+        pmids, pmcids = self._sorted_unique(np.concatenate(pmid_parts or [np.empty(0, dtype=np.int64)]),
+                                            np.concatenate(pmcid_parts or [np.empty(0, dtype=np.int64)]))
+        self._save(pmids, pmcids, {"source": os.path.abspath(csv_path), "source_mtime": os.path.getmtime(csv_path),
+                                   "built_at": time.time(), "rows": int(len(pmids))})
+
+        elapsed_time = time.time() - start_time
+        print(f"PMCID index built with {len(pmids)} PMIDs from {csv_path} in {elapsed_time:.2f} seconds")
+
+    def is_stale(self, csv_path: str) -> bool:
+        """True if the index was not built from `csv_path` or the CSV changed since."""
+        return (not self.exists()
+                or self.meta.get("source") != os.path.abspath(csv_path)
+                or self.meta.get("source_mtime") != os.path.getmtime(csv_path))
+
+    def lookup(self, pmids: Iterable[str]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Bulk lookup.
+
+        :return: ({PMID: 'PMC...'} for PMIDs with a PMCID, [PMIDs not in the index]).
+                 PMIDs known to have no PMCID are in neither.
+        """
+        pmids = [str(x) for x in pmids]
+        keys = pd.to_numeric(pd.Series(pmids, dtype=object), errors="coerce")
+        valid = keys.notnull().to_numpy()
+        keys = keys.fillna(-1).astype(np.int64).to_numpy()
+
+        positions = np.searchsorted(self._pmids, keys)
+        positions = np.minimum(positions, max(len(self._pmids) - 1, 0))
+        if len(self._pmids):
+            found = valid & (self._pmids[positions] == keys)
+            values = np.asarray(self._pmcids[positions])
+        else:
+            found = np.zeros(len(keys), dtype=bool)
+            values = np.zeros(len(keys), dtype=np.int64)
+
+        mapping = {pmid: f"PMC{value}" for pmid, is_found, value in zip(pmids, found, values)
+                   if is_found and value != NO_PMCID}
+        missing = [pmid for pmid, is_found in zip(pmids, found) if not is_found]
+        return mapping, missing
+
+    def merge(self, mapping: Dict[str, str], no_pmcid: Iterable[str] = ()):
+        """
+        Add API results to the index.
+
+        :param mapping: PMID -> PMCID pairs to add or overwrite.
+        :param no_pmcid: PMIDs confirmed to have no PMCID.
+        """
+        new_pmids = pd.Series(list(mapping.keys()) + list(no_pmcid), dtype=object)
+        new_pmcids = pd.Series(list(mapping.values()) + [None] * (len(new_pmids) - len(mapping)), dtype=object)
+        keys = pd.to_numeric(new_pmids, errors="coerce")
+        valid = keys.notnull().to_numpy()
+        if not valid.any():
+            return
+
+        pmids, pmcids = self._sorted_unique(
+            np.concatenate([np.asarray(self._pmids), keys.to_numpy()[valid].astype(np.int64)]),
+            np.concatenate([np.asarray(self._pmcids), pmcid_to_int(new_pmcids)[valid]])
+        )
+        meta = dict(self.meta, rows=int(len(pmids)), merged_at=time.time())
+        self._save(pmids, pmcids, meta)
@@ -0,0 +1,148 @@
+## Multi-process PICO extraction with checkpoint/resume.
+## Unprocessed abstracts are split into shards that run on a process pool (one model copy per worker).
+## Every completed shard is checkpointed to a local JSON file, so a rerun resumes where it stopped.
+
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import time
+
+MANIFEST_FILE = "manifest.json"
+
+# Per-worker model instance, created once by the pool initializer
+_worker_metadata = None
+
+
+def _init_worker(torch_threads: int):
+    global _worker_metadata
+    import torch
+    from lamatidb.interfaces.metadata_interface import Metadata
+
+    torch.set_num_threads(torch_threads)
+    _worker_metadata = Metadata()
+
+
+def _process_shard(shard_id: str, document_ids: list, abstracts: list, checkpoint_path: str,
+                   batch_size: int, enhanced_pico: bool, local_llm: bool):
+    """Run PICO extraction over one shard and checkpoint the results atomically."""
+    start_time = time.time()
+    results = {'raw': [], 'enhanced': []}
+
+    for batch_indices, processed_terms, enhanced_terms in _worker_metadata.iter_process_batches(
+            abstracts, batch_size=batch_size, enhanced_pico=enhanced_pico, local_llm=local_llm):
+        terms_dict = {'raw': processed_terms}
+        if enhanced_pico:
+            terms_dict['enhanced'] = enhanced_terms
+        for label, terms in terms_dict.items():
+            for i, term in zip(batch_indices, terms):
+                term.update({'documentId': document_ids[i]})
+                results[label].append(term)
+
+    write_json_atomic(checkpoint_path, results)
+    return shard_id, len(document_ids), time.time() - start_time
+
+
+def write_json_atomic(path: str, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class ShardedPICOExtractor:
+    """
+    Shards the output of `fetch_unprocessed_pico_data()` across a process pool and
+    writes every completed shard through the ingestor.
+
+    Checkpoint directory layout:
+    - manifest.json: shard id -> list of documentIds (fixed on the first run, extended with new documents)
+    - <shard>.json: extracted terms for a completed shard
+    - <shard>.inserted: marker written once the shard has been written to the database
+    """
+
+    def __init__(self, ingestor, checkpoint_dir: str, num_workers: int = None, torch_threads: int = 1,
+                 shard_size: int = 500, batch_size: int = 32):
+        """
+        :param ingestor: AbstractIngestor used to fetch unprocessed abstracts and write PICO rows.
+        :param checkpoint_dir: Local directory for the manifest and shard checkpoints.
+        :param num_workers: Number of worker processes (defaults to cpu_count // torch_threads).
+        :param torch_threads: Torch intra-op threads per worker.
+        :param shard_size: Number of abstracts per shard/checkpoint.
+        :param batch_size: Number of abstracts per model forward pass inside a worker.
+        """
+        self.ingestor = ingestor
+        self.checkpoint_dir = checkpoint_dir
+        self.torch_threads = torch_threads
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 1) // torch_threads)
+        self.shard_size = shard_size
+        self.batch_size = batch_size
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    def _path(self, shard_id: str, suffix: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{shard_id}{suffix}")
+
+    def load_or_create_manifest(self, document_ids: list) -> dict:
+        """Keep existing shard assignments and add new shards for documents not seen before."""
+        manifest_path = os.path.join(self.checkpoint_dir, MANIFEST_FILE)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+        known_ids = {doc_id for shard_ids in manifest.values() for doc_id in shard_ids}
+        new_ids = sorted(doc_id for doc_id in document_ids if doc_id not in known_ids)
+        for start in range(0, len(new_ids), self.shard_size):
+            manifest[f"shard_{len(manifest):05d}"] = new_ids[start:start + self.shard_size]
+
+        write_json_atomic(manifest_path, manifest)
+        return manifest
+
+    def insert_shard(self, shard_id: str):
+        with open(self._path(shard_id, ".json")) as f:
+            results = json.load(f)
+        self.ingestor.insert_pico_terms(results)
+        open(self._path(shard_id, ".inserted"), "w").close()
+
+    def run(self, enhanced_pico: bool = False, local_llm: bool = False):
+        unprocessed_data = self.ingestor.fetch_unprocessed_pico_data()
+        unprocessed_data = unprocessed_data[unprocessed_data['abstract'].notnull() & (unprocessed_data['abstract'] != '')].copy()
+        unprocessed_data['documentId'] = unprocessed_data['documentId'].astype(str)
+        abstracts = dict(zip(unprocessed_data['documentId'], unprocessed_data['abstract']))
+
+        manifest = self.load_or_create_manifest(list(abstracts.keys()))
+
+        # Completed shards from a previous run that never reached the database
+        for shard_id in manifest:
+            if os.path.exists(self._path(shard_id, ".json")) and not os.path.exists(self._path(shard_id, ".inserted")):
+                self.insert_shard(shard_id)
+
+        pending = {
+            shard_id: [doc_id for doc_id in document_ids if doc_id in abstracts]
+            for shard_id, document_ids in manifest.items()
+            if not os.path.exists(self._path(shard_id, ".json"))
+        }
+        pending = {shard_id: document_ids for shard_id, document_ids in pending.items() if document_ids}
+        print(f"PICO extraction: {len(pending)} shards pending ({len(manifest) - len(pending)} already checkpointed), "
+              f"{self.num_workers} workers x {self.torch_threads} torch threads")
+
+        if not pending:
+            return
+
+        start_time = time.time()
+        processed = 0
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.num_workers, mp_context=context,
+                                                    initializer=_init_worker, initargs=(self.torch_threads,)) as executor:
+            futures = [
+                executor.submit(_process_shard, shard_id, document_ids, [abstracts[x] for x in document_ids],
+                                self._path(shard_id, ".json"), self.batch_size, enhanced_pico, local_llm)
+                for shard_id, document_ids in pending.items()
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                shard_id, shard_rows, shard_time = future.result()
+                self.insert_shard(shard_id)
+                processed += shard_rows
+                elapsed_time = time.time() - start_time
+                print(f"Shard {shard_id}: {shard_rows} abstracts in {shard_time:.1f}s "
+                      f"({processed} total, {processed / elapsed_time:.1f} abstracts/sec)")
@@ -9,6 +9,8 @@ from llama_index.core.vector_stores.types import MetadataFilter, MetadataFilters
 from llama_index.core import Settings
 from llama_index.core.llms import ChatMessage
 from llama_index.core.chat_engine.types import BaseChatEngine, ChatMode
+from lamatidb.interfaces.cache_interfaces.embedding_cache import get_cached_embed_model
+from lamatidb.interfaces.retrievers.multi_index_retriever import MultiIndexRetriever
 
 class QueryInterface:
     def __init__(self, index):
@@ -37,15 +39,23 @@ class QueryInterface:
         )
         return QUERY_GEN_PROMPT
     
-    def configure_retriever(self, similarity_top_k=100, metadata_filters=None, condition=FilterCondition.OR):
+    def get_query_embed_model(self):
+        """
+        Embedding model for queries, backed by the process-wide embedding cache.
+        """
+        return get_cached_embed_model(Settings.embed_model)
+
+    def configure_retriever(self, similarity_top_k=100, metadata_filters=None, condition=FilterCondition.OR, vector_store_kwargs=None):
+        # vector_store_kwargs are passed to the vector store query, e.g. {"nprobe": 16} for the IVF backend
         if metadata_filters:
             metadata_filters = MetadataFilters(filters=[MetadataFilter(**f) for f in metadata_filters], condition=condition)
     
         self.retriever = VectorIndexRetriever(
             index=self.index,
             similarity_top_k=similarity_top_k,
-            embedding_model=Settings.embed_model,
+            embed_model=self.get_query_embed_model(),
             filters=metadata_filters if metadata_filters else None,
+            vector_store_kwargs=vector_store_kwargs or {},
         )
 
     def configure_advanced_retriever(self, similarity_top_k=100, metadata_filters=None, num_queries = 4):
@@ -55,7 +65,7 @@ class QueryInterface:
         index_retriever = VectorIndexRetriever(
             index=self.index,
             similarity_top_k=similarity_top_k,
-            embedding_model=Settings.embed_model,
+            embed_model=self.get_query_embed_model(),
             filters=metadata_filters,
         )
         
@@ -69,11 +79,47 @@ class QueryInterface:
             query_gen_prompt=self.get_query_gen_prompt(),  # we could override the query generation prompt here
         )
 
+    def configure_multi_index_retriever(self, indexes, similarity_top_k=100, metadata_filters=None, condition=FilterCondition.OR,
+                                        fusion_mode="reciprocal_rank", weights=None, similarity_cutoff=None):
+        """
+        Configure a retriever that embeds the query once and searches several indexes concurrently.
+
+        Args:
+        - indexes: Dict of name -> VectorStoreIndex to search (all must share the query embedding model).
+        - similarity_top_k: Number of results per index and after fusion.
+        - metadata_filters: Filters applied to every index.
+        - fusion_mode: One of 'reciprocal_rank', 'max', 'sum', 'mean'.
+        - weights: Optional dict of name -> weight used during fusion.
+        - similarity_cutoff: Optional minimum similarity applied per index before fusion.
+        """
+        if metadata_filters:
+            metadata_filters = MetadataFilters(filters=[MetadataFilter(**f) for f in metadata_filters], condition=condition)
+
+        embed_model = self.get_query_embed_model()
+        retrievers = {
+            name: VectorIndexRetriever(
+                index=index,
+                similarity_top_k=similarity_top_k,
+                embed_model=embed_model,
+                filters=metadata_filters if metadata_filters else None,
+            )
+            for name, index in indexes.items()
+        }
+
+        self.retriever = MultiIndexRetriever(
+            retrievers,
+            embed_model=embed_model,
+            similarity_top_k=similarity_top_k,
+            fusion_mode=fusion_mode,
+            weights=weights,
+            similarity_cutoff=similarity_cutoff,
+        )
+
     def configure_document_chat(self, document_id):
         metadata_filters = MetadataFilters(
             filters=[MetadataFilter(key="source", value=str(document_id), operator="==")], FilterCondition = FilterCondition.OR
         )
-        self.chat_engine = self.index.as_chat_engine(chat_mode=ChatMode.CONTEXT, verbose = True, **{"filters":metadata_filters})
+        self.chat_engine = self.index.as_chat_engine(chat_mode=ChatMode.CONTEXT, verbose = True, **{"filters":metadata_filters, "embed_model": self.get_query_embed_model()})
         self.chat_engine.reset()
 
     def query_document_chat(self, query):
@@ -106,11 +152,11 @@ class QueryInterface:
             print(f"Document {source} Title: {title}, Similarity: {similarity}, Text: {text}")
 
     def build_rag_query_engine(self, similarity_top_k=None):
-        self.query_engine = self.index.as_query_engine(similarity_top_k=similarity_top_k)
+        self.query_engine = self.index.as_query_engine(similarity_top_k=similarity_top_k, embed_model=self.get_query_embed_model())
 
     def perform_metadata_filtered_query(self, query: str, filters: list, condition=FilterCondition.OR):
         metadata_filters = MetadataFilters(filters=[MetadataFilter(**f) for f in filters], condition=condition)
-        self.query_engine = self.index.as_query_engine(filters=metadata_filters, llm=self.llm)
+        self.query_engine = self.index.as_query_engine(filters=metadata_filters, llm=self.llm, embed_model=self.get_query_embed_model())
         response = self.query_engine.query(query)
         return response
 
@@ -0,0 +1,43 @@
+## Token-bucket rate limiting shared by the ingestion clients (PMC downloads, LLM enhancement).
+## One bucket can be used from threads (`acquire`) and from asyncio tasks (`aacquire`).
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter. Callers reserve tokens up front and then wait until the bucket
+    would have refilled, so concurrent callers are served in arrival order without busy looping.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        :param rate: Tokens added per second (i.e. sustained requests per second).
+        :param capacity: Maximum burst size (defaults to `rate`, at least 1).
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take `tokens` from the bucket and return how long the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        wait_time = self._reserve(tokens)
+        if wait_time:
+            time.sleep(wait_time)
+
+    async def aacquire(self, tokens: float = 1.0):
+        wait_time = self._reserve(tokens)
+        if wait_time:
+            await asyncio.sleep(wait_time)
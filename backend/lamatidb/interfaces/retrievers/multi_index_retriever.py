@@ -0,0 +1,107 @@
+## Retriever that searches several vector indexes with a single query embedding.
+## All of our indexes (main, fulltext and the 15 PICO combinations) share the SciBERT embedding,
+## so the query is embedded once and the vector is fanned out to every index concurrently.
+
+import concurrent.futures
+from typing import Dict, List, Optional
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.callbacks.base import CallbackManager
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+FUSION_MODES = ("reciprocal_rank", "max", "sum", "mean")
+
+
+class MultiIndexRetriever(BaseRetriever):
+    """
+    Embed once, search many: runs the same query embedding against several retrievers
+    and merges the results with a configurable fusion strategy.
+
+    Fusion modes:
+    - reciprocal_rank: sum of weight / (rrf_k + rank) over the indexes a document appears in.
+    - max: highest weighted similarity across indexes.
+    - sum: sum of weighted similarities.
+    - mean: sum of weighted similarities divided by the number of indexes.
+
+    Results are merged on the `source` metadata key (falling back to node id), since the
+    same document has a different node in each index.
+    """
+
+    def __init__(
+        self,
+        retrievers: Dict[str, BaseRetriever],
+        embed_model: BaseEmbedding,
+        similarity_top_k: Optional[int] = 100,
+        fusion_mode: str = "reciprocal_rank",
+        weights: Optional[Dict[str, float]] = None,
+        similarity_cutoff: Optional[float] = None,
+        rrf_k: int = 60,
+        max_workers: Optional[int] = None,
+        callback_manager: Optional[CallbackManager] = None,
+    ):
+        if fusion_mode not in FUSION_MODES:
+            raise ValueError(f"Unsupported fusion mode '{fusion_mode}'. Use one of {FUSION_MODES}.")
+
+        self.retrievers = retrievers
+        self.embed_model = embed_model
+        self.similarity_top_k = similarity_top_k
+        self.fusion_mode = fusion_mode
+        self.weights = weights or {}
+        self.similarity_cutoff = similarity_cutoff
+        self.rrf_k = rrf_k
+        self.max_workers = max_workers or len(retrievers)
+        super().__init__(callback_manager=callback_manager)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        # Embed the query once; the vector retrievers skip embedding when it is already set
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self.embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs)
+
+        results = self._retrieve_all(query_bundle)
+        return self._fuse(results)
+
+    def _retrieve_all(self, query_bundle: QueryBundle) -> Dict[str, List[NodeWithScore]]:
+        results = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(retriever.retrieve, query_bundle): name
+                for name, retriever in self.retrievers.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                nodes = future.result()
+                if self.similarity_cutoff is not None:
+                    nodes = [node for node in nodes if (node.score or 0.0) >= self.similarity_cutoff]
+                results[futures[future]] = nodes
+        return results
+
+    def _fuse(self, results: Dict[str, List[NodeWithScore]]) -> List[NodeWithScore]:
+        fused_scores = {}
+        best_nodes = {}
+
+        for name, nodes in results.items():
+            weight = self.weights.get(name, 1.0)
+            for rank, node in enumerate(nodes):
+                key = node.node.metadata.get("source", node.node.node_id)
+                score = node.score or 0.0
+
+                if self.fusion_mode == "reciprocal_rank":
+                    contribution = weight / (self.rrf_k + rank + 1)
+                    fused_scores[key] = fused_scores.get(key, 0.0) + contribution
+                elif self.fusion_mode == "max":
+                    fused_scores[key] = max(fused_scores.get(key, float("-inf")), weight * score)
+                else:
+                    fused_scores[key] = fused_scores.get(key, 0.0) + weight * score
+
+                # Keep the best scoring node as the representative for this document
+                if key not in best_nodes or score > (best_nodes[key].score or 0.0):
+                    best_nodes[key] = node
+
+        if self.fusion_mode == "mean":
+            fused_scores = {key: score / len(self.retrievers) for key, score in fused_scores.items()}
+
+        ranked = sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
+        if self.similarity_top_k:
+            ranked = ranked[:self.similarity_top_k]
+
+        return [NodeWithScore(node=best_nodes[key].node, score=score) for key, score in ranked]
@@ -1,12 +1,27 @@
 from llama_index.core import Document
+from llama_index.core.schema import TextNode
 from lamatidb.interfaces.database_interfaces.database_interface import DatabaseInterface
+from lamatidb.interfaces.vector_stores.vector_bulk_writer import node_to_row
 import itertools
+import numpy as np
+
+PICO_COLUMNS = ['pico_p', 'pico_i', 'pico_c', 'pico_o']
+
+def get_pico_combinations(columns=PICO_COLUMNS):
+    """
+    All non-empty combinations of the PICO columns (15 for p/i/c/o), keyed by index suffix (e.g. 'pio').
+    """
+    combinations = []
+    for r in range(1, len(columns) + 1):
+        combinations += list(itertools.combinations(columns, r))
+    return {"".join([x.split("_")[-1] for x in combination]): combination for combination in combinations}
 
 class LoaderInterface:
     """
     Base loader interface for reading and processing data.
     Loaders return Document objects for LlamaIndex.
     """
+    key_column = 'documentId'  # Column the streaming loaders page on
     
     def __init__(self, db_type, db_name):
         """
@@ -20,6 +35,7 @@ class LoaderInterface:
         self.engine = self.mysql_interface.engine
         self.raw_data = None
         self.documents = None  # List of Document objects for LlamaIndex
+        self.keys_scanned = 0  # Distinct keys read by the last iter_documents/iter_documents_dict run
 
     def get_documents(self):
         """
@@ -29,6 +45,45 @@ class LoaderInterface:
         """
         return self.documents
 
+    def get_query(self):
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def load_data(self):
+        """Load all rows of the loader query into memory."""
+        self.raw_data = self.mysql_interface.fetch_data_from_db(self.get_query())
+
+    def row_to_document(self, row):
+        """Build the Document for one query row, or None if the row should be skipped."""
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def count_keys(self):
+        """Number of distinct `key_column` values the loader query currently returns."""
+        query = f"SELECT COUNT(DISTINCT {self.key_column}) FROM ({self.get_query().strip().rstrip(';')}) AS count_source"
+        return self.mysql_interface.fetch_data_from_db(query)[0][0]
+
+    def scan_was_complete(self):
+        """
+        Whether the last streaming run read every key of the loader query. Checked before deleting
+        documents that were not seen, so a stream that ended early never removes live vectors.
+        """
+        expected = self.count_keys()
+        if self.keys_scanned < expected:
+            print(f"Incomplete scan: {self.keys_scanned} of {expected} documents read.")
+            return False
+        return True
+
+    def iter_documents(self, batch_size=1000):
+        """
+        Page through the loader query (keyset pagination on `key_column`) and yield lists of about
+        `batch_size` Document objects, keeping memory flat regardless of the table size.
+        """
+        self.keys_scanned = 0
+        for rows in self.mysql_interface.paginate_data_from_db(self.get_query(), self.key_column, batch_size=batch_size):
+            self.keys_scanned += len({row._mapping[self.key_column] for row in rows})
+            documents = [document for document in (self.row_to_document(row) for row in rows) if document is not None]
+            if documents:
+                yield documents
+
 class LoaderPubMedAbstracts(LoaderInterface):
     """Loader class for fetching and processing PubMed data from MySQL."""
     
@@ -42,8 +97,8 @@ class LoaderPubMedAbstracts(LoaderInterface):
         self.sample_dict = None
         self.sample_text = None
 
-    def load_data(self):
-        """Load PubMed data from the MySQL database."""
+    def get_query(self):
+        """Query for PubMed data in the MySQL database."""
         # query = """
         # SELECT Document.documentId, title, author, abstract, `year`
         # FROM Document
@@ -65,8 +120,33 @@ class LoaderPubMedAbstracts(LoaderInterface):
         INNER JOIN DocumentAbstract ON Document.documentId = DocumentAbstract.documentId
         LEFT JOIN DocumentPICO_enhanced ON Document.documentId = DocumentPICO_enhanced.documentId;
         """
-
-        self.raw_data = self.mysql_interface.fetch_data_from_db(query)
+        return query
+
+    @staticmethod
+    def row_to_values(x):
+        return {'text': x[3], 'title': x[1], 'authors': x[2], 'year': x[4],
+                'pico_p': x[5], 'pico_i': x[6], 'pico_c': x[7], 'pico_o': x[8]}
+
+    def make_document(self, doc_id, values):
+        return Document(
+            text=values['text'],
+            metadata={
+                "source": doc_id,
+                "title": values['title'],
+                "authors": values['authors'],
+                "year": values['year'],
+                'pico_p': values['pico_p'],
+                'pico_i': values['pico_i'],
+                'pico_c': values['pico_c'],
+                'pico_o': values['pico_o']
+            },
+        )
+
+    def row_to_document(self, row):
+        # Filter out records without an abstract
+        if row[3] == '' or row[3] is None:
+            return None
+        return self.make_document(row[0], self.row_to_values(row))
 
     def clean_data(self):
 
@@ -83,8 +163,7 @@ class LoaderPubMedAbstracts(LoaderInterface):
         content = ignore_empty_abstract()
 
         # Convert the processed data into a dictionary and prepare text samples
-        self.sample_dict = {x[0]: {'text': x[3], 'title': x[1], 'authors': x[2], 'year': x[4], 
-                                   'pico_p': x[5], 'pico_i': x[6], 'pico_c': x[7], 'pico_o': x[8]} for x in content}
+        self.sample_dict = {x[0]: self.row_to_values(x) for x in content}
         self.sample_text = [x['text'] for x in self.sample_dict.values()]
 
 
@@ -100,22 +179,7 @@ class LoaderPubMedAbstracts(LoaderInterface):
         self.clean_data() # initialise self.sample_dict
 
         # Create LlamaIndex Document objects
-        self.documents = [
-            Document(
-                text=values['text'],
-                metadata={
-                    "source": doc_id,
-                    "title": values['title'],
-                    "authors": values['authors'],
-                    "year": values['year'],
-                    'pico_p': values['pico_p'],
-                    'pico_i': values['pico_i'],
-                    'pico_c': values['pico_c'],
-                    'pico_o': values['pico_o']
-                },
-            )
-            for doc_id, values in self.sample_dict.items()
-        ]
+        self.documents = [self.make_document(doc_id, values) for doc_id, values in self.sample_dict.items()]
 
 
 class LoaderPubMedPICO(LoaderPubMedAbstracts):
@@ -163,8 +227,8 @@ class LoaderPubMedPICO(LoaderPubMedAbstracts):
         with open('datalake/pubmed/recovered_pico_data.json', 'w') as json_file:
             json_file.write(json_data)
 
-    def load_data(self):
-        """Load PubMed data from the MySQL database: Only those with PICO values"""
+    def get_query(self):
+        """Query for PubMed data in the MySQL database: Only those with PICO values"""
         # query = """
         # SELECT Document.documentId, title, author, abstract, `year`
         # FROM Document
@@ -186,8 +250,35 @@ class LoaderPubMedPICO(LoaderPubMedAbstracts):
         INNER JOIN DocumentAbstract ON Document.documentId = DocumentAbstract.documentId
         INNER JOIN DocumentPICO_enhanced ON Document.documentId = DocumentPICO_enhanced.documentId;
         """
+        return query
 
-        self.raw_data = self.mysql_interface.fetch_data_from_db(query)
+    def make_documents_dict(self, sample_dict):
+        """Documents for every PICO combination, keyed by index suffix."""
+        # For each combination, generate a document with the concatenated values and metadata of doc_id
+        return {
+            index: [
+                Document(
+                    text=" ".join([values[col] for col in combination]),
+                    metadata={
+                        "source": doc_id
+                    },
+                )
+                for doc_id, values in sample_dict.items()
+            ]
+            for index, combination in get_pico_combinations().items()
+        }
+
+    def iter_documents_dict(self, batch_size=1000):
+        """
+        Streaming counterpart of process_data: yields, per batch of rows, a dict of
+        PICO combination key -> list of Document objects.
+        """
+        self.keys_scanned = 0
+        for rows in self.mysql_interface.paginate_data_from_db(self.get_query(), self.key_column, batch_size=batch_size):
+            self.keys_scanned += len({row._mapping[self.key_column] for row in rows})
+            sample_dict = {x[0]: self.row_to_values(x) for x in rows if x[3] != '' and x[3] is not None}
+            if sample_dict:
+                yield self.make_documents_dict(sample_dict)
 
     def process_data(self):
         """
@@ -200,29 +291,73 @@ class LoaderPubMedPICO(LoaderPubMedAbstracts):
         
         self.clean_data() # initialise self.sample_dict
 
-        # Define your columns
-        columns = ['pico_p', 'pico_i', 'pico_c', 'pico_o']
-
-        # Generate all combinations of the columns
-        combinations = []
-        for r in range(1, len(columns) + 1):
-            combinations += list(itertools.combinations(columns, r))
+        # Create LlamaIndex Document objects
+        self.documents_dict = self.make_documents_dict(self.sample_dict)
 
-        self.documents_dict = {}
+    @staticmethod
+    def embed_fields(sample_dict, embed_model, batch_size=256):
+        """
+        Embed every non-empty PICO field text once.
 
-        # For each combination, generate a document with the concatenated values and metadata of doc_id
-        for combination in combinations:
-            index = "".join([x.split("_")[-1] for x in combination])
-            # Create LlamaIndex Document objects
-            self.documents_dict[index] = [
-                Document(
-                    text=" ".join([values[col] for col in combination]),
-                    metadata={
-                        "source": doc_id
-                    },
-                )
-                for doc_id, values in self.sample_dict.items()
-            ]
+        :return: Dict of (documentId, PICO column) -> L2-normalised float32 vector.
+        """
+        field_keys, field_texts = [], []
+        for doc_id, values in sample_dict.items():
+            for col in PICO_COLUMNS:
+                if values[col] and values[col].strip():
+                    field_keys.append((doc_id, col))
+                    field_texts.append(values[col])
+
+        field_vectors = {}
+        for start in range(0, len(field_texts), batch_size):
+            embeddings = embed_model.get_text_embedding_batch(field_texts[start:start + batch_size])
+            for key, embedding in zip(field_keys[start:start + batch_size], embeddings):
+                vector = np.asarray(embedding, dtype=np.float32)
+                field_vectors[key] = vector / (np.linalg.norm(vector) or 1.0)
+        return field_vectors
+
+    def iter_pooled_rows(self, embed_model, weights=None, batch_size=1000, embed_batch_size=256):
+        """
+        Stream the rows of the 15 PICO combination tables with pooled embeddings, one page of documents at a time.
+
+        Each PICO field is embedded once per document and the combination vectors are derived
+        by pooling the field vectors (weighted mean of the normalised field vectors, re-normalised),
+        instead of embedding every concatenation separately. Rows are in the VectorBulkWriter
+        layout, so they can be written as they are produced.
+
+        :param embed_model: Embedding model used for the field texts.
+        :param weights: Optional dict of PICO column -> pooling weight (defaults to 1.0 each).
+        :param batch_size: Documents per page of the loader query.
+        :param embed_batch_size: Number of field texts embedded per call.
+        :return: Iterator of (combination key, rows) pairs.
+        """
+        weights = weights or {}
+        combinations = get_pico_combinations()
+        self.keys_scanned = 0
+        for rows in self.mysql_interface.paginate_data_from_db(self.get_query(), self.key_column, batch_size=batch_size):
+            self.keys_scanned += len({row._mapping[self.key_column] for row in rows})
+            sample_dict = {x[0]: self.row_to_values(x) for x in rows if x[3] != '' and x[3] is not None}
+            field_vectors = self.embed_fields(sample_dict, embed_model, embed_batch_size)
+
+            # Pool the field vectors for every combination
+            for index, combination in combinations.items():
+                nodes = []
+                for doc_id, values in sample_dict.items():
+                    present = [col for col in combination if (doc_id, col) in field_vectors]
+                    if not present:
+                        continue
+                    col_weights = np.array([weights.get(col, 1.0) for col in present], dtype=np.float32)
+                    pooled = np.average(np.vstack([field_vectors[(doc_id, col)] for col in present]), axis=0, weights=col_weights)
+                    pooled = pooled / (np.linalg.norm(pooled) or 1.0)
+                    nodes.append(
+                        TextNode(
+                            text=" ".join([values[col] for col in combination]),
+                            metadata={"source": doc_id},
+                            embedding=pooled.tolist(),
+                        )
+                    )
+                if nodes:
+                    yield index, [node_to_row(node) for node in nodes]
 
     def get_documents_dict(self):
         """
@@ -234,8 +369,8 @@ class LoaderPubMedPICO(LoaderPubMedAbstracts):
 
 class LoaderPubMedFullText(LoaderInterface):
     
-    def load_data(self):
-        """Load PubMed data from the MySQL database."""
+    def get_query(self):
+        """Query for PubMed full texts in the MySQL database."""
         # query = """
         # SELECT Document.documentId, title, author, abstract, `year`
         # FROM Document
@@ -249,8 +384,21 @@ class LoaderPubMedFullText(LoaderInterface):
             `fullText`
         FROM DocumentFull
         """
+        return query
+
+    def make_document(self, doc_id, values):
+        return Document(
+            text=values['text'],
+            metadata={
+                "source": doc_id,
+                "PMCID": values['PMCID']
+            },
+        )
 
-        self.raw_data = self.mysql_interface.fetch_data_from_db(query)
+    def row_to_document(self, row):
+        if row[2] is None:
+            return None
+        return self.make_document(row[0], {'text': row[2], 'PMCID': row[1]})
 
 
     def clean_data(self):
@@ -277,16 +425,7 @@ class LoaderPubMedFullText(LoaderInterface):
         self.clean_data() # initialise self.sample_dict
 
         # Create LlamaIndex Document objects
-        self.documents = [
-            Document(
-                text=values['text'],
-                metadata={
-                    "source": doc_id,
-                    "PMCID": values['PMCID']
-                },
-            )
-            for doc_id, values in self.sample_dict.items()
-        ]
+        self.documents = [self.make_document(doc_id, values) for doc_id, values in self.sample_dict.items()]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+## TiDBVectorStore whose metadata filters use indexed generated columns (see VectorIndexManager.ensure_metadata_columns).
+## Filters on materialised keys (source, year, PMCID) become predicates on B-tree indexed columns, so a filtered
+## top-k reads only the matching rows instead of evaluating JSON_EXTRACT(meta, ...) on every row of the table.
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from llama_index.vector_stores.tidbvector import TiDBVectorStore
+
+from lamatidb.interfaces.vector_stores.vector_index_manager import DISTANCE_FUNCTIONS
+
+_logger = logging.getLogger(__name__)
+
+COMPARISON_OPERATORS = {
+    FilterOperator.EQ: "=",
+    FilterOperator.NE: "!=",
+    FilterOperator.GT: ">",
+    FilterOperator.GTE: ">=",
+    FilterOperator.LT: "<",
+    FilterOperator.LTE: "<=",
+}
+
+
+class IndexedMetadataTiDBVectorStore(TiDBVectorStore):
+    """
+    TiDBVectorStore that answers filtered queries with its own SQL when a filter touches an indexed
+    metadata column. Queries without such filters go through the regular TiDBVectorStore path.
+    """
+
+    _table_name: str = PrivateAttr()
+    _distance_function: str = PrivateAttr()
+    _indexed_columns: Dict[str, str] = PrivateAttr()
+
+    def __init__(self, *args: Any, indexed_columns: Optional[Dict[str, str]] = None, **kwargs: Any) -> None:
+        """
+        :param indexed_columns: Metadata key -> indexed generated column (e.g. {"source": "meta_source"}).
+        """
+        super().__init__(*args, **kwargs)
+        self._table_name = self._tidb._table_name
+        self._distance_function = DISTANCE_FUNCTIONS[self._tidb._distance_strategy or "cosine"]
+        self._indexed_columns = dict(indexed_columns or {})
+
+    @property
+    def indexed_columns(self) -> Dict[str, str]:
+        return self._indexed_columns
+
+    def set_indexed_columns(self, indexed_columns: Dict[str, str]):
+        self._indexed_columns = dict(indexed_columns)
+
+    def _uses_indexed_columns(self, filters: MetadataFilters) -> bool:
+        for metadata_filter in filters.filters:
+            if isinstance(metadata_filter, MetadataFilters):
+                if self._uses_indexed_columns(metadata_filter):
+                    return True
+            elif metadata_filter.key in self._indexed_columns:
+                return True
+        return False
+
+    def _filter_clause(self, filters: MetadataFilters, params: Dict[str, Any]) -> str:
+        """SQL predicate for the filters; values are bound into `params`."""
+        clauses = []
+        for metadata_filter in filters.filters:
+            if isinstance(metadata_filter, MetadataFilters):
+                clauses.append(f"({self._filter_clause(metadata_filter, params)})")
+                continue
+
+            column = self._indexed_columns.get(metadata_filter.key)
+            if column:
+                # Generated columns hold the unquoted JSON value as text, so values are compared as strings
+                expression = f"`{column}`"
+                value = metadata_filter.value
+                value = [str(x) for x in value] if isinstance(value, list) else str(value)
+            else:
+                # Same predicate as the TiDB vector client for keys that are not materialised
+                path_name = f"p{len(params)}"
+                params[path_name] = f"$.{metadata_filter.key}"
+                expression = f"JSON_EXTRACT(meta, :{path_name})"
+                value = metadata_filter.value
+
+            name = f"p{len(params)}"
+            operator = metadata_filter.operator
+            if operator in (FilterOperator.IN, FilterOperator.NIN):
+                params[name] = value if isinstance(value, list) else [value]
+                negation = "NOT " if operator == FilterOperator.NIN else ""
+                clauses.append(f"{expression} {negation}IN :{name}")
+            elif operator in COMPARISON_OPERATORS:
+                params[name] = value
+                clauses.append(f"{expression} {COMPARISON_OPERATORS[operator]} :{name}")
+            else:
+                raise ValueError(f"Unsupported operator: {operator}")
+
+        if not clauses:
+            return "TRUE"
+        joiner = " OR " if filters.condition == FilterCondition.OR else " AND "
+        return joiner.join(clauses)
+
+    def _similarity_search_with_score(
+        self,
+        embedding: List[float],
+        limit: int = 10,
+        metadata_filters: Optional[MetadataFilters] = None,
+        **kwargs: Any,
+    ) -> VectorStoreQueryResult:
+        if metadata_filters is None or not self._uses_indexed_columns(metadata_filters):
+            return super()._similarity_search_with_score(embedding, limit, metadata_filters, **kwargs)
+
+        params = {}
+        where = self._filter_clause(metadata_filters, params)
+        params["query_vector"] = "[" + ",".join(str(float(x)) for x in embedding) + "]"
+        limit_clause = f" LIMIT {int(limit)}" if limit else ""
+        statement = text(
+            f"SELECT id, document, meta, {self._distance_function}(embedding, :query_vector) AS distance "
+            f"FROM `{self._table_name}` WHERE {where} ORDER BY distance{limit_clause}"
+        ).bindparams(*[bindparam(name, expanding=True) for name, value in params.items() if isinstance(value, list)])
+
+        with self._tidb._bind.connect() as conn:
+            rows = conn.execute(statement, params).fetchall()
+
+        nodes = []
+        similarities = []
+        ids = []
+        for row in rows:
+            metadata = json.loads(row.meta) if isinstance(row.meta, (str, bytes)) else row.meta
+            try:
+                node = metadata_dict_to_node(metadata)
+                node.set_content(str(row.document))
+            except Exception:
+                _logger.warning("Failed to parse metadata dict, falling back to legacy logic.")
+                node = TextNode(id_=row.id, text=row.document, metadata=metadata)
+            similarities.append((1 - row.distance) if row.distance is not None else 0)
+            ids.append(row.id)
+            nodes.append(node)
+
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
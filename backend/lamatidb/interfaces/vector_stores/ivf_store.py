@@ -0,0 +1,171 @@
+## Approximate (IVF) in-process vector store for the large tables (scibert_alldata, _fulltext).
+## Rows of the local snapshot are clustered with spherical k-means; a query only scans the
+## inverted lists of its `nprobe` closest centroids.
+
+import json
+import os
+import time
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import VectorStoreQuery, VectorStoreQueryResult
+
+from lamatidb.interfaces.vector_stores.local_numpy_store import LocalNumpyVectorStore, normalize_rows
+
+CENTROIDS_FILE = "ivf_centroids.npy"
+ASSIGNMENTS_FILE = "ivf_assignments.npy"
+IVF_PARAMS_FILE = "ivf_params.json"
+
+
+def train_kmeans(samples: np.ndarray, nlist: int, n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on L2-normalised rows. Returns (nlist, dim) unit-norm centroids.
+    """
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(samples))
+    centroids = samples[rng.choice(len(samples), size=nlist, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = np.argmax(samples @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, samples)
+        counts = np.bincount(assignments, minlength=nlist)
+
+        # Re-seed empty clusters with random samples
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = samples[rng.choice(len(samples), size=len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+
+    return centroids.astype(np.float32)
+
+
+class IVFVectorStore(LocalNumpyVectorStore):
+    """
+    Inverted-file approximate search over a local snapshot.
+
+    Tuning knobs:
+    - nlist: number of k-means clusters (defaults to ~4 * sqrt(rows)).
+    - nprobe: clusters scanned per query; higher is slower with better recall.
+      Can be overridden per query through `vector_store_kwargs={"nprobe": ...}`.
+
+    New nodes added with `add` are assigned to their nearest centroid and appended as delta
+    rows (see LocalNumpyVectorStore.persist), so the index accepts incremental inserts
+    without retraining. Call `train` to rebuild the clusters after large ingests.
+    """
+
+    nlist: Optional[int] = None
+    nprobe: int = 8
+    training_sample_size: int = 100000
+
+    _centroids: Any = PrivateAttr()
+    _assignments: Any = PrivateAttr()
+    _lists: List[np.ndarray] = PrivateAttr()
+
+    def __init__(self, snapshot_path: str, nlist: Optional[int] = None, nprobe: int = 8, **kwargs: Any):
+        super().__init__(snapshot_path=snapshot_path, nlist=nlist, nprobe=nprobe, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "IVFVectorStore"
+
+    def load_snapshot(self):
+        super().load_snapshot()
+        if os.path.exists(os.path.join(self.snapshot_path, CENTROIDS_FILE)):
+            self._centroids = np.load(os.path.join(self.snapshot_path, CENTROIDS_FILE))
+            self._assignments = np.load(os.path.join(self.snapshot_path, ASSIGNMENTS_FILE))
+            self._build_lists()
+        else:
+            self._centroids = None
+            self._assignments = None
+            self._lists = []
+
+    def train(self, nlist: Optional[int] = None, n_iter: int = 20):
+        """Cluster the snapshot and assign every row to an inverted list, then save to disk."""
+        start_time = time.time()
+        rows = len(self._ids)
+        if rows == 0:
+            return
+
+        nlist = nlist or self.nlist or max(1, int(4 * np.sqrt(rows)))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(rows, size=min(rows, self.training_sample_size), replace=False))
+        samples = np.asarray(self._embedding_take(sample_rows), dtype=np.float32)
+
+        self._centroids = train_kmeans(samples, nlist, n_iter=n_iter)
+        self._assignments = self._assign(0, rows)
+        self._build_lists()
+        self._save_ivf(self.snapshot_path, self._centroids, self._assignments)
+
+        elapsed_time = time.time() - start_time
+        print(f"IVF index trained with {len(self._centroids)} lists over {rows} rows in {elapsed_time:.2f} seconds")
+
+    def _assign(self, start: int, end: int) -> np.ndarray:
+        assignments = np.empty(end - start, dtype=np.int32)
+        for block_start in range(start, end, self.block_size):
+            block_end = min(block_start + self.block_size, end)
+            block = np.asarray(self._embedding_slice(block_start, block_end), dtype=np.float32)
+            assignments[block_start - start:block_end - start] = np.argmax(block @ self._centroids.T, axis=1)
+        return assignments
+
+    def _build_lists(self):
+        order = np.argsort(self._assignments, kind="stable")
+        bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+    def _save_ivf(self, path: str, centroids: np.ndarray, assignments: np.ndarray):
+        np.save(os.path.join(path, CENTROIDS_FILE), centroids)
+        np.save(os.path.join(path, ASSIGNMENTS_FILE), assignments)
+        with open(os.path.join(path, IVF_PARAMS_FILE), "w") as params_file:
+            json.dump({"nlist": int(len(centroids)), "rows": int(len(assignments)), "trained_at": time.time()}, params_file)
+
+    def ensure_trained(self):
+        if self._centroids is None:
+            self.train()
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        start = len(self._ids)
+        ids = super().add(nodes, **add_kwargs)
+        if self._centroids is not None and ids:
+            self._assignments = np.concatenate([self._assignments, self._assign(start, len(self._ids))])
+            self._build_lists()
+        return ids
+
+    def persist(self, persist_path: str = None, fs=None) -> None:
+        persist_path = persist_path or self.snapshot_path
+        compacting = persist_path != self.snapshot_path or self._deleted.any()
+        centroids = self._centroids
+        assignments = None if self._assignments is None else self._assignments[~self._deleted]
+
+        super().persist(persist_path)
+        if centroids is not None:
+            # Assignments are one int32 per row, so rewriting them is cheap next to the embeddings
+            self._save_ivf(persist_path, centroids, assignments)
+            if compacting and persist_path == self.snapshot_path:
+                self.load_snapshot()
+
+    def query(self, query: VectorStoreQuery, nprobe: Optional[int] = None, **kwargs: Any) -> VectorStoreQueryResult:
+        if self._centroids is None:
+            return super().query(query, **kwargs)
+
+        query_embedding = np.asarray(query.query_embedding, dtype=np.float32)
+        query_embedding = query_embedding / (np.linalg.norm(query_embedding) or 1.0)
+
+        # Probe the closest lists only
+        nprobe = min(nprobe or self.nprobe, len(self._centroids))
+        centroid_scores = self._centroids @ query_embedding
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        candidates = np.sort(np.concatenate([self._lists[i] for i in probe]))
+
+        # Filters are evaluated on the probed rows only
+        mask = ~self._deleted[candidates]
+        if query.filters is not None:
+            mask &= self._filter_mask(query.filters, candidates)
+        if query.node_ids:
+            mask &= np.isin(self._id_column()[candidates], query.node_ids)
+        candidates = candidates[mask]
+
+        scores = self._score(query_embedding, candidates)
+        return self._top_k(scores, candidates, query.similarity_top_k)
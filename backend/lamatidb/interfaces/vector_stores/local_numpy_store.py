@@ -0,0 +1,451 @@
+## In-process exact-search vector store over a memory-mapped snapshot of a TiDB vector table.
+## The PICO tables are small enough that a batched NumPy scan beats the remote ANN round trip.
+
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, TextNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.jsonl"
+MANIFEST_FILE = "manifest.json"
+# Rows added after the snapshot was built are appended here (raw rows in the snapshot dtype)
+DELTA_EMBEDDINGS_FILE = "delta_embeddings.bin"
+DELTA_RECORDS_FILE = "delta_records.jsonl"
+
+
+def parse_embedding(value) -> np.ndarray:
+    """Parse a TiDB VECTOR value (returned as '[0.1,0.2,...]' text) into a float32 array."""
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class MetadataColumn(NamedTuple):
+    """
+    Typed view of one metadata key over all rows, built once per snapshot load.
+
+    codes: index into `categories` of each row's value as a string (-1 for missing values).
+    categories: sorted unique string values.
+    numeric: float value of each row (numbers and numeric strings such as "2019"), NaN otherwise.
+    """
+    codes: np.ndarray
+    categories: np.ndarray
+    numeric: np.ndarray
+
+
+def build_metadata_column(values: Sequence[Any]) -> MetadataColumn:
+    present = np.array([value is not None for value in values], dtype=bool)
+    strings = np.array(["" if value is None else str(value) for value in values], dtype=object)
+    categories, codes = np.unique(strings[present].astype(str), return_inverse=True)
+    all_codes = np.full(len(values), -1, dtype=np.int32)
+    all_codes[present] = codes
+
+    numeric = np.full(len(values), np.nan, dtype=np.float64)
+    for i, value in enumerate(values):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            numeric[i] = value
+        elif isinstance(value, str):
+            try:
+                numeric[i] = float(value)
+            except ValueError:
+                pass
+    return MetadataColumn(codes=all_codes, categories=categories, numeric=numeric)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def build_snapshot(engine, table_name: str, snapshot_path: str, dtype: str = "float32",
+                   vector_dimension: int = 768, batch_size: int = 5000) -> int:
+    """
+    Snapshot a TiDB vector table (id, document, meta, embedding) to local disk.
+
+    Embeddings are L2-normalised and written to a memory-mapped .npy matrix so cosine
+    similarity becomes a dot product. The snapshot is written to a temporary directory
+    and swapped in atomically.
+
+    :return: Number of rows written.
+    """
+    start_time = time.time()
+    tmp_path = f"{snapshot_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    with engine.connect() as conn:
+        total_rows = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+        embeddings = np.lib.format.open_memmap(
+            os.path.join(tmp_path, EMBEDDINGS_FILE), mode="w+", dtype=dtype, shape=(max(total_rows, 1), vector_dimension)
+        )
+
+        rows_written = 0
+        result = conn.execution_options(stream_results=True).execute(
+            text(f"SELECT id, document, meta, embedding FROM {table_name}")
+        )
+        with open(os.path.join(tmp_path, RECORDS_FILE), "w") as records_file:
+            for rows in result.partitions(batch_size):
+                # Rows inserted after the COUNT are picked up by the next refresh
+                rows = rows[:total_rows - rows_written]
+                if not rows:
+                    break
+                batch = np.vstack([parse_embedding(row[3]) for row in rows])
+                embeddings[rows_written:rows_written + len(rows)] = normalize_rows(batch).astype(dtype)
+                for row in rows:
+                    meta = json.loads(row[2]) if isinstance(row[2], (str, bytes)) else (row[2] or {})
+                    records_file.write(json.dumps({"id": row[0], "text": row[1], "meta": meta}) + "\n")
+                rows_written += len(rows)
+
+        embeddings.flush()
+        del embeddings
+
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as manifest_file:
+        json.dump({
+            "table": table_name,
+            "rows": rows_written,
+            "dimension": vector_dimension,
+            "dtype": dtype,
+            "created_at": time.time(),
+        }, manifest_file)
+
+    shutil.rmtree(snapshot_path, ignore_errors=True)
+    os.replace(tmp_path, snapshot_path)
+
+    elapsed_time = time.time() - start_time
+    print(f"Snapshot of {table_name}: {rows_written} rows written to {snapshot_path} in {elapsed_time:.2f} seconds")
+    return rows_written
+
+
+class LocalNumpyVectorStore(BasePydanticVectorStore):
+    """
+    Exact top-k cosine search over a memory-mapped embedding snapshot.
+
+    Queries are answered with batched matrix products over `block_size` rows at a time,
+    so float16 snapshots larger than RAM can still be scanned. Metadata filters are
+    evaluated column-wise before scoring, on typed columns (category codes and numeric
+    values) built once per key and snapshot load.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+    snapshot_path: str
+    block_size: int = 65536
+
+    _embeddings: Any = PrivateAttr()
+    _delta_embeddings: Any = PrivateAttr()
+    _persisted_rows: int = PrivateAttr()
+    _id_array: Any = PrivateAttr()
+    _ids: List[str] = PrivateAttr()
+    _texts: List[Optional[str]] = PrivateAttr()
+    _metadata: List[Dict[str, Any]] = PrivateAttr()
+    _deleted: Any = PrivateAttr()
+    _columns: Dict[str, MetadataColumn] = PrivateAttr()
+
+    def __init__(self, snapshot_path: str, block_size: int = 65536, **kwargs: Any):
+        super().__init__(snapshot_path=snapshot_path, block_size=block_size, **kwargs)
+        self.load_snapshot()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalNumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    def load_snapshot(self):
+        """(Re)load the snapshot from disk, memory-mapping the embedding matrix and merging the delta rows."""
+        manifest = self._read_manifest()
+
+        rows = manifest["rows"]
+        self._embeddings = np.load(os.path.join(self.snapshot_path, EMBEDDINGS_FILE), mmap_mode="r")[:rows]
+
+        # Only the rows recorded in the manifest count; anything past them is a partial append
+        delta_rows = manifest.get("delta_rows", 0)
+        dimension = self._embeddings.shape[1]
+        if delta_rows:
+            self._delta_embeddings = np.fromfile(os.path.join(self.snapshot_path, DELTA_EMBEDDINGS_FILE),
+                                                 dtype=self._embeddings.dtype, count=delta_rows * dimension
+                                                 ).reshape(delta_rows, dimension)
+        else:
+            self._delta_embeddings = np.empty((0, dimension), dtype=self._embeddings.dtype)
+
+        self._ids, self._texts, self._metadata = [], [], []
+        self._read_records(os.path.join(self.snapshot_path, RECORDS_FILE), rows)
+        if delta_rows:
+            self._read_records(os.path.join(self.snapshot_path, DELTA_RECORDS_FILE), delta_rows)
+
+        self._persisted_rows = len(self._ids)
+        self._deleted = np.zeros(len(self._ids), dtype=bool)
+        self._columns = {}
+        self._id_array = None
+
+    def _read_manifest(self) -> dict:
+        with open(os.path.join(self.snapshot_path, MANIFEST_FILE)) as manifest_file:
+            return json.load(manifest_file)
+
+    def _read_records(self, path: str, rows: int):
+        with open(path) as records_file:
+            for _, line in zip(range(rows), records_file):
+                record = json.loads(line)
+                self._ids.append(record["id"])
+                self._texts.append(record["text"])
+                self._metadata.append(record["meta"])
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _embedding_slice(self, start: int, end: int) -> np.ndarray:
+        """Embedding rows [start, end) across the memory-mapped snapshot and the delta rows."""
+        base_rows = len(self._embeddings)
+        if end <= base_rows:
+            return self._embeddings[start:end]
+        if start >= base_rows:
+            return self._delta_embeddings[start - base_rows:end - base_rows]
+        return np.vstack([self._embeddings[start:], self._delta_embeddings[:end - base_rows]])
+
+    def _embedding_take(self, rows: np.ndarray) -> np.ndarray:
+        """Embedding rows at the (sorted) indices `rows`."""
+        base_rows = len(self._embeddings)
+        in_base = rows < base_rows
+        if in_base.all():
+            return self._embeddings[rows]
+        taken = np.empty((len(rows), self._embeddings.shape[1]), dtype=self._embeddings.dtype)
+        taken[in_base] = self._embeddings[rows[in_base]]
+        taken[~in_base] = self._delta_embeddings[rows[~in_base] - base_rows]
+        return taken
+
+    def _id_column(self) -> np.ndarray:
+        """Row ids as an object array, cached until the snapshot changes."""
+        if self._id_array is None:
+            self._id_array = np.array(self._ids, dtype=object)
+        return self._id_array
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """
+        Append nodes (with embeddings) as delta rows; the memory-mapped snapshot is left untouched.
+        Call `persist` to append them to the snapshot's delta files.
+        """
+        if not nodes:
+            return []
+
+        new_embeddings = normalize_rows(np.vstack([np.asarray(node.get_embedding(), dtype=np.float32) for node in nodes]))
+        self._delta_embeddings = np.vstack([self._delta_embeddings, new_embeddings.astype(self._embeddings.dtype)])
+        for node in nodes:
+            self._ids.append(node.node_id)
+            self._texts.append(node.get_content())
+            self._metadata.append(node_to_metadata_dict(node, remove_text=True, flat_metadata=self.flat_metadata))
+        self._deleted = np.concatenate([self._deleted, np.zeros(len(nodes), dtype=bool)])
+        self._columns = {}
+        self._id_array = None
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Mark every row belonging to `ref_doc_id` as deleted."""
+        for i, meta in enumerate(self._metadata):
+            if meta.get("ref_doc_id") == ref_doc_id or meta.get("doc_id") == ref_doc_id:
+                self._deleted[i] = True
+
+    def persist(self, persist_path: str = None, fs=None) -> None:
+        """
+        Save rows added since the last load/persist. New rows are appended to the delta files of
+        the snapshot; deleted rows (or a different `persist_path`) require a full `compact`.
+        """
+        persist_path = persist_path or self.snapshot_path
+        if persist_path != self.snapshot_path or self._deleted.any():
+            self.compact(persist_path)
+        else:
+            self._append_delta()
+
+    @staticmethod
+    def _truncate(path: str, size: int):
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def _append_delta(self):
+        if self._persisted_rows == len(self._ids):
+            return
+
+        manifest = self._read_manifest()
+        embeddings_path = os.path.join(self.snapshot_path, DELTA_EMBEDDINGS_FILE)
+        records_path = os.path.join(self.snapshot_path, DELTA_RECORDS_FILE)
+        row_bytes = self._embeddings.shape[1] * self._embeddings.dtype.itemsize
+
+        # Drop whatever an interrupted persist wrote past the rows recorded in the manifest
+        self._truncate(embeddings_path, manifest.get("delta_rows", 0) * row_bytes)
+        self._truncate(records_path, manifest.get("delta_records_bytes", 0))
+
+        delta_start = self._persisted_rows - len(self._embeddings)
+        with open(embeddings_path, "ab") as embeddings_file:
+            self._delta_embeddings[delta_start:].tofile(embeddings_file)
+        with open(records_path, "a") as records_file:
+            for i in range(self._persisted_rows, len(self._ids)):
+                records_file.write(json.dumps({"id": self._ids[i], "text": self._texts[i], "meta": self._metadata[i]}) + "\n")
+
+        manifest["delta_rows"] = int(len(self._delta_embeddings))
+        manifest["delta_records_bytes"] = os.path.getsize(records_path)
+        manifest_tmp_path = os.path.join(self.snapshot_path, f"{MANIFEST_FILE}.tmp")
+        with open(manifest_tmp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(manifest_tmp_path, os.path.join(self.snapshot_path, MANIFEST_FILE))
+        self._persisted_rows = len(self._ids)
+
+    def compact(self, persist_path: str = None) -> None:
+        """Rewrite the snapshot with the delta rows merged in and the deleted rows dropped."""
+        persist_path = persist_path or self.snapshot_path
+        keep = np.flatnonzero(~self._deleted)
+        tmp_path = f"{persist_path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        embeddings = np.lib.format.open_memmap(
+            os.path.join(tmp_path, EMBEDDINGS_FILE), mode="w+", dtype=self._embeddings.dtype,
+            shape=(max(len(keep), 1), self._embeddings.shape[1])
+        )
+        for start in range(0, len(keep), self.block_size):
+            block = keep[start:start + self.block_size]
+            embeddings[start:start + len(block)] = self._embedding_take(block)
+        embeddings.flush()
+        del embeddings
+
+        with open(os.path.join(tmp_path, RECORDS_FILE), "w") as records_file:
+            for i in keep:
+                records_file.write(json.dumps({"id": self._ids[i], "text": self._texts[i], "meta": self._metadata[i]}) + "\n")
+
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as manifest_file:
+            json.dump({
+                "table": os.path.basename(persist_path),
+                "rows": int(len(keep)),
+                "dimension": int(self._embeddings.shape[1]),
+                "dtype": str(self._embeddings.dtype),
+                "created_at": time.time(),
+            }, manifest_file)
+
+        shutil.rmtree(persist_path, ignore_errors=True)
+        os.replace(tmp_path, persist_path)
+        if persist_path == self.snapshot_path:
+            self.load_snapshot()
+
+    def _column(self, key: str) -> MetadataColumn:
+        """Typed metadata column for `key`, built on first use and cached until the snapshot changes."""
+        if key not in self._columns:
+            self._columns[key] = build_metadata_column([meta.get(key) for meta in self._metadata])
+        return self._columns[key]
+
+    def _filter_mask(self, filters: MetadataFilters, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Boolean mask of the rows matching `filters`.
+
+        :param rows: Row indices to evaluate (e.g. IVF candidates); defaults to every row.
+        """
+        size = len(self._ids) if rows is None else len(rows)
+        masks = []
+        for metadata_filter in filters.filters:
+            if isinstance(metadata_filter, MetadataFilters):
+                masks.append(self._filter_mask(metadata_filter, rows))
+                continue
+
+            column = self._column(metadata_filter.key)
+            value = metadata_filter.value
+            operator = metadata_filter.operator
+
+            if operator in (FilterOperator.IN, FilterOperator.NIN, FilterOperator.EQ, FilterOperator.NE):
+                # Values are compared as strings, through the category codes
+                values = np.array([str(x) for x in (value if isinstance(value, list) else [value])], dtype=str)
+                positions = np.searchsorted(column.categories, values)
+                found = positions < len(column.categories)
+                found[found] = column.categories[positions[found]] == values[found]
+                codes = column.codes if rows is None else column.codes[rows]
+                mask = np.isin(codes, positions[found])
+                if operator in (FilterOperator.NIN, FilterOperator.NE):
+                    mask = ~mask
+            elif operator in (FilterOperator.GT, FilterOperator.GTE, FilterOperator.LT, FilterOperator.LTE):
+                numeric = column.numeric if rows is None else column.numeric[rows]
+                value = float(value)
+                with np.errstate(invalid="ignore"):
+                    if operator == FilterOperator.GT:
+                        mask = numeric > value
+                    elif operator == FilterOperator.GTE:
+                        mask = numeric >= value
+                    elif operator == FilterOperator.LT:
+                        mask = numeric < value
+                    else:
+                        mask = numeric <= value
+            else:
+                raise ValueError(f"Unsupported filter operator for local vector store: {operator}")
+            masks.append(mask)
+
+        if not masks:
+            return np.ones(size, dtype=bool)
+        if filters.condition == FilterCondition.OR:
+            return np.logical_or.reduce(masks)
+        return np.logical_and.reduce(masks)
+
+    def _score(self, query_embedding: np.ndarray, candidates: Optional[np.ndarray]) -> np.ndarray:
+        """Cosine similarity of the query against all rows (or the candidate rows), block by block."""
+        rows = len(self._ids) if candidates is None else len(candidates)
+        scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, self.block_size):
+            end = min(start + self.block_size, rows)
+            if candidates is None:
+                block = self._embedding_slice(start, end)
+            else:
+                block = self._embedding_take(candidates[start:end])
+            scores[start:end] = block.astype(np.float32, copy=False) @ query_embedding
+        return scores
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        query_embedding = np.asarray(query.query_embedding, dtype=np.float32)
+        query_embedding = query_embedding / (np.linalg.norm(query_embedding) or 1.0)
+
+        mask = ~self._deleted
+        if query.filters is not None:
+            mask &= self._filter_mask(query.filters)
+        if query.node_ids:
+            mask &= np.isin(self._id_column(), query.node_ids)
+
+        candidates = None if mask.all() else np.flatnonzero(mask)
+        scores = self._score(query_embedding, candidates)
+        return self._top_k(scores, candidates, query.similarity_top_k)
+
+    def _top_k(self, scores: np.ndarray, candidates: Optional[np.ndarray], top_k: Optional[int]) -> VectorStoreQueryResult:
+        if top_k is not None and top_k < len(scores):
+            top = np.argpartition(-scores, top_k - 1)[:top_k] if top_k > 0 else np.array([], dtype=int)
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        rows = top if candidates is None else candidates[top]
+
+        nodes, similarities, ids = [], [], []
+        for row, score in zip(rows, scores[top]):
+            nodes.append(self._to_node(int(row)))
+            similarities.append(float(score))
+            ids.append(self._ids[row])
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
+
+    def _to_node(self, row: int) -> BaseNode:
+        meta = self._metadata[row]
+        try:
+            node = metadata_dict_to_node(meta, text=self._texts[row])
+        except Exception:
+            node = TextNode(id_=self._ids[row], text=self._texts[row] or "", metadata=meta)
+        return node
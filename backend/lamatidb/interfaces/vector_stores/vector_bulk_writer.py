@@ -0,0 +1,169 @@
+## Bulk writer for TiDB vector tables (the TiDBVectorStore layout: id, embedding, document, meta).
+## Embedding and writing are decoupled: an embedding producer fills a bounded queue of row batches
+## that a small pool of writer threads drains with multi-row INSERTs, one connection each.
+## Batches can target different tables of the same database (e.g. the 15 PICO combination tables).
+
+import json
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+# (id, embedding, metadata, text)
+VectorRow = Tuple[str, Sequence[float], dict, str]
+
+_STOP = object()
+
+
+def node_to_row(node: BaseNode) -> VectorRow:
+    """Same row content as TiDBVectorStore.add for a node with an embedding."""
+    return (
+        node.node_id,
+        node.get_embedding(),
+        node_to_metadata_dict(node, remove_text=True, flat_metadata=False),
+        node.get_content(metadata_mode=MetadataMode.NONE) or "",
+    )
+
+
+class VectorBulkWriter:
+    """
+    Writes precomputed (id, embedding, metadata, text) rows into TiDB vector tables with
+    multi-row INSERTs over `parallelism` concurrent connections.
+    """
+
+    def __init__(self, engine, table_name: str = None, batch_size: int = 500, parallelism: int = 4, queue_size: int = None):
+        """
+        :param engine: SQLAlchemy engine of the vector database (pool size >= parallelism).
+        :param table_name: Vector table written by `write_batches`/`write_nodes`.
+        :param batch_size: Rows per INSERT/commit.
+        :param parallelism: Number of concurrent writer connections.
+        :param queue_size: Maximum number of batches waiting to be written (defaults to 2 * parallelism).
+        """
+        self.engine = engine
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.parallelism = parallelism
+        self.queue_size = queue_size or 2 * parallelism
+        self.rows_written = 0
+        self.rows_written_by_table: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _insert(self, conn, table_name: str, rows: List[VectorRow]):
+        placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+        params = []
+        for row_id, embedding, metadata, text in rows:
+            params += [row_id, "[" + ",".join(str(float(x)) for x in embedding) + "]", text, json.dumps(metadata)]
+        conn.exec_driver_sql(
+            f"INSERT INTO `{table_name}` (id, embedding, document, meta) VALUES {placeholders}", tuple(params)
+        )
+        conn.commit()
+
+    def _writer(self, batches: queue.Queue, errors: list):
+        try:
+            with self.engine.connect() as conn:
+                while True:
+                    item = batches.get()
+                    if item is _STOP:
+                        return
+                    if errors:
+                        continue  # Drain the queue so the producer is never blocked
+                    table_name, rows = item
+                    try:
+                        self._insert(conn, table_name, rows)
+                        with self._lock:
+                            self.rows_written += len(rows)
+                            self.rows_written_by_table[table_name] = self.rows_written_by_table.get(table_name, 0) + len(rows)
+                    except Exception as e:
+                        errors.append(e)
+        except Exception as e:
+            # Connect error or pool timeout: this writer is gone, the producer sees the error
+            errors.append(e)
+
+    @staticmethod
+    def _put(batches: queue.Queue, item, writers: List[threading.Thread], errors: list = None) -> bool:
+        """
+        Put `item` on the bounded queue without blocking forever: gives up once no writer is alive
+        (or, when `errors` is given, once a writer has failed).
+        """
+        while True:
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if (errors is not None and errors) or not any(writer.is_alive() for writer in writers):
+                    return False
+
+    def write_batches(self, row_batches: Iterable[List[VectorRow]]) -> int:
+        """
+        Write row batches as they are produced. `row_batches` is consumed in the calling thread
+        (e.g. a generator that embeds the next batch) while earlier batches are being written.
+
+        :return: Number of rows written.
+        """
+        return self.write_table_batches((self.table_name, rows) for rows in row_batches)
+
+    def write_table_batches(self, table_batches: Iterable[Tuple[str, List[VectorRow]]]) -> int:
+        """
+        Like `write_batches`, for (table name, rows) pairs: one pool of writer connections fills
+        several tables of the same database. Rows per table are in `rows_written_by_table`.
+
+        :return: Number of rows written over all tables.
+        """
+        start_time = time.time()
+        self.rows_written = 0
+        self.rows_written_by_table = {}
+        batches = queue.Queue(maxsize=self.queue_size)
+        errors = []
+        writers = [threading.Thread(target=self._writer, args=(batches, errors), name=f"vector-writer-{i}", daemon=True)
+                   for i in range(self.parallelism)]
+        for writer in writers:
+            writer.start()
+
+        try:
+            for table_name, rows in table_batches:
+                if errors:
+                    break
+                for start in range(0, len(rows), self.batch_size):
+                    if not self._put(batches, (table_name, rows[start:start + self.batch_size]), writers, errors):
+                        break
+        finally:
+            for _ in writers:
+                if not self._put(batches, _STOP, writers):
+                    break
+            for writer in writers:
+                writer.join()
+
+        if errors:
+            raise errors[0]
+
+        elapsed_time = time.time() - start_time
+        rate = self.rows_written / elapsed_time if elapsed_time > 0 else float("inf")
+        tables = list(self.rows_written_by_table) or [self.table_name]
+        target = tables[0] if len(tables) == 1 else f"{len(tables)} tables"
+        print(f"Wrote {self.rows_written} vectors to {target} in {elapsed_time:.2f} seconds "
+              f"({rate:.0f} rows/sec, batch size {self.batch_size}, {self.parallelism} connections)")
+        return self.rows_written
+
+    def write_nodes(self, nodes: Sequence[BaseNode]) -> int:
+        """Write nodes that already carry embeddings."""
+        rows = [node_to_row(node) for node in nodes]
+        return self.write_batches(rows[start:start + self.batch_size] for start in range(0, len(rows), self.batch_size))
+
+
+def embed_node_batches(nodes: Sequence[BaseNode], embed_model, embed_batch_size: int = 256):
+    """
+    Generator of row batches: embeds `embed_batch_size` nodes at a time (nodes with an embedding are kept).
+    Consumed by VectorBulkWriter.write_batches, so embedding overlaps with writing.
+    """
+    for start in range(0, len(nodes), embed_batch_size):
+        batch = nodes[start:start + embed_batch_size]
+        missing = [node for node in batch if node.embedding is None]
+        if missing:
+            embeddings = embed_model.get_text_embedding_batch(
+                [node.get_content(metadata_mode=MetadataMode.EMBED) for node in missing])
+            for node, embedding in zip(missing, embeddings):
+                node.embedding = embedding
+        yield [node_to_row(node) for node in batch]
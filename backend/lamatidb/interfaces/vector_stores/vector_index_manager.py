@@ -0,0 +1,257 @@
+## Lifecycle management of TiDB HNSW vector indexes on the TiDBVectorStore tables.
+## Creates the TiFlash replica and the cosine HNSW index, reports replica/index build progress,
+## rebuilds indexes, and checks with EXPLAIN that vector searches use the index instead of a full scan.
+## Also materialises filterable metadata keys as indexed generated columns for metadata-filtered searches.
+
+import os
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import URL, text
+
+from lamatidb.interfaces.database_interfaces.engine_registry import get_engine
+
+DEFAULT_INDEX_NAME = "idx_embedding_cosine"
+DISTANCE_FUNCTIONS = {"cosine": "VEC_COSINE_DISTANCE", "l2": "VEC_L2_DISTANCE"}
+
+# Metadata key -> (generated column, column type). Values are stored as unquoted text, so
+# years compare correctly as 4-digit strings.
+METADATA_COLUMNS = {
+    "source": ("meta_source", "VARCHAR(64)"),
+    "year": ("meta_year", "VARCHAR(16)"),
+    "PMCID": ("meta_PMCID", "VARCHAR(32)"),
+}
+
+
+class VectorIndexManager:
+    """
+    Vector index operations for the tables of one TiDB database.
+    """
+
+    def __init__(self, db_name: str, engine=None, vector_dimension: int = 768):
+        """
+        :param db_name: TiDB database holding the vector tables.
+        :param engine: SQLAlchemy engine (defaults to the shared engine for the TIDB_* environment).
+        :param vector_dimension: Dimension used for the EXPLAIN probe vector.
+        """
+        self.db_name = db_name
+        self.vector_dimension = vector_dimension
+        self.engine = engine or get_engine(URL(
+            "mysql+pymysql",
+            username=os.environ['TIDB_USERNAME'],
+            password=os.environ['TIDB_PASSWORD'],
+            host=os.environ['TIDB_HOST'],
+            port=4000,
+            database=db_name,
+            query={"ssl_verify_cert": True, "ssl_verify_identity": True},
+        ))
+
+    def _fetch(self, query: str, params: dict = None) -> List[dict]:
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(text(query), params or {})]
+
+    def _execute(self, query: str):
+        with self.engine.connect() as conn:
+            conn.execute(text(query))
+            conn.commit()
+
+    ## TiFlash replica (vector indexes are built and served by TiFlash)
+
+    def ensure_tiflash_replica(self, table_name: str, replicas: int = 1):
+        status = self.tiflash_replica_status(table_name)
+        if status and status["REPLICA_COUNT"] >= replicas:
+            return
+        self._execute(f"ALTER TABLE `{table_name}` SET TIFLASH REPLICA {replicas}")
+        print(f"TiFlash replica requested for {table_name} ({replicas} replica(s)).")
+
+    def tiflash_replica_status(self, table_name: str) -> Optional[dict]:
+        rows = self._fetch("""
+            SELECT REPLICA_COUNT, AVAILABLE, PROGRESS FROM information_schema.tiflash_replica
+            WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = :table_name
+        """, {"db_name": self.db_name, "table_name": table_name})
+        return rows[0] if rows else None
+
+    ## Vector index lifecycle
+
+    def get_comment_vector_index(self, table_name: str) -> Optional[dict]:
+        """
+        The vector index declared through the embedding column comment (e.g. COMMENT 'hnsw(distance=cosine)'),
+        the form tidb-vector 0.0.9 uses when it creates the table. SHOW INDEX does not list it.
+        """
+        rows = self._fetch("""
+            SELECT COLUMN_NAME, COLUMN_COMMENT FROM information_schema.columns
+            WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = :table_name AND COLUMN_NAME = 'embedding'
+        """, {"db_name": self.db_name, "table_name": table_name})
+        if not rows or "hnsw" not in str(rows[0]["COLUMN_COMMENT"] or "").lower():
+            return None
+        return {"Key_name": f"{rows[0]['COLUMN_NAME']} (column comment)", "Expression": rows[0]["COLUMN_COMMENT"],
+                "declared_by": "comment"}
+
+    def get_vector_indexes(self, table_name: str) -> List[dict]:
+        """Vector indexes defined on the table: from SHOW INDEX, plus a comment-declared index on `embedding`."""
+        rows = self._fetch(f"SHOW INDEX FROM `{table_name}`")
+        indexes = [dict(row, declared_by="index") for row in rows
+                   if str(row.get("Index_type", "")).upper() == "HNSW" or "VEC_" in str(row.get("Expression", "")).upper()]
+        comment_index = self.get_comment_vector_index(table_name)
+        if comment_index:
+            indexes.append(comment_index)
+        return indexes
+
+    def create_vector_index(self, table_name: str, distance: str = "cosine", index_name: str = DEFAULT_INDEX_NAME,
+                            replicas: int = 1):
+        """Create the HNSW index on `embedding` unless the table already has a vector index (of either form)."""
+        if self.get_vector_indexes(table_name):
+            print(f"Vector index already exists on {table_name}.")
+            return
+        self.ensure_tiflash_replica(table_name, replicas=replicas)
+        start_time = time.time()
+        self._execute(f"ALTER TABLE `{table_name}` ADD VECTOR INDEX `{index_name}` "
+                      f"(({DISTANCE_FUNCTIONS[distance]}(embedding))) USING HNSW")
+        print(f"Vector index {index_name} added to {table_name} in {time.time() - start_time:.2f} seconds "
+              f"(TiFlash builds it in the background).")
+
+    def drop_vector_indexes(self, table_name: str) -> bool:
+        """
+        Drop the vector indexes of the table.
+
+        :return: False if a comment-declared index remains: it is part of the column definition and
+            cannot be removed with DROP INDEX (the table has to be recreated).
+        """
+        indexes = self.get_vector_indexes(table_name)
+        for index_name in {row["Key_name"] for row in indexes if row["declared_by"] == "index"}:
+            self._execute(f"ALTER TABLE `{table_name}` DROP INDEX `{index_name}`")
+            print(f"Dropped vector index {index_name} on {table_name}.")
+        if any(row["declared_by"] == "comment" for row in indexes):
+            print(f"WARNING: {table_name} has a vector index declared in the embedding column comment; "
+                  f"it cannot be dropped without recreating the table.")
+            return False
+        return True
+
+    def rebuild_vector_index(self, table_name: str, distance: str = "cosine", index_name: str = DEFAULT_INDEX_NAME):
+        """Drop and recreate the vector index; tables with a comment-declared index are left unchanged."""
+        if self.drop_vector_indexes(table_name):
+            self.create_vector_index(table_name, distance=distance, index_name=index_name)
+
+    def build_progress(self, table_name: str) -> List[dict]:
+        """
+        Per-index build progress from information_schema.tiflash_indexes.
+        `progress` is the share of stable and delta rows already indexed.
+        """
+        rows = self._fetch("""
+            SELECT INDEX_NAME, INDEX_ID,
+                   SUM(ROWS_STABLE_INDEXED) AS stable_indexed, SUM(ROWS_STABLE_NOT_INDEXED) AS stable_not_indexed,
+                   SUM(ROWS_DELTA_INDEXED) AS delta_indexed, SUM(ROWS_DELTA_NOT_INDEXED) AS delta_not_indexed,
+                   MAX(ERROR_MESSAGE) AS error_message
+            FROM information_schema.tiflash_indexes
+            WHERE TIDB_DATABASE = :db_name AND TIDB_TABLE = :table_name
+            GROUP BY INDEX_NAME, INDEX_ID
+        """, {"db_name": self.db_name, "table_name": table_name})
+
+        for row in rows:
+            indexed = int(row["stable_indexed"] or 0) + int(row["delta_indexed"] or 0)
+            pending = int(row["stable_not_indexed"] or 0) + int(row["delta_not_indexed"] or 0)
+            row["progress"] = indexed / (indexed + pending) if indexed + pending else 1.0
+        return rows
+
+    def wait_until_built(self, table_name: str, poll_interval: float = 10.0, timeout: float = 3600.0) -> bool:
+        """Poll the build progress until every vector index of the table is fully built."""
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            progress = self.build_progress(table_name)
+            errors = [row["error_message"] for row in progress if row["error_message"]]
+            if errors:
+                raise RuntimeError(f"Vector index build failed on {table_name}: {errors[0]}")
+            if progress and all(row["progress"] >= 1.0 for row in progress):
+                return True
+            done = min((row["progress"] for row in progress), default=0.0)
+            print(f"Vector index build on {table_name}: {done:.1%}")
+            time.sleep(poll_interval)
+        return False
+
+    ## Indexed metadata columns
+
+    def get_metadata_columns(self, table_name: str) -> Dict[str, str]:
+        """Metadata key -> generated column for the METADATA_COLUMNS that exist and are indexed on the table."""
+        rows = self._fetch("""
+            SELECT DISTINCT COLUMN_NAME FROM information_schema.statistics
+            WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = :table_name
+        """, {"db_name": self.db_name, "table_name": table_name})
+        indexed = {row["COLUMN_NAME"].lower() for row in rows if row["COLUMN_NAME"]}
+        return {key: column for key, (column, _) in METADATA_COLUMNS.items() if column.lower() in indexed}
+
+    def ensure_metadata_columns(self, table_name: str, keys: List[str] = None) -> Dict[str, str]:
+        """
+        Add a virtual generated column over `meta` and a secondary index on it for each metadata key.
+        Adding the index backfills it for the existing rows; new rows are indexed on insert.
+
+        :param keys: Metadata keys to materialise (default: all METADATA_COLUMNS).
+        :return: Metadata key -> indexed column for the table.
+        """
+        columns = {row["COLUMN_NAME"].lower() for row in self._fetch("""
+            SELECT COLUMN_NAME FROM information_schema.columns
+            WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = :table_name
+        """, {"db_name": self.db_name, "table_name": table_name})}
+        indexed = self.get_metadata_columns(table_name)
+
+        for key in keys or METADATA_COLUMNS:
+            column, column_type = METADATA_COLUMNS[key]
+            if column.lower() not in columns:
+                self._execute(f"ALTER TABLE `{table_name}` ADD COLUMN `{column}` {column_type} "
+                              f"AS (JSON_UNQUOTE(JSON_EXTRACT(meta, '$.{key}'))) VIRTUAL")
+            if key not in indexed:
+                start_time = time.time()
+                self._execute(f"ALTER TABLE `{table_name}` ADD INDEX `idx_{column}` (`{column}`)")
+                print(f"Indexed metadata column {column} on {table_name} in {time.time() - start_time:.2f} seconds.")
+        return self.get_metadata_columns(table_name)
+
+    ## Query-plan verification
+
+    def explain_vector_search(self, table_name: str, distance: str = "cosine", k: int = 10,
+                              filter_sources: List[str] = None) -> Dict:
+        """
+        EXPLAIN a top-k search shaped like the TiDBVectorStore query and report whether it uses the
+        vector index. With `filter_sources`, the same search is filtered on metadata `source`.
+
+        :return: {"uses_vector_index": bool, "full_scan": bool, "plan": [rows]}
+        """
+        params = {"probe": "[" + ",".join(["0.1"] * self.vector_dimension) + "]"}
+        distance_expr = f"{DISTANCE_FUNCTIONS[distance]}(embedding, :probe)"
+        where = ""
+        if filter_sources:
+            names = [f"source_{i}" for i in range(len(filter_sources))]
+            params.update({name: str(x) for name, x in zip(names, filter_sources)})
+            source_column = self.get_metadata_columns(table_name).get("source")
+            source = f"`{source_column}`" if source_column else "JSON_UNQUOTE(JSON_EXTRACT(meta, '$.source'))"
+            where = f"WHERE {source} IN ({', '.join(':' + name for name in names)})"
+
+        plan = self._fetch(f"EXPLAIN SELECT id, document, meta, {distance_expr} AS distance "
+                           f"FROM `{table_name}` {where} ORDER BY {distance_expr} LIMIT {int(k)}", params)
+
+        def describe(row):
+            return " ".join(str(value) for value in row.values())
+
+        uses_vector_index = any("annIndex" in describe(row) or "vector_index" in describe(row).lower() for row in plan)
+        full_scan = any("TableFullScan" in str(row.get("id", "")) and "annIndex" not in describe(row) for row in plan)
+        return {"uses_vector_index": uses_vector_index, "full_scan": full_scan, "plan": plan}
+
+    def check_table(self, table_name: str, filter_sources: List[str] = None) -> Dict:
+        """Index presence, replica and build status, and EXPLAIN checks for one table."""
+        unfiltered = self.explain_vector_search(table_name)
+        report = {
+            "table": table_name,
+            "vector_indexes": [row["Key_name"] for row in self.get_vector_indexes(table_name)],
+            "metadata_columns": self.get_metadata_columns(table_name),
+            "tiflash_replica": self.tiflash_replica_status(table_name),
+            "build_progress": self.build_progress(table_name),
+            "unfiltered_uses_index": unfiltered["uses_vector_index"],
+            "unfiltered_full_scan": unfiltered["full_scan"],
+        }
+        if filter_sources:
+            filtered = self.explain_vector_search(table_name, filter_sources=filter_sources)
+            report["filtered_uses_index"] = filtered["uses_vector_index"]
+            report["filtered_full_scan"] = filtered["full_scan"]
+
+        for path in ("unfiltered", "filtered"):
+            if report.get(f"{path}_full_scan"):
+                print(f"WARNING: {path} vector search on {table_name} falls back to a full scan.")
+        return report
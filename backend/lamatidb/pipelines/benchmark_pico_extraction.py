@@ -0,0 +1,81 @@
+# Micro-benchmark for PICO token thresholding and span extraction (post-processing only).
+# Compares the previous per-token Python loops against the vectorised implementation
+# in metadata_interface, using synthetic model outputs so the adapter model is not needed.
+# Usage: python -m lamatidb.pipelines.benchmark_pico_extraction [--batch-size 32] [--repeats 3]
+
+import argparse
+import time
+
+import torch
+from transformers import AutoTokenizer
+
+from lamatidb.interfaces.metadata_interface import label2id, threshold_predictions, extract_spans
+
+SAMPLE_TEXT = ("The participants are 22 years old and suffer from type 2 diabetes mellitus. "
+               "Patients were randomised to metformin or placebo and the intervention improved glycaemic control. ")
+
+def legacy_threshold(probabilities, threshold=0.7):
+    predictions = []
+    for sequence_probs in probabilities:
+        sequence_predictions = []
+        for token_probs in sequence_probs:
+            max_prob, predicted_label = torch.max(token_probs, dim=-1)
+            if max_prob >= threshold:
+                sequence_predictions.append(predicted_label.item())
+            else:
+                sequence_predictions.append(0)
+        predictions.append(sequence_predictions)
+    return predictions
+
+def legacy_extract(tokenizer, predictions, input_ids, offset_mapping):
+    all_extracted_terms = []
+    for i, sequence in enumerate(predictions):
+        extracted_terms = {label: [] for label in label2id.values()}
+        tokens = tokenizer.convert_ids_to_tokens(input_ids[i])
+
+        for token, prediction, offset in zip(tokens, sequence, offset_mapping[i]):
+            if token.startswith("##"):
+                if extracted_terms[label2id[prediction]]:
+                    extracted_terms[label2id[prediction]][-1] += token[2:]
+            else:
+                if label2id[prediction] != "O":
+                    start, end = offset
+                    term = tokenizer.decode(input_ids[i][start:end]).strip()
+                    extracted_terms[label2id[prediction]].append(term)
+
+        all_extracted_terms.append(extracted_terms)
+    return all_extracted_terms
+
+def time_it(func, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PICO post-processing throughput.")
+    parser.add_argument("--model-name", default="allenai/scibert_scivocab_uncased")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model_name)
+    texts = [SAMPLE_TEXT * 20 for _ in range(args.batch_size)]  # ~512 tokens each after truncation
+    encoded_inputs = tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="pt", return_offsets_mapping=True)
+    input_ids = encoded_inputs['input_ids'].numpy()
+    offset_mapping = encoded_inputs['offset_mapping'].numpy()
+
+    torch.manual_seed(0)
+    logits = torch.randn(input_ids.shape[0], input_ids.shape[1], len(label2id)) * 3
+    probabilities = torch.nn.functional.softmax(logits, dim=-1)
+    num_tokens = int(encoded_inputs['attention_mask'].sum())
+
+    legacy_time = time_it(lambda: legacy_extract(tokenizer, legacy_threshold(probabilities), input_ids, offset_mapping), args.repeats)
+    vectorised_time = time_it(lambda: extract_spans(texts, threshold_predictions(probabilities), offset_mapping), args.repeats)
+
+    print(f"Batch of {args.batch_size} x {input_ids.shape[1]} tokens ({num_tokens} non-padding tokens)")
+    print(f"Legacy per-token loops: {num_tokens / legacy_time:,.0f} tokens/sec ({legacy_time * 1000:.1f} ms)")
+    print(f"Vectorised:             {num_tokens / vectorised_time:,.0f} tokens/sec ({vectorised_time * 1000:.1f} ms)")
+    print(f"Speed-up: {legacy_time / vectorised_time:.1f}x")
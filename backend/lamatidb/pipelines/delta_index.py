@@ -0,0 +1,73 @@
+# Delta indexing of the main, fulltext and 15 PICO vector tables from the datastore.
+# Only new or changed documents are embedded; documents removed upstream are deleted from the vector tables.
+# Usage: python -m lamatidb.pipelines.delta_index [--tables scibert_alldata scibert_alldata_pio ...] [--batch-size 1000]
+
+import argparse
+import os
+from dotenv import load_dotenv
+load_dotenv()  # This will load the variables from the .env file
+
+from lamatidb.interfaces.index_interface import IndexInterface
+from lamatidb.interfaces.settings_manager import SettingsManager
+from lamatidb.interfaces.database_interfaces.database_interface import DatabaseInterface
+from lamatidb.interfaces.mysql_ingestors.ingestion_manifest import IngestionManifest
+from lamatidb.interfaces.tidb_loaders.vector_loader_interface import LoaderPubMedAbstracts, LoaderPubMedPICO, LoaderPubMedFullText
+from lamatidb.pipelines.refresh_vector_snapshots import DB_NAME, VECTOR_TABLE_NAME, default_tables
+
+def sync_pico_tables(loader, manifest, db_name, table_names, batch_size, delete_removed):
+    """Stream the PICO documents once and sync every requested combination table batch by batch."""
+    pico_tables = {table_name.rsplit("_", 1)[-1]: IndexInterface(db_name, table_name) for table_name in table_names}
+    seen_source_ids = {key: set() for key in pico_tables}
+    written = {key: 0 for key in pico_tables}
+
+    for documents_dict in loader.iter_documents_dict(batch_size=batch_size):
+        for key, index_interface in pico_tables.items():
+            seen_source_ids[key].update(str(doc.metadata["source"]) for doc in documents_dict[key])
+            written[key] += index_interface.index_batch(documents_dict[key], manifest)
+
+    # Never delete on the strength of a stream that ended early
+    if delete_removed and not loader.scan_was_complete():
+        print("Skipping deletes on the PICO tables: the document stream was incomplete.")
+        delete_removed = False
+
+    for key, index_interface in pico_tables.items():
+        if delete_removed:
+            index_interface.remove_missing_documents(manifest, seen_source_ids[key])
+        print(f"Synced {index_interface.vector_table_name}: {written[key]} documents written")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally sync the vector tables with the datastore.")
+    parser.add_argument("--db-name", default=DB_NAME)
+    parser.add_argument("--tables", nargs="*", default=None, help="Vector tables to sync (default: all 17).")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--keep-removed", action="store_true", help="Do not delete documents removed upstream.")
+    args = parser.parse_args()
+
+    SettingsManager.set_global_settings(set_local=False)
+
+    datastore_db = os.environ['DATASTORE_HOST']
+    datastore_db_name = os.environ['MYSQL_DB_NAME']
+    # The manifest queries unqualified table names, so bind the interface to the datastore database
+    manifest_db = DatabaseInterface(db_type=datastore_db, db_name=datastore_db_name)
+    manifest_db.setup_database()
+    manifest = IngestionManifest(manifest_db)
+    delete_removed = not args.keep_removed
+
+    tables = args.tables or default_tables()
+    pico_tables = [x for x in tables if x not in (VECTOR_TABLE_NAME, f"{VECTOR_TABLE_NAME}_fulltext")]
+
+    if VECTOR_TABLE_NAME in tables:
+        loader = LoaderPubMedAbstracts(db_type=datastore_db, db_name=datastore_db_name)
+        IndexInterface(args.db_name, VECTOR_TABLE_NAME).sync_index(
+            loader.iter_documents(batch_size=args.batch_size), manifest, delete_removed=delete_removed,
+            is_complete=loader.scan_was_complete)
+
+    if f"{VECTOR_TABLE_NAME}_fulltext" in tables:
+        loader = LoaderPubMedFullText(db_type=datastore_db, db_name=datastore_db_name)
+        IndexInterface(args.db_name, f"{VECTOR_TABLE_NAME}_fulltext").sync_index(
+            loader.iter_documents(batch_size=args.batch_size), manifest, delete_removed=delete_removed,
+            is_complete=loader.scan_was_complete)
+
+    if pico_tables:
+        loader = LoaderPubMedPICO(db_type=datastore_db, db_name=datastore_db_name)
+        sync_pico_tables(loader, manifest, args.db_name, pico_tables, args.batch_size, delete_removed)
@@ -0,0 +1,43 @@
+# Create, inspect and rebuild the TiDB HNSW vector indexes of the vector tables, and verify query plans.
+# `create` also adds the indexed metadata columns (source, year, PMCID) used by metadata-filtered searches.
+# Usage: python -m lamatidb.pipelines.manage_vector_indexes {create,status,rebuild,explain} [--tables ...] [--wait]
+
+import argparse
+import json
+from dotenv import load_dotenv
+load_dotenv()  # This will load the variables from the .env file
+
+from lamatidb.interfaces.vector_stores.vector_index_manager import VectorIndexManager
+from lamatidb.pipelines.refresh_vector_snapshots import DB_NAME, default_tables
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage TiDB vector indexes.")
+    parser.add_argument("action", choices=["create", "status", "rebuild", "explain"])
+    parser.add_argument("--db-name", default=DB_NAME)
+    parser.add_argument("--tables", nargs="*", default=None, help="Vector tables (default: all 17).")
+    parser.add_argument("--wait", action="store_true", help="Wait for index builds to finish after create/rebuild.")
+    parser.add_argument("--filter-sources", nargs="*", default=None,
+                        help="Source ids for a metadata-filtered EXPLAIN check.")
+    args = parser.parse_args()
+
+    manager = VectorIndexManager(args.db_name)
+    for table_name in args.tables or default_tables():
+        if args.action == "create":
+            manager.create_vector_index(table_name)
+            manager.ensure_metadata_columns(table_name)
+        elif args.action == "rebuild":
+            manager.rebuild_vector_index(table_name)
+
+        if args.action in ("create", "rebuild") and args.wait:
+            manager.wait_until_built(table_name)
+
+        if args.action == "status":
+            print(json.dumps({
+                "table": table_name,
+                "vector_indexes": [row["Key_name"] for row in manager.get_vector_indexes(table_name)],
+                "metadata_columns": manager.get_metadata_columns(table_name),
+                "tiflash_replica": manager.tiflash_replica_status(table_name),
+                "build_progress": manager.build_progress(table_name),
+            }, indent=2, default=str))
+        elif args.action == "explain":
+            print(json.dumps(manager.check_table(table_name, filter_sources=args.filter_sources), indent=2, default=str))
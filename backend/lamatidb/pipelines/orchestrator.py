@@ -46,6 +46,18 @@ datastore_db_name = os.environ['MYSQL_DB_NAME']
 abstract_csv_file = 'datalake/pubmed/pubmed24n0541.csv'
 # abstract_ingestor = AbstractIngestor(db_type=datastore_db, db_name=datastore_db_name)
 # abstract_ingestor.process_csv(abstract_csv_file, enhanced_pico=False, database_description="Sampled PubMed datasets for abstracts and fulltext")
+# # Or stream large PubMed baseline files chunk by chunk with bounded memory
+# abstract_ingestor.process_csv_chunked(abstract_csv_file, chunksize=5000, database_description="Sampled PubMed datasets for abstracts and fulltext")
+# # Incremental re-runs (e.g. monthly update files): unchanged documents are skipped at every stage
+# abstract_ingestor.process_csv(abstract_csv_file, incremental=True, pico_batch_size=32)
+# # Bulk writes: 'multirow', 'load_data' (LOAD DATA LOCAL INFILE) or 'executemany' instead of pandas to_sql
+# abstract_ingestor = AbstractIngestor(db_type=datastore_db, db_name=datastore_db_name, write_method='multirow', chunk_size=2000)
+
+# # Enhanced PICO with concurrent, rate-limited and cached LLM requests
+# from lamatidb.interfaces.llm_enhancer import AsyncPICOEnhancer
+# pico_enhancer = AsyncPICOEnhancer(max_concurrency=8, requests_per_second=5, cache_dir='datalake/llm_cache')
+# abstract_ingestor = AbstractIngestor(db_type=datastore_db, db_name=datastore_db_name, pico_enhancer=pico_enhancer)
+# abstract_ingestor.process_csv(abstract_csv_file, enhanced_pico=True, pico_batch_size=32)
 
 # # Recovery of PICO Data into the database
 # abstract_ingestor = AbstractIngestor(db_type=datastore_db, db_name=datastore_db_name)
@@ -60,6 +72,14 @@ abstract_csv_file = 'datalake/pubmed/pubmed24n0541.csv'
 # documents = loader.get_documents()
 # index_interface = IndexInterface(DB_NAME, VECTOR_TABLE_NAME)
 # index_interface.create_index(documents=documents) # Uncomment only if need to create / append to index
+# # Or embed and write with concurrent multi-row inserts (embedding overlaps with writing)
+# index_interface.bulk_create_index(documents=documents, batch_size=500, parallelism=4)
+# # Or stream the documents in batches with keyset pagination (flat memory)
+# index_interface.create_index_from_batches(loader.iter_documents(batch_size=1000))
+# # Delta indexing for all 17 tables (new/changed embedded, removed deleted): python -m lamatidb.pipelines.delta_index
+# # Or only (re-)index new/changed documents
+# from lamatidb.interfaces.mysql_ingestors.ingestion_manifest import IngestionManifest
+# index_interface.create_index(documents=documents, manifest=IngestionManifest(DatabaseInterface(db_type=datastore_db, db_name=datastore_db_name)))
 # ==============================================================================================
 # ==============================================================================================
 #                   Optional - Ingest your Full Document data 
@@ -70,6 +90,8 @@ abstract_csv_file = 'datalake/pubmed/pubmed24n0541.csv'
 # mapping_id_file = 'datalake/pubmed/PMC-ids-small.csv'
 # fulltext_ingestor = FullDocumentIngestor(mapping_file=mapping_id_file, db_type=datastore_db, db_name=datastore_db_name)
 # fulltext_ingestor.process_csv(abstract_csv_file, limitIDs=True, database_description="Mock Abstracts Database")
+# # Store PDFs deduplicated and chunked (served with HTTP Range by GET /documents/{id}/pdf)
+# fulltext_ingestor = FullDocumentIngestor(mapping_file=mapping_id_file, db_type=datastore_db, db_name=datastore_db_name, pdf_store_backend='table')
 
 # # # Load data from MySQL and process it into LlamaIndex documents
 # loader = LoaderPubMedFullText(db_type=datastore_db, db_name=datastore_db_name)
@@ -87,6 +109,8 @@ abstract_csv_file = 'datalake/pubmed/pubmed24n0541.csv'
 abstract_ingestor = AbstractIngestor(db_type=datastore_db, db_name=datastore_db_name)
 # unprocessed_data = abstract_ingestor.fetch_unprocessed_pico_data()
 # abstract_ingestor.process_pico_metadata(abstract_csv_file, local_llm=False)
+# # Or use all cores, checkpointing every shard so the run can be resumed
+# abstract_ingestor.process_pico_metadata_sharded('datalake/pubmed/pico_checkpoints', torch_threads=2)
 
 # loader = LoaderPubMedAbstracts(db_type=datastore_db, db_name=datastore_db_name)
 # loader.load_data()
@@ -106,6 +130,9 @@ abstract_ingestor = AbstractIngestor(db_type=datastore_db, db_name=datastore_db_
 #     index_interface = IndexInterface(DB_NAME, VECTOR_TABLE_NAME+"_"+key)
 #     index_interface.create_index(documents=documents) # Uncomment only if need to create / append to index
 
+# # Alternative: embed each PICO field once, pool the field vectors into the 15 combinations and bulk write all tables
+# # python -m lamatidb.pipelines.pooled_pico_index
+
 
 # # Test Load a PICO Index
 # index_interface = IndexInterface(DB_NAME, VECTOR_TABLE_NAME+"_p")
@@ -154,6 +181,8 @@ query_interface.inspect_similarity_scores(source_nodes)
 # query_interface.inspect_similarity_scores(response.source_nodes)
 
 # Example 3: Metadata Filtered Query
+# Filters on source/year/PMCID use indexed columns once they exist (one-off per table, backfills the index):
+# index_interface.ensure_metadata_columns()
 filters = [
     {"key": "source", "value": "16625676", "operator": "=="},
     # Add more filters as needed
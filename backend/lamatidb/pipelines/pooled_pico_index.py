@@ -0,0 +1,54 @@
+# Bulk build of the 15 PICO combination vector tables from pooled per-field embeddings.
+# Each PICO field is embedded once per document; the combination vectors are pooled from the field vectors
+# and one pool of writer connections fills all 15 tables while the next page of documents is embedded.
+# Usage: python -m lamatidb.pipelines.pooled_pico_index [--batch-size 1000] [--parallelism 4]
+
+import argparse
+import os
+from dotenv import load_dotenv
+load_dotenv()  # This will load the variables from the .env file
+
+from llama_index.core import Settings
+from lamatidb.interfaces.index_interface import IndexInterface
+from lamatidb.interfaces.settings_manager import SettingsManager
+from lamatidb.interfaces.tidb_loaders.vector_loader_interface import LoaderPubMedPICO, get_pico_combinations
+from lamatidb.interfaces.vector_stores.vector_bulk_writer import VectorBulkWriter
+from lamatidb.pipelines.refresh_vector_snapshots import DB_NAME, VECTOR_TABLE_NAME
+
+def bulk_index_pooled_pico(loader, db_name, embed_model, weights=None, batch_size=1000, embed_batch_size=256,
+                           write_batch_size=500, parallelism=4):
+    """
+    Stream the pooled PICO rows of `loader` into the 15 combination tables.
+
+    :return: Dict of vector table name -> rows written.
+    """
+    # IndexInterface creates missing tables; all of them share the engine of the vector database
+    index_interfaces = {key: IndexInterface(db_name, f"{VECTOR_TABLE_NAME}_{key}") for key in get_pico_combinations()}
+    engine = next(iter(index_interfaces.values())).engine
+    writer = VectorBulkWriter(engine, batch_size=write_batch_size, parallelism=parallelism)
+
+    pooled_rows = loader.iter_pooled_rows(embed_model, weights=weights, batch_size=batch_size,
+                                          embed_batch_size=embed_batch_size)
+    writer.write_table_batches((index_interfaces[key].vector_table_name, rows) for key, rows in pooled_rows)
+    return writer.rows_written_by_table
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the PICO combination tables from pooled field embeddings.")
+    parser.add_argument("--db-name", default=DB_NAME)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per page of the loader query.")
+    parser.add_argument("--embed-batch-size", type=int, default=256)
+    parser.add_argument("--write-batch-size", type=int, default=500, help="Rows per INSERT.")
+    parser.add_argument("--parallelism", type=int, default=4, help="Concurrent writer connections.")
+    args = parser.parse_args()
+
+    SettingsManager.set_global_settings(set_local=False)
+
+    datastore_db = os.environ['DATASTORE_HOST']
+    datastore_db_name = os.environ['MYSQL_DB_NAME']
+    loader = LoaderPubMedPICO(db_type=datastore_db, db_name=datastore_db_name)
+
+    rows_written = bulk_index_pooled_pico(loader, args.db_name, Settings.embed_model, batch_size=args.batch_size,
+                                          embed_batch_size=args.embed_batch_size,
+                                          write_batch_size=args.write_batch_size, parallelism=args.parallelism)
+    for table_name, rows in rows_written.items():
+        print(f"{table_name}: {rows} rows written")
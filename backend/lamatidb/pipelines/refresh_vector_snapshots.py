@@ -0,0 +1,30 @@
+# Rebuilds the local (memory-mapped) snapshots used by the 'local' vector backend
+# Usage: python -m lamatidb.pipelines.refresh_vector_snapshots [--tables scibert_alldata_p ...] [--dtype float16]
+
+import argparse
+import itertools
+from dotenv import load_dotenv
+load_dotenv()  # This will load the variables from the .env file
+
+from lamatidb.interfaces.index_interface import IndexInterface
+
+DB_NAME = "scibert_alldata_pico"
+VECTOR_TABLE_NAME = "scibert_alldata"
+
+def default_tables():
+    """Main, fulltext and the 15 PICO combination tables."""
+    elements = ['p', 'i', 'c', 'o']
+    combinations = [''.join(comb) for r in range(1, len(elements) + 1)
+                    for comb in itertools.combinations(elements, r)]
+    return [VECTOR_TABLE_NAME, f"{VECTOR_TABLE_NAME}_fulltext"] + [f"{VECTOR_TABLE_NAME}_{key}" for key in combinations]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh local vector snapshots from TiDB.")
+    parser.add_argument("--db-name", default=DB_NAME)
+    parser.add_argument("--tables", nargs="*", default=None, help="Vector tables to snapshot (default: all 17).")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    args = parser.parse_args()
+
+    for table_name in args.tables or default_tables():
+        index_interface = IndexInterface(args.db_name, table_name, snapshot_dtype=args.dtype)
+        index_interface.refresh_local_snapshot()
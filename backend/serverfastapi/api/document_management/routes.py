@@ -0,0 +1,45 @@
+# Contains the FastAPI route to handle the HTTP request and invoke the service logic.
+import logging
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from serverfastapi.api.document_management.services import (
+    get_document_pdf,
+    parse_range_header,
+    RangeNotSatisfiable
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/{document_id}/pdf")
+def get_pdf(document_id: str, request: Request):
+    """
+    Stream a document's PDF. Supports single byte-range requests (HTTP Range -> 206 Partial Content)
+    so viewers can fetch pages incrementally.
+    """
+    services = request.app.state.services
+    pdf = get_document_pdf(document_id, services["pdf_store"], services["datastore_db"])
+    if pdf is None:
+        raise HTTPException(status_code=404, detail="PDF not found for this document.")
+
+    etag, size, reader = pdf
+    headers = {"Accept-Ranges": "bytes", "Content-Disposition": f'inline; filename="{document_id}.pdf"'}
+    if etag:
+        headers["ETag"] = f'"{etag}"'
+
+    try:
+        byte_range = parse_range_header(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        logger.info(f"Unsatisfiable range for document {document_id}: {request.headers.get('range')}")
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable.",
+                            headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(reader(0, size - 1), media_type="application/pdf", headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(reader(start, end), status_code=206, media_type="application/pdf", headers=headers)
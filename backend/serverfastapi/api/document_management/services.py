@@ -0,0 +1,68 @@
+import re
+from typing import Iterator, Optional, Tuple
+from sqlalchemy import text
+
+from lamatidb.interfaces.blob_stores.pdf_blob_store import PDFBlobStore
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header into an inclusive (start, end) byte range.
+    Returns None when no (or an unsupported multi-range) header is given, i.e. serve the whole file.
+    """
+    if not range_header:
+        return None
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if start == "" and end == "":
+        raise RangeNotSatisfiable(range_header)
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(range_header)
+    return start, end
+
+
+def _iter_bytes(data: bytes, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+    for offset in range(start, end + 1, chunk_size):
+        yield data[offset:min(offset + chunk_size, end + 1)]
+
+
+def get_document_pdf(document_id: str, pdf_store: PDFBlobStore, datastore_db):
+    """
+    Locate a document's PDF.
+
+    :return: (etag, size, reader) where reader(start, end) yields the bytes of an inclusive range,
+             or None if the document has no PDF. Documents ingested before the blob store existed
+             are served from DocumentFull.pdfBlob.
+    """
+    blob = pdf_store.get_document_blob(document_id)
+    if blob is not None:
+        # Read from the backend the ingestor wrote to, whatever this server is configured with
+        sha256, size, blob_store = blob
+        return sha256, size, lambda start, end: blob_store.iter_range(sha256, start, end)
+
+    query = text(f"SELECT pdfBlob FROM `{pdf_store.schema}`.`DocumentFull` WHERE documentId = :document_id AND pdfBlob IS NOT NULL")
+    with datastore_db.get_session() as session:
+        row = session.execute(query, {"document_id": str(document_id)}).fetchone()
+    if row is None:
+        return None
+
+    data = bytes(row[0])
+    return None, len(data), lambda start, end: _iter_bytes(data, start, end, pdf_store.chunk_size)
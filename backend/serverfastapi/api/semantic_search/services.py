@@ -6,6 +6,7 @@ from serverfastapi.api.semantic_search.models import Query, Result, SemanticQuer
 from serverfastapi.api.semantic_search.schemas import QueryCreate, SemanticQueryCreate, FunnelEnum
 from lamatidb.interfaces.query_interface import QueryInterface
 from lamatidb.interfaces.database_interfaces.database_interface import DatabaseInterface
+from lamatidb.interfaces.cache_interfaces.pdf_availability_cache import get_pdf_availability_cache
 from serverfastapi.core.logger import logger
 from sqlalchemy import func
 
@@ -28,14 +29,9 @@ def execute_simple_search(
     logger.info("Executing search.")
     source_nodes = query_interface.retriever.retrieve(query.query_text)
 
-    # Check if documents have a PDF available by querying the datastore
+    # Check if documents have a PDF available using the shared datastore cache
     logger.info("Checking for PDF availability in datastore.")
-    pdf_check_query = "SELECT documentId FROM datastore.DocumentFull"
-    fulldoc_result = datastore_db.fetch_data_from_db(pdf_check_query)
-    doc_ids_with_pdf = {x[0] for x in fulldoc_result}
-
-    for source_node in source_nodes:
-        source_node.metadata['has_pdf'] = source_node.metadata['source'] in doc_ids_with_pdf
+    mark_pdf_availability(source_nodes, datastore_db)
 
     # Store the search results in the database
     orm_results = create_results(db, source_nodes, db_query)
@@ -67,14 +63,9 @@ def execute_advanced_search(
     logger.info("Executing search with advanced retriever.")
     source_nodes = query_interface.retriever.retrieve(query.query_text)
 
-    # Check if documents have a PDF available in the datastore
+    # Check if documents have a PDF available using the shared datastore cache
     logger.info("Checking for PDF availability in datastore.")
-    pdf_check_query = "SELECT documentId FROM datastore.DocumentFull"
-    fulldoc_result = datastore_db.fetch_data_from_db(pdf_check_query)
-    doc_ids_with_pdf = {x[0] for x in fulldoc_result}
-
-    for source_node in source_nodes:
-        source_node.metadata['has_pdf'] = source_node.metadata['source'] in doc_ids_with_pdf
+    mark_pdf_availability(source_nodes, datastore_db)
 
     # Store the search results in the database
     orm_results = create_results(db, source_nodes, db_query)
@@ -94,17 +85,36 @@ def perform_semantic_search(
     """
     Perform a semantic search and return document source IDs.
     """
-    semantic_index = get_index_for_field(fields, services)
+    semantic_indexes = get_indexes_for_fields(fields, services)
     filters = [{"key": "source", "value": source_ids, "operator": "in"}] if source_ids else []
-    query_interface = QueryInterface(semantic_index)
-    query_interface.configure_retriever(metadata_filters=filters)
-    retrieved_nodes = query_interface.retriever.retrieve(query_text)
-    filtered_nodes = query_interface.filter_by_similarity_score(retrieved_nodes, 0.5)
+
+    if len(semantic_indexes) == 1:
+        query_interface = QueryInterface(next(iter(semantic_indexes.values())))
+        query_interface.configure_retriever(metadata_filters=filters)
+        retrieved_nodes = query_interface.retriever.retrieve(query_text)
+        filtered_nodes = query_interface.filter_by_similarity_score(retrieved_nodes, 0.5)
+    else:
+        # Embed once and search every requested field, applying the similarity cutoff per field before fusion
+        query_interface = QueryInterface(services["index"])
+        query_interface.configure_multi_index_retriever(
+            semantic_indexes, metadata_filters=filters, fusion_mode="reciprocal_rank", similarity_cutoff=0.5
+        )
+        filtered_nodes = query_interface.retriever.retrieve(query_text)
 
     return [
         int(node.metadata["source"]) for node in filtered_nodes if "source" in node.metadata
     ]
 
+def mark_pdf_availability(source_nodes: list, datastore_db: DatabaseInterface) -> None:
+    """
+    Set the `has_pdf` metadata flag on retrieved nodes from the PDF availability cache.
+    """
+    pdf_cache = get_pdf_availability_cache(datastore_db)
+    availability = pdf_cache.has_pdf(node.metadata['source'] for node in source_nodes)
+
+    for source_node in source_nodes:
+        source_node.metadata['has_pdf'] = availability[str(source_node.metadata['source'])]
+
 def create_query(db: Session, project_id: int, query: QueryCreate) -> Query:
     """
     Create a standard query record in the database.
@@ -176,6 +186,24 @@ def get_index_for_field(fields: List[str], services: Dict) -> QueryInterface:
     Returns:
         QueryInterface: The appropriate query interface for the given field.
     """
+    field = fields[0]
+    return _get_index_and_name_for_field(field, services)[1]
+
+def get_indexes_for_fields(fields: List[str], services: Dict) -> Dict[str, QueryInterface]:
+    """
+    Determine the indexes to search for all requested fields.
+
+    Args:
+        fields (List[str]): List of search fields.
+        services (Dict): Dictionary of initialized services and indexes.
+
+    Returns:
+        Dict[str, QueryInterface]: Index name -> index, one entry per distinct index.
+    """
+    fields = fields or ["All Fields"]
+    return dict(_get_index_and_name_for_field(field, services) for field in fields)
+
+def _get_index_and_name_for_field(field: str, services: Dict):
     metadata_mapper = {
         'Patient': 'p',
         'Intervention': 'i',
@@ -183,14 +211,13 @@ def get_index_for_field(fields: List[str], services: Dict) -> QueryInterface:
         'Outcome': 'o'
     }
 
-    field = fields[0]
     if field == "Full Document":
-        return services["index_fulltext"]
+        return "fulltext", services["index_fulltext"]
     elif field != "All Fields":
         index_name = metadata_mapper.get(field)
-        return services["metadata_indexes"].get(index_name, services["index"])
-    else:
-        return services["index"]
+        if index_name in services["metadata_indexes"]:
+            return index_name, services["metadata_indexes"][index_name]
+    return "all", services["index"]
 
 
 def get_status(
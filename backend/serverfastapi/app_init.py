@@ -1,9 +1,13 @@
+import os
 import itertools
 import concurrent.futures
 from sqlalchemy.orm import sessionmaker
 from lamatidb.interfaces.database_interfaces.database_interface import DatabaseInterface
 from lamatidb.interfaces.index_interface import IndexInterface
 from lamatidb.interfaces.settings_manager import SettingsManager
+from lamatidb.interfaces.cache_interfaces.pdf_availability_cache import get_pdf_availability_cache
+from lamatidb.interfaces.blob_stores.pdf_blob_store import get_pdf_blob_store
+from lamatidb.interfaces.database_interfaces import engine_registry
 
 def initialize_services():
     """Initialize all services and resources."""
@@ -14,6 +18,15 @@ def initialize_services():
     operations_db = DatabaseInterface(db_type='tidb', db_name='operations', force_recreate_db=True)
     operations_db.setup_database()
     datastore_db = DatabaseInterface(db_type='tidb', db_name='datastore')
+    datastore_db.setup_database()
+
+    # Load the PDF availability cache once and keep it fresh in the background
+    pdf_cache = get_pdf_availability_cache(datastore_db)
+    pdf_cache.refresh()
+    pdf_cache.start_scheduled_refresh()
+
+    # Chunked, content-addressed PDF storage served by the document endpoints
+    pdf_store = get_pdf_blob_store(datastore_db)
 
     # Create engine and session maker
     engine = operations_db.engine
@@ -32,6 +45,9 @@ def initialize_services():
     # Load PICO indexes in parallel
     metadata_indexes, index_metadata_keys = _load_pico_indexes(VECTOR_TABLE_NAME, DB_NAME)
 
+    # All indexes share one engine per database; open connections before the first requests arrive
+    engine_registry.warm_up(min_connections=int(os.environ.get("DB_WARM_CONNECTIONS", 2)))
+
     return {
         "engine": engine,
         "SessionLocal": SessionLocal,
@@ -39,12 +55,22 @@ def initialize_services():
         "index_fulltext": index_fulltext,
         "metadata_indexes": metadata_indexes,
         "index_metadata_keys": index_metadata_keys,
-        "datastore_db": datastore_db
+        "datastore_db": datastore_db,
+        "pdf_cache": pdf_cache,
+        "pdf_store": pdf_store
     }
 
+def _get_vector_backend(table_name):
+    """
+    Retrieval backend for a vector table: VECTOR_BACKEND_<TABLE> overrides VECTOR_BACKEND (default 'tidb').
+    Supported backends are 'tidb', 'local' (exact) and 'ivf' (approximate, tuned with IVF_NPROBE).
+    """
+    return os.environ.get(f"VECTOR_BACKEND_{table_name.upper()}", os.environ.get("VECTOR_BACKEND", "tidb"))
+
 def _load_index(table_name, db_name):
     """Helper function to load a single index."""
-    idx_interface = IndexInterface(db_name, table_name)
+    idx_interface = IndexInterface(db_name, table_name, backend=_get_vector_backend(table_name),
+                                   ivf_nprobe=int(os.environ.get("IVF_NPROBE", 8)))
     idx_interface.load_index_from_vector_store()
     return idx_interface.get_index()
 
@@ -12,7 +12,7 @@ from contextlib import asynccontextmanager
 # Set up paths and imports
 from serverfastapi.core.config import settings
 # from serverfastapi.api.project_management.routes import router as project_router
-# from serverfastapi.api.document_management.routes import router as document_router
+from serverfastapi.api.document_management.routes import router as document_router
 from serverfastapi.api.semantic_search.routes import router as search_router
 # from serverfastapi.api.translation.routes import router as translation_router
 from serverfastapi.api.rag_system.routes import router as rag_router
@@ -55,7 +55,7 @@ app.add_middleware(
 
 # Register all routers
 # app.include_router(project_router, prefix="/projects", tags=["Projects"])
-# app.include_router(document_router, prefix="/documents", tags=["Documents"])
+app.include_router(document_router, prefix="/documents", tags=["Documents"])
 app.include_router(search_router, prefix="/search", tags=["Search"])
 # app.include_router(translation_router, prefix="/translate", tags=["Translation"])
 app.include_router(rag_router, prefix="/rag", tags=["RAG"])
@@ -74,6 +74,17 @@ async def shutdown_event():
 def health_check():
     return {"status": "Healthy"}
 
+# Database connectivity and connection pool utilisation across the shared engines
+@app.get("/health/db")
+def database_health_check():
+    from lamatidb.interfaces.database_interfaces import engine_registry
+    checks = engine_registry.health_check()
+    return {
+        "status": "Healthy" if all(x["healthy"] for x in checks) else "Degraded",
+        "checks": checks,
+        "pools": engine_registry.pool_status(),
+    }
+
 # Main entry point for running the server
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,77 @@
+## Local HTTP stand-in for the external services used by the ingestion pipelines (OpenAI-compatible
+## chat completions, PMC OA downloads). Each request is answered by the next scripted response.
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInServer:
+    """
+    Serves scripted responses on 127.0.0.1. A response is a (status, headers, body) tuple or a callable
+    taking the request handler and returning one; the last response is repeated once the script runs out.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with server._lock:
+                    server.requests.append({"method": self.command, "path": self.path,
+                                            "headers": dict(self.headers), "body": body})
+                    index = min(len(server.requests), len(server.responses)) - 1
+                    response = server.responses[index]
+                if callable(response):
+                    response = response(self)
+                status, headers, payload = response
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **headers}
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+
+def chat_completion(content: str) -> dict:
+    """Minimal OpenAI chat completion payload."""
+    return {
+        "id": "chatcmpl-stand-in",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stand-in",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
@@ -0,0 +1,106 @@
+import contextlib
+import os
+import unittest
+from unittest import mock
+
+try:
+    import pymysql
+    import llama_index.core
+    from serverfastapi import app_init
+except ImportError:
+    app_init = None
+
+TIDB_ENV = {
+    "TIDB_USERNAME": "user",
+    "TIDB_PASSWORD": "password",
+    "TIDB_HOST": "tidb.invalid",
+    "TIDB_PORT": "4000",
+    "VECTOR_BACKEND": "tidb",
+}
+
+
+class RecordingSession:
+    """Session that records the SQL it is given and finds no rows."""
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.statements.append(str(query))
+        return mock.MagicMock(fetchone=mock.MagicMock(return_value=None), fetchall=mock.MagicMock(return_value=[]))
+
+    def commit(self):
+        pass
+
+
+@unittest.skipIf(app_init is None, "backend dependencies are not installed")
+class InitializeServicesTest(unittest.TestCase):
+    """Runs the real initialize_services wiring with every network call patched out."""
+
+    def setUp(self):
+        from lamatidb.interfaces.cache_interfaces import pdf_availability_cache
+        from lamatidb.interfaces.database_interfaces import engine_registry
+        from lamatidb.interfaces.database_interfaces.database_interface import DatabaseInterface
+        from lamatidb.interfaces import index_interface
+
+        engine_registry.dispose_all()
+        self.addCleanup(engine_registry.dispose_all)
+        self.addCleanup(setattr, pdf_availability_cache, "_shared_cache", None)
+
+        stack = contextlib.ExitStack()
+        self.addCleanup(stack.close)
+        stack.enter_context(mock.patch.dict(os.environ, TIDB_ENV))
+        stack.enter_context(mock.patch.object(app_init.SettingsManager, "set_global_settings"))
+        stack.enter_context(mock.patch.object(app_init.engine_registry, "warm_up"))
+        stack.enter_context(mock.patch.object(DatabaseInterface, "recreate_database"))
+        stack.enter_context(mock.patch.object(DatabaseInterface, "create_database_if_not_exists"))
+        stack.enter_context(mock.patch.object(pdf_availability_cache.PDFAvailabilityCache, "refresh"))
+        stack.enter_context(mock.patch.object(pdf_availability_cache.PDFAvailabilityCache, "start_scheduled_refresh"))
+        # IndexInterface runs for real up to the vector store client, which would connect to TiDB
+        stack.enter_context(mock.patch.object(index_interface, "borrowed_connection_engine_args",
+                                              lambda url: contextlib.nullcontext({})))
+        stack.enter_context(mock.patch.object(index_interface, "IndexedMetadataTiDBVectorStore"))
+        stack.enter_context(mock.patch.object(index_interface, "StorageContext"))
+        stack.enter_context(mock.patch.object(index_interface, "VectorIndexManager"))
+        stack.enter_context(mock.patch.object(index_interface, "Settings"))
+        stack.enter_context(mock.patch.object(index_interface.IndexInterface, "load_index_from_vector_store"))
+
+        self.services = app_init.initialize_services()
+
+    def test_pdf_queries_target_the_datastore(self):
+        from serverfastapi.api.document_management.services import get_document_pdf
+
+        datastore_db = self.services["datastore_db"]
+        pdf_store = self.services["pdf_store"]
+        self.assertEqual(datastore_db.engine.url.database, "datastore")
+        self.assertEqual(pdf_store.schema, "datastore")
+
+        statements = []
+        with mock.patch.object(datastore_db, "get_session", lambda: RecordingSession(statements)):
+            self.assertIsNone(get_document_pdf("16625675", pdf_store, datastore_db))
+
+        self.assertEqual(len(statements), 2)
+        self.assertIn("`datastore`.`DocumentPdf`", statements[0])
+        self.assertIn("`datastore`.`DocumentFull`", statements[1])
+
+    def test_vector_engine_gets_its_full_pool(self):
+        from lamatidb.interfaces.database_interfaces import engine_registry
+
+        pools = {status["database"]: status for status in engine_registry.pool_status()}
+        # The 17 indexes, snapshots and bulk writes all share the engine of the vector database
+        self.assertEqual(pools["scibert_alldata_pico"]["pool_size"], 5)
+        self.assertEqual(pools["scibert_alldata_pico"]["max_connections"], 15)
+        self.assertEqual(pools["operations"]["pool_size"], 10)
+        self.assertEqual(pools["datastore"]["pool_size"], 10)
+        # The CREATE DATABASE engine is kept small and outside the budget
+        self.assertEqual(pools["mysql"]["pool_size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
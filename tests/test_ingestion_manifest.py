@@ -0,0 +1,46 @@
+import io
+import unittest
+
+try:
+    import pandas as pd
+    from lamatidb.interfaces.mysql_ingestors.ingestion_manifest import compute_content_hashes
+except ImportError:
+    pd = None
+
+COLUMNS = ['PMID', 'Title', 'Authors', 'Abstract', 'Publication Year']
+HEADER = "PMID,Title,Authors,Abstract,Publication Year\n"
+ROW = "16625675,Aspirin and stroke,Doe J,Daily aspirin in adults over 50.,2019\n"
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class ComputeContentHashesTest(unittest.TestCase):
+
+    def _hash_first_row(self, csv_text):
+        df = pd.read_csv(io.StringIO(csv_text))
+        df['PMID'] = df['PMID'].astype(str)
+        return compute_content_hashes(df, COLUMNS)[0]
+
+    def test_year_hashes_the_same_with_and_without_missing_years(self):
+        alone = self._hash_first_row(HEADER + ROW)
+        # A missing year elsewhere in the file makes pandas read the column as float
+        with_missing_year = self._hash_first_row(HEADER + ROW + "16625676,Other,Roe R,Another abstract.,\n")
+        self.assertEqual(alone, with_missing_year)
+
+    def test_whole_float_in_object_column_hashes_like_an_integer(self):
+        df = pd.DataFrame({column: [value] for column, value in
+                           zip(COLUMNS, ["16625675", "Aspirin and stroke", "Doe J", "Daily aspirin in adults over 50.", 2019])})
+        mixed = df.astype({'Publication Year': object})
+        mixed.loc[0, 'Publication Year'] = 2019.0
+        self.assertEqual(compute_content_hashes(df, COLUMNS), compute_content_hashes(mixed, COLUMNS))
+
+    def test_changed_year_changes_the_hash(self):
+        self.assertNotEqual(self._hash_first_row(HEADER + ROW), self._hash_first_row(HEADER + ROW.replace("2019", "2020")))
+
+    def test_fractional_values_are_kept(self):
+        df = pd.DataFrame({"score": [1.5, None]})
+        other = pd.DataFrame({"score": [1.0, None]})
+        self.assertNotEqual(compute_content_hashes(df, ["score"])[0], compute_content_hashes(other, ["score"])[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+from tests.stand_in_server import StandInServer, chat_completion
+
+ENHANCED = "{'pico_i': 'Aspirin daily', 'pico_p': 'Adults over 50', 'pico_o': 'Fewer strokes', 'pico_c': 'Placebo'}"
+
+
+@unittest.skipIf(openai is None, "openai is not installed")
+class AsyncPICOEnhancerRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def _enhancer(self, server, **kwargs):
+        from lamatidb.interfaces.llm_enhancer import AsyncPICOEnhancer
+        return AsyncPICOEnhancer(model="stand-in", base_url=f"{server.url}/v1", api_key="test",
+                                 max_retries=3, backoff_base=0.01, backoff_max=0.05,
+                                 requests_per_second=1000, cache_dir=self.cache_dir.name, **kwargs)
+
+    def test_retries_rate_limits_and_server_errors(self):
+        responses = [
+            (429, {"Retry-After": "0"}, {"error": {"message": "rate limited"}}),
+            (503, {}, {"error": {"message": "unavailable"}}),
+            (200, {}, chat_completion(ENHANCED)),
+        ]
+        with StandInServer(responses) as server:
+            results = self._enhancer(server).enhance(["abstract"], [{"pico_i": "aspirin"}])
+
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(results[0]["pico_i"], "Aspirin daily")
+        self.assertEqual(results[0]["pico_c"], "Placebo")
+
+    def test_does_not_retry_client_errors(self):
+        responses = [(400, {}, {"error": {"message": "bad request"}})]
+        with StandInServer(responses) as server:
+            results = self._enhancer(server).enhance(["abstract"], [{}])
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(results[0], {"pico_i": None, "pico_p": None, "pico_o": None, "pico_c": None})
+
+    def test_does_not_retry_malformed_responses(self):
+        # A 200 whose body has no choices fails while reading the completion, which is not transient
+        responses = [(200, {}, {"id": "chatcmpl-stand-in", "object": "chat.completion", "choices": []})]
+        with StandInServer(responses) as server:
+            results = self._enhancer(server).enhance(["abstract"], [{}])
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertIsNone(results[0]["pico_i"])
+
+    def test_retries_connection_errors_until_exhausted(self):
+        from lamatidb.interfaces.llm_enhancer import AsyncPICOEnhancer
+
+        # Bind a server and shut it down so the port refuses connections
+        with StandInServer([(200, {}, chat_completion(ENHANCED))]) as server:
+            url = server.url
+        enhancer = AsyncPICOEnhancer(model="stand-in", base_url=f"{url}/v1", api_key="test",
+                                     max_retries=2, backoff_base=0.01, backoff_max=0.05,
+                                     requests_per_second=1000, cache_dir=self.cache_dir.name)
+        results = enhancer.enhance(["abstract"], [{}])
+
+        self.assertEqual(enhancer.requests, 3)
+        self.assertIsNone(results[0]["pico_i"])
+
+    def test_cached_responses_skip_the_server(self):
+        with StandInServer([(200, {}, chat_completion(ENHANCED))]) as server:
+            self._enhancer(server).enhance(["abstract"], [{}])
+            enhancer = self._enhancer(server)
+            results = enhancer.enhance(["abstract"], [{}])
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(enhancer.cache_hits, 1)
+        self.assertEqual(results[0]["pico_o"], "Fewer strokes")
+
+    def test_is_retryable(self):
+        from lamatidb.interfaces.llm_enhancer import AsyncPICOEnhancer
+        self.assertFalse(AsyncPICOEnhancer._is_retryable(KeyError("choices")))
+        self.assertFalse(AsyncPICOEnhancer._is_retryable(ValueError("bad json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
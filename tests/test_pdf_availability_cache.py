@@ -0,0 +1,84 @@
+import time
+import unittest
+
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None
+
+
+class InMemoryDatastore:
+    """DatabaseInterface stand-in holding DocumentFull ids and the pdf_availability CacheVersion."""
+
+    def __init__(self, doc_ids):
+        self.doc_ids = list(doc_ids)
+        self.version = 0
+        self.loads = 0
+
+    def fetch_data_from_db(self, query):
+        self.loads += 1
+        return [(x,) for x in self.doc_ids]
+
+    def get_session(self):
+        datastore = self
+
+        class Session:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, params=None):
+                class Result:
+                    def fetchone(self):
+                        return (datastore.version,)
+                return Result()
+
+        return Session()
+
+
+@unittest.skipIf(sqlalchemy is None, "sqlalchemy is not installed")
+class PDFAvailabilityCacheTest(unittest.TestCase):
+
+    def _wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_reloads_when_version_row_changes(self):
+        from lamatidb.interfaces.cache_interfaces.pdf_availability_cache import PDFAvailabilityCache
+        datastore = InMemoryDatastore(["1"])
+        cache = PDFAvailabilityCache(datastore, refresh_interval=60, version_poll_interval=0.02)
+        cache.refresh()
+        cache.start_scheduled_refresh()
+        try:
+            # Another process ingests a PDF and bumps the version row
+            datastore.doc_ids.append("2")
+            datastore.version += 1
+            self.assertTrue(self._wait_for(lambda: datastore.loads == 2))
+            self.assertEqual(cache.has_pdf(["1", "2"]), {"1": True, "2": True})
+        finally:
+            cache.stop_scheduled_refresh()
+
+    def test_scheduler_can_be_restarted(self):
+        from lamatidb.interfaces.cache_interfaces.pdf_availability_cache import PDFAvailabilityCache
+        datastore = InMemoryDatastore(["1"])
+        cache = PDFAvailabilityCache(datastore, refresh_interval=0.02, version_poll_interval=0.02)
+        cache.refresh()
+        cache.start_scheduled_refresh()
+        cache.stop_scheduled_refresh()
+
+        loads = datastore.loads
+        cache.start_scheduled_refresh()
+        try:
+            self.assertTrue(self._wait_for(lambda: datastore.loads > loads))
+        finally:
+            cache.stop_scheduled_refresh()
+
+
+if __name__ == "__main__":
+    unittest.main()
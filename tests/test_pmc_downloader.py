@@ -0,0 +1,154 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+
+from lamatidb.interfaces.mysql_ingestors.pmc_downloader import DONE, FAILED, NOT_AVAILABLE, PMCDownloader
+from tests.stand_in_server import StandInServer
+
+PACKAGE_PATH = "/pub/pmc/oa_package/PMC123.tar.gz"
+
+
+def make_package(files) -> bytes:
+    """Gzipped tar with the given {member name: bytes} entries."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def oa_record(url: str) -> bytes:
+    return (f'<OA><records><record id="PMC123">'
+            f'<link format="tgz" href="{url}{PACKAGE_PATH}"/></record></records></OA>').encode("utf-8")
+
+
+def serve_range(payload: bytes):
+    """Stand-in response honouring `Range: bytes=<start>-` like the PMC HTTPS mirror."""
+
+    def respond(handler):
+        range_header = handler.headers.get("Range")
+        if not range_header:
+            return 200, {}, payload
+        start = int(range_header[len("bytes="):].rstrip("-"))
+        if start >= len(payload):
+            return 416, {"Content-Range": f"bytes */{len(payload)}"}, b""
+        return 206, {"Content-Range": f"bytes {start}-{len(payload) - 1}/{len(payload)}"}, payload[start:]
+
+    return respond
+
+
+class PMCDownloaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.out_dir = tempfile.TemporaryDirectory()
+        self.payload = os.urandom(256 * 1024)
+
+    def tearDown(self):
+        self.out_dir.cleanup()
+
+    def _downloader(self, server, **kwargs):
+        return PMCDownloader(out_folder=self.out_dir.name, oa_service_url=f"{server.url}/oa",
+                             requests_per_second=1000, max_retries=3, **kwargs)
+
+    def test_resumes_partial_file_with_range_request(self):
+        dest_path = os.path.join(self.out_dir.name, "package.bin")
+        with open(f"{dest_path}.part", "wb") as f:
+            f.write(self.payload[:1000])
+
+        with StandInServer([serve_range(self.payload)]) as server:
+            self._downloader(server).download_file(f"{server.url}/package.bin", dest_path)
+
+        self.assertEqual(server.requests[0]["headers"].get("Range"), "bytes=1000-")
+        with open(dest_path, "rb") as f:
+            self.assertEqual(f.read(), self.payload)
+        self.assertFalse(os.path.exists(f"{dest_path}.part"))
+
+    def test_restarts_when_server_ignores_range(self):
+        dest_path = os.path.join(self.out_dir.name, "package.bin")
+        with open(f"{dest_path}.part", "wb") as f:
+            f.write(b"stale bytes")
+
+        with StandInServer([(200, {}, self.payload)]) as server:
+            self._downloader(server).download_file(f"{server.url}/package.bin", dest_path)
+
+        with open(dest_path, "rb") as f:
+            self.assertEqual(f.read(), self.payload)
+
+    def test_completed_partial_file_is_kept_on_416(self):
+        dest_path = os.path.join(self.out_dir.name, "package.bin")
+        with open(f"{dest_path}.part", "wb") as f:
+            f.write(self.payload)
+
+        with StandInServer([serve_range(self.payload)]) as server:
+            self._downloader(server).download_file(f"{server.url}/package.bin", dest_path)
+
+        with open(dest_path, "rb") as f:
+            self.assertEqual(f.read(), self.payload)
+
+    def test_retries_throttling_and_server_errors(self):
+        responses = [
+            (429, {"Retry-After": "0"}, b""),
+            (503, {"Retry-After": "0"}, b""),
+            (200, {}, self.payload),
+        ]
+        dest_path = os.path.join(self.out_dir.name, "package.bin")
+        with StandInServer(responses) as server:
+            self._downloader(server).download_file(f"{server.url}/package.bin", dest_path)
+
+        self.assertEqual(len(server.requests), 3)
+        with open(dest_path, "rb") as f:
+            self.assertEqual(f.read(), self.payload)
+
+    def test_download_extracts_packages_and_records_state(self):
+        package = make_package({"PMC123/article.nxml": b"<article/>", "PMC123/article.pdf": b"%PDF-1.4"})
+
+        def respond(handler):
+            if handler.path.startswith("/oa"):
+                if "PMC123" in handler.path:
+                    return 200, {}, oa_record(server.url)
+                return 200, {}, b'<OA><error code="idIsNotOpenAccess">not open access</error></OA>'
+            return serve_range(package)(handler)
+
+        with StandInServer([respond]) as server:
+            counts = self._downloader(server).download(["PMC123", "PMC999"])
+            # A rerun skips everything recorded in the state file
+            rerun = self._downloader(server).download(["PMC123", "PMC999"])
+
+        self.assertEqual(counts, {DONE: 1, NOT_AVAILABLE: 1, FAILED: 0})
+        self.assertEqual(rerun, {DONE: 0, NOT_AVAILABLE: 0, FAILED: 0})
+        with open(os.path.join(self.out_dir.name, "PMC123", "article.pdf"), "rb") as f:
+            self.assertEqual(f.read(), b"%PDF-1.4")
+
+    def test_rejects_packages_escaping_the_target_directory(self):
+        for name in ("../escaped.txt", "/tmp/escaped.txt", "PMC123/../../escaped.txt"):
+            package_path = os.path.join(self.out_dir.name, "package.tar.gz")
+            with open(package_path, "wb") as f:
+                f.write(make_package({name: b"payload"}))
+
+            downloader = PMCDownloader(out_folder=self.out_dir.name)
+            with self.assertRaises(ValueError):
+                downloader.extract_package("PMC123", package_path)
+            self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.out_dir.name), "escaped.txt")))
+            self.assertFalse(os.path.exists(os.path.join(self.out_dir.name, "PMC123")))
+
+    def test_rejects_symlinks_escaping_the_target_directory(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            link = tarfile.TarInfo("PMC123/link")
+            link.type = tarfile.SYMTYPE
+            link.linkname = "../../outside"
+            tar.addfile(link)
+        package_path = os.path.join(self.out_dir.name, "package.tar.gz")
+        with open(package_path, "wb") as f:
+            f.write(buffer.getvalue())
+
+        with self.assertRaises(ValueError):
+            PMCDownloader(out_folder=self.out_dir.name).extract_package("PMC123", package_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from lamatidb.interfaces.rate_limiting import TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_sustained_rate_across_threads(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 5 tokens are available immediately, the other 10 arrive at 50 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_async_acquire(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        async def run():
+            await asyncio.gather(*(bucket.aacquire() for _ in range(6)))
+
+        start = time.monotonic()
+        asyncio.run(run())
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
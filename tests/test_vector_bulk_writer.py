@@ -0,0 +1,87 @@
+import threading
+import unittest
+
+try:
+    from lamatidb.interfaces.vector_stores.vector_bulk_writer import VectorBulkWriter
+except ImportError:
+    VectorBulkWriter = None
+
+
+class RecordingConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def exec_driver_sql(self, statement, params):
+        table_name = statement.split("`")[1]
+        with self.engine.lock:
+            self.engine.rows += len(params) // 4
+            self.engine.rows_by_table[table_name] = self.engine.rows_by_table.get(table_name, 0) + len(params) // 4
+
+    def commit(self):
+        pass
+
+
+class InMemoryEngine:
+    """Engine stand-in counting inserted rows; `fail_connect` simulates a pool timeout."""
+
+    def __init__(self, fail_connect=False):
+        self.fail_connect = fail_connect
+        self.rows = 0
+        self.rows_by_table = {}
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.fail_connect:
+            raise TimeoutError("QueuePool limit reached, connection timed out")
+        return RecordingConnection(self)
+
+
+def row_batches(batches, rows_per_batch):
+    for batch in range(batches):
+        yield [(f"{batch}-{i}", [0.1, 0.2], {"source": str(i)}, "text") for i in range(rows_per_batch)]
+
+
+@unittest.skipIf(VectorBulkWriter is None, "llama_index is not installed")
+class VectorBulkWriterTest(unittest.TestCase):
+
+    def test_writes_all_rows(self):
+        engine = InMemoryEngine()
+        writer = VectorBulkWriter(engine, "scibert_alldata", batch_size=7, parallelism=3)
+        self.assertEqual(writer.write_batches(row_batches(10, 20)), 200)
+        self.assertEqual(engine.rows, 200)
+
+    def test_writes_several_tables_over_one_pool(self):
+        engine = InMemoryEngine()
+        writer = VectorBulkWriter(engine, batch_size=4, parallelism=2)
+        table_batches = ((f"scibert_alldata_{key}", rows) for key, rows in zip(["p", "pi", "pio"], row_batches(3, 10)))
+        self.assertEqual(writer.write_table_batches(table_batches), 30)
+        expected = {"scibert_alldata_p": 10, "scibert_alldata_pi": 10, "scibert_alldata_pio": 10}
+        self.assertEqual(writer.rows_written_by_table, expected)
+        self.assertEqual(engine.rows_by_table, expected)
+
+    def test_connect_failure_raises_instead_of_blocking(self):
+        writer = VectorBulkWriter(InMemoryEngine(fail_connect=True), "scibert_alldata", batch_size=1, parallelism=2)
+        result = []
+        thread = threading.Thread(target=lambda: result.append(self._write(writer)), daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive(), "write_batches blocked after every writer failed to connect")
+        self.assertIsInstance(result[0], TimeoutError)
+
+    @staticmethod
+    def _write(writer):
+        try:
+            writer.write_batches(row_batches(50, 10))
+        except Exception as e:
+            return e
+
+
+if __name__ == "__main__":
+    unittest.main()